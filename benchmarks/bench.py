@@ -0,0 +1,366 @@
+"""
+Benchmarks for the core game loop and utilities of reconchess.
+
+Every benchmark uses fixed seeds and the positions in `positions.txt`, so runs on the same machine are comparable.
+Results are written as JSON, and are compared against the reference results in `baseline.json` to catch
+regressions: ::
+
+    python benchmarks/bench.py
+    python benchmarks/bench.py --output new.json --baseline old.json
+
+The comparison exits with status 1 if any benchmark is slower than the baseline by more than `--max-slowdown`.
+
+Timings depend on the machine, so the committed baseline is only a rough reference elsewhere, and a warning is printed
+when the baseline was recorded on a different platform. To refresh it after an intended change in performance, or to
+record one for your own machine before making changes, run: ::
+
+    python benchmarks/bench.py --update-baseline
+
+and commit `benchmarks/baseline.json` together with the change that explains it.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import reconchess
+from reconchess import LocalGame, GameHistory, ChessJSONEncoder, ChessJSONDecoder, CompactChessJSONEncoder, \
+    play_local_game
+from reconchess.bots.random_bot import RandomBot
+from reconchess.history import GameHistoryEncoder
+from reconchess.profiling import PHASES, NO_HOOKS
+from reconchess.utilities import move_actions, revise_move, chess_json_dumps
+
+POSITIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'positions.txt')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+SEED = 2019
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name, number):
+    """
+    Registers a benchmark. The decorated function does any setup and returns a function without arguments that runs
+    the code being measured once. `number` is how many times that function is called per repeat.
+    """
+
+    def decorator(fn):
+        BENCHMARKS[name] = (fn, number)
+        return fn
+
+    return decorator
+
+
+def load_positions():
+    with open(POSITIONS_PATH) as fp:
+        return [chess.Board(line.strip()) for line in fp if line.strip()]
+
+
+def play_seeded_game(seed):
+    _, _, history = play_local_game(RandomBot(), RandomBot(), seed=seed)
+    return history
+
+
+def record_actions(seed):
+    # the senses and moves of a seeded random game, to replay against a fresh LocalGame
+    rng = random.Random(seed)
+    game = LocalGame(seconds_per_player=None)
+    game.start()
+    actions = []
+    while not game.is_over():
+        sense = rng.choice(chess.SQUARES)
+        move = rng.choice(game.move_actions() + [None])
+        game.sense(sense)
+        game.move(move)
+        game.end_turn()
+        actions.append((sense, move))
+    return actions
+
+
+@benchmark('move_actions', number=20)
+def bench_move_actions():
+    boards = load_positions()
+
+    def run():
+        for board in boards:
+            move_actions(board)
+
+    return run
+
+
+@benchmark('revise_move', number=20)
+def bench_revise_move():
+    pairs = [(board, move) for board in load_positions() for move in move_actions(board)]
+
+    def run():
+        for board, move in pairs:
+            revise_move(board, move)
+
+    return run
+
+
+@benchmark('local_game_turns', number=5)
+def bench_local_game_turns():
+    actions = record_actions(SEED)
+
+    def run():
+        game = LocalGame(seconds_per_player=None)
+        game.start()
+        for sense, move in actions:
+            game.sense(sense)
+            game.move(move)
+            game.end_turn()
+
+    return run
+
+
+@benchmark('play_local_game', number=5)
+def bench_play_local_game():
+    def run():
+        play_seeded_game(SEED)
+
+    return run
+
+
+@benchmark('no_hooks_turn', number=5)
+def bench_no_hooks_turn():
+    # what play_turn spends on its phases when it isn't given hooks, for as many turns as play_local_game plays, so the
+    # two can be compared directly
+    num_turns = sum(play_seeded_game(SEED).num_turns(color) for color in chess.COLORS)
+    player = RandomBot()
+
+    def run():
+        for _ in range(num_turns):
+            for phase in PHASES:
+                with NO_HOOKS.phase(player, phase):
+                    pass
+
+    return run
+
+
+def _history_benchmark(extension):
+    history = play_seeded_game(SEED)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'history' + extension)
+    history.save(path)
+
+    def cleanup():
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return history, path, cleanup
+
+
+@benchmark('history_save', number=10)
+def bench_history_save():
+    history, path, cleanup = _history_benchmark('.json')
+
+    def run():
+        history.save(path)
+
+    run.cleanup = cleanup
+    return run
+
+
+@benchmark('history_save_gz', number=10)
+def bench_history_save_gz():
+    history, path, cleanup = _history_benchmark('.json.gz')
+
+    def run():
+        history.save(path)
+
+    run.cleanup = cleanup
+    return run
+
+
+@benchmark('history_from_file', number=10)
+def bench_history_from_file():
+    _, path, cleanup = _history_benchmark('.json')
+
+    def run():
+        GameHistory.from_file(path)
+
+    run.cleanup = cleanup
+    return run
+
+
+def _json_payload():
+    history = play_seeded_game(SEED)
+    return [history.sense_results(color) for color in chess.COLORS] + \
+           [history.taken_moves(color) for color in chess.COLORS]
+
+
+@benchmark('json_encode', number=20)
+def bench_json_encode():
+    payload = _json_payload()
+
+    def run():
+        chess_json_dumps(payload, cls=ChessJSONEncoder)
+
+    return run
+
+
+@benchmark('json_encode_compact', number=20)
+def bench_json_encode_compact():
+    payload = _json_payload()
+
+    def run():
+        chess_json_dumps(payload, cls=CompactChessJSONEncoder)
+
+    return run
+
+
+# history_encode uses orjson when it is installed, and history_encode_stdlib always uses the standard library, so
+# together they show what orjson gains
+@benchmark('history_encode', number=20)
+def bench_history_encode():
+    history = play_seeded_game(SEED)
+
+    def run():
+        chess_json_dumps(history, cls=GameHistoryEncoder)
+
+    return run
+
+
+@benchmark('history_encode_stdlib', number=20)
+def bench_history_encode_stdlib():
+    history = play_seeded_game(SEED)
+
+    def run():
+        json.dumps(history, cls=GameHistoryEncoder)
+
+    return run
+
+
+@benchmark('json_decode', number=20)
+def bench_json_decode():
+    text = chess_json_dumps(_json_payload(), cls=ChessJSONEncoder)
+
+    def run():
+        json.loads(text, cls=ChessJSONDecoder)
+
+    return run
+
+
+def run_benchmark(name, repeat, scale):
+    setup, number = BENCHMARKS[name]
+    number = max(1, int(number * scale))
+    run = setup()
+    try:
+        run()  # warm up caches
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            times.append((time.perf_counter() - start) / number)
+    finally:
+        if hasattr(run, 'cleanup'):
+            run.cleanup()
+    return OrderedDict([('number', number), ('repeat', repeat), ('min', min(times)),
+                        ('median', statistics.median(times)), ('max', max(times))])
+
+
+def metadata():
+    return OrderedDict([
+        ('reconchess', reconchess.__version__),
+        ('chess', chess.__version__),
+        ('python', platform.python_version()),
+        ('implementation', platform.python_implementation()),
+        ('platform', platform.platform()),
+        ('machine', platform.machine()),
+        ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+    ])
+
+
+def compare(results, baseline, max_slowdown):
+    """
+    :return: A list of `(name, baseline seconds, new seconds, ratio, regressed)` for each benchmark in both runs,
+        comparing the minimum time per call.
+    """
+    rows = []
+    for name, result in results['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        old = baseline['benchmarks'][name]['min']
+        new = result['min']
+        ratio = new / old if old else float('inf')
+        rows.append((name, old, new, ratio, ratio > 1 + max_slowdown))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0],
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--output', help='path to write the results to as JSON.')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='path to the results of a previous run to compare against, or an empty string to skip '
+                             'the comparison.')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='write the results to --baseline instead of comparing against it.')
+    parser.add_argument('--max-slowdown', type=float, default=0.1,
+                        help='fraction a benchmark may be slower than the baseline before it counts as a regression.')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed repeats of each benchmark.')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for the number of calls per repeat.')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this.')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit.')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return
+
+    results = OrderedDict([('metadata', metadata()), ('benchmarks', OrderedDict())])
+    for name in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        result = run_benchmark(name, args.repeat, args.scale)
+        results['benchmarks'][name] = result
+        print('{:<24} {:>12.3f} ms  (median {:.3f} ms)'.format(name, result['min'] * 1e3, result['median'] * 1e3))
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as fp:
+            json.dump(results, fp, indent=2)
+            fp.write('\n')
+        print('\nUpdated the baseline {}'.format(args.baseline))
+    elif args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+
+        for key in ['implementation', 'platform', 'machine']:
+            if baseline['metadata'].get(key) != results['metadata'][key]:
+                print('\nWarning: the baseline was recorded with {} {}, not {}, so timings may not be comparable.'
+                      .format(key, baseline['metadata'].get(key), results['metadata'][key]))
+                break
+
+        print()
+        print('{:<24} {:>12} {:>12} {:>8}'.format('benchmark', 'baseline ms', 'new ms', 'ratio'))
+        regressions = []
+        for name, old, new, ratio, regressed in compare(results, baseline, args.max_slowdown):
+            print('{:<24} {:>12.3f} {:>12.3f} {:>8.2f}{}'.format(name, old * 1e3, new * 1e3, ratio,
+                                                                 '  REGRESSION' if regressed else ''))
+            if regressed:
+                regressions.append(name)
+
+        if regressions:
+            print('\n{} benchmark(s) regressed by more than {:.0%}: {}'.format(
+                len(regressions), args.max_slowdown, ', '.join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
 __version__ = '1.6.9'
 
-from .game import Game, LocalGame, RemoteGame
+from .game import Game, LocalGame, RemoteGame, VirtualClock
 from .player import Player, load_player
 from .types import *
-from .utilities import is_illegal_castle, is_psuedo_legal_castle, ChessJSONEncoder, ChessJSONDecoder
-from .play import play_local_game, play_remote_game, play_turn, notify_opponent_move_results, play_sense, play_move
+from .utilities import is_illegal_castle, is_psuedo_legal_castle, ChessJSONEncoder, ChessJSONDecoder, \
+    CompactChessJSONEncoder
+from .profiling import PhaseHooks, PhaseTimer
+from .simulation import SimulationState
+from .sense_index import SenseIndex
+from .play import play_local_game, play_remote_game, play_turn, notify_opponent_move_results, play_sense, play_move, \
+    pondering
 from .history import Turn, GameHistory, GameHistoryEncoder, GameHistoryDecoder
+from .replay_index import ReplayIndex, IndexedGame
+from .result_cache import ResultCache, player_source_hash
 import chess
@@ -1,4 +1,3 @@
-import random
 from reconchess import *
 
 # move sequences from white's perspective, flipped at runtime if playing as black
@@ -29,9 +28,12 @@ def flipped_move(move):
 
 class AttackerBot(Player):
     def __init__(self):
-        self.move_sequence = random.choice(QUICK_ATTACKS)
+        self.move_sequence = None
 
     def handle_game_start(self, color: Color, board: chess.Board, opponent_name: str):
+        # chosen here instead of in __init__ so that a seeded rng from play_local_game is used, and copied because
+        # moves are popped off of it
+        self.move_sequence = list(self.rng.choice(QUICK_ATTACKS))
         if color == chess.BLACK:
             self.move_sequence = list(map(flipped_move, self.move_sequence))
 
@@ -40,7 +42,7 @@ class AttackerBot(Player):
 
     def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> \
             Optional[Square]:
-        return random.choice(sense_actions)
+        return self.rng.choice(sense_actions)
 
     def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
         pass
@@ -1,5 +1,4 @@
 import chess.engine
-import random
 from reconchess import *
 import os
 
@@ -57,7 +56,7 @@ class TroutBot(Player):
         for square, piece in self.board.piece_map().items():
             if piece.color == self.color:
                 sense_actions.remove(square)
-        return random.choice(sense_actions)
+        return self.rng.choice(sense_actions)
 
     def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
         # add the pieces in the sense result to our board
@@ -0,0 +1,167 @@
+import math
+import queue
+import threading
+import time
+import chess
+from .types import *
+from .player import Player
+from .history import GameHistory
+
+
+class _Call(object):
+    __slots__ = ['method', 'args', 'is_choice', 'deadline', 'started', 'done', 'value', 'error']
+
+    def __init__(self, method, args, is_choice=False, deadline=None):
+        self.method = method
+        self.args = args
+        self.is_choice = is_choice
+        self.deadline = deadline
+        self.started = False
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DeadlinePlayer(Player):
+    """
+    A :class:`Player` that makes another player's :meth:`Player.choose_sense` and :meth:`Player.choose_move` return
+    before its clock runs out. Every method of the player is run in order in a worker thread, and if a choice hasn't
+    been made `margin` seconds before the clock would run out, the action last published with
+    :meth:`Player.publish_action` is played, or `None` if nothing was published.
+
+    Threads can't be stopped, so a late choice keeps running in the worker thread, and the player's next methods are
+    queued behind it without holding up the game. Players should check :attr:`Player.deadline` and return once it has
+    passed, otherwise they will also be late for their next choice.
+
+    Example usage: ::
+
+        play_local_game(DeadlinePlayer(MyBot()), DeadlinePlayer(RandomBot()), seconds_per_player=10)
+    """
+
+    def __init__(self, player: Player, margin: float = 1.0, game_end_timeout: float = 10.0):
+        """
+        :param player: The :class:`Player` to run with deadlines.
+        :param margin: Seconds of the clock to keep for submitting the action.
+        :param game_end_timeout: Seconds :meth:`handle_game_end` waits for the player's queued methods, including a
+            late choice that is still running, before giving up on them.
+        """
+        self.player = player
+        self.margin = margin
+        self.game_end_timeout = game_end_timeout
+        self.num_timeouts = 0
+        self._calls = queue.Queue()
+        self._error = None
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    @property
+    def rng(self):
+        return self.player.rng
+
+    @rng.setter
+    def rng(self, rng):
+        self.player.rng = rng
+
+    @property
+    def wants_observation_planes(self):
+        return self.player.wants_observation_planes
+
+    @property
+    def wants_to_ponder(self):
+        return self.player.wants_to_ponder
+
+    def _work(self):
+        while True:
+            call = self._calls.get()
+            if call is None:
+                return
+
+            if call.is_choice:
+                self.player.deadline = call.deadline
+                self.player.published_action = None
+            call.started = True
+            try:
+                call.value = call.method(*call.args)
+            except BaseException as e:
+                call.error = e
+                self._error = e
+            finally:
+                if call.is_choice:
+                    self.player.deadline = None
+            call.done.set()
+
+    def _submit(self, method, *args, is_choice=False, deadline=None) -> _Call:
+        # errors of methods that weren't waited for are raised by the next method
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+        call = _Call(method, args, is_choice, deadline)
+        self._calls.put(call)
+        return call
+
+    def _wait(self, call: _Call, timeout: Optional[float] = None) -> bool:
+        if not call.done.wait(timeout):
+            return False
+        if call.error is not None:
+            self._error = None
+            raise call.error
+        return True
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the methods queued so far have run. Errors they raised are still raised by the next method.
+
+        :param timeout: The maximum seconds to wait, or None to wait forever.
+        :return: Whether the methods ran within `timeout`.
+        """
+        call = _Call(lambda: None, ())
+        self._calls.put(call)
+        return call.done.wait(timeout)
+
+    def _choose(self, method, *args):
+        seconds_left = args[-1]
+        timeout = max(0.0, seconds_left - self.margin) if not math.isinf(seconds_left) else None
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        call = self._submit(method, *args, is_choice=True, deadline=deadline)
+        if self._wait(call, timeout):
+            return call.value
+
+        self.num_timeouts += 1
+        # a late call before this one may still be running, in which case nothing was published for this choice yet
+        return self.player.published_action if call.started else None
+
+    def handle_observation_planes(self, planes):
+        self._wait(self._submit(self.player.handle_observation_planes, planes))
+
+    def ponder(self, stop: threading.Event):
+        self._wait(self._submit(self.player.ponder, stop))
+
+    def handle_game_start(self, color: Color, board: chess.Board, opponent_name: str):
+        self._submit(self.player.handle_game_start, color, board, opponent_name)
+
+    def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
+        self._submit(self.player.handle_opponent_move_result, captured_my_piece, capture_square)
+
+    def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> \
+            Optional[Square]:
+        return self._choose(self.player.choose_sense, sense_actions, move_actions, seconds_left)
+
+    def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        self._submit(self.player.handle_sense_result, sense_result)
+
+    def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        return self._choose(self.player.choose_move, move_actions, seconds_left)
+
+    def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                           captured_opponent_piece: bool, capture_square: Optional[Square]):
+        self._submit(self.player.handle_move_result, requested_move, taken_move, captured_opponent_piece,
+                     capture_square)
+
+    def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason],
+                        game_history: GameHistory):
+        call = self._submit(self.player.handle_game_end, winner_color, win_reason, game_history)
+        self._calls.put(None)
+        # a late choice that never returns would otherwise hold up the end of the game forever
+        self._wait(call, self.game_end_timeout)
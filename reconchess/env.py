@@ -0,0 +1,394 @@
+"""
+Environments for training reinforcement learning agents to play Reconnaissance Chess.
+
+The agent plays one color against an opponent :class:`Player` that runs inside the environment. Each of the agent's
+turns is split into two steps: a sense step followed by a move step. This module requires `numpy`.
+
+Actions are integers in `range(NUM_ACTIONS)`:
+
+- In the sense phase an action is the :class:`Square` to sense, or :data:`PASS_ACTION` to not sense.
+- In the move phase an action is a move encoded with :func:`encode_move`, or :data:`PASS_ACTION` to pass.
+
+Observations are the bitplanes of :mod:`reconchess.observation`, kept up to date by the game with
+:meth:`LocalGame.enable_observation_planes`.
+"""
+import multiprocessing
+import random
+import traceback
+import numpy as np
+import chess
+from typing import Callable, Sequence
+from .types import *
+from .game import LocalGame
+from .player import Player
+from .play import play_turn
+from .observation import *
+
+# Queen promotions share an action with the move without a promotion, which :class:`LocalGame` promotes to a queen.
+PROMOTIONS = [None, chess.KNIGHT, chess.BISHOP, chess.ROOK]
+PASS_ACTION = len(PROMOTIONS) * 64 * 64
+NUM_ACTIONS = PASS_ACTION + 1
+
+SENSE_PHASE = 'sense'
+MOVE_PHASE = 'move'
+
+
+def encode_move(move: Optional[chess.Move]) -> int:
+    """
+    :param move: The :class:`chess.Move` to encode, or `None` for a pass.
+    :return: The action for `move`.
+    """
+    if move is None:
+        return PASS_ACTION
+    promotion = 0 if move.promotion == chess.QUEEN else PROMOTIONS.index(move.promotion)
+    return (promotion * 64 + move.from_square) * 64 + move.to_square
+
+
+def decode_move(action: int) -> Optional[chess.Move]:
+    """
+    :param action: An action encoded with :func:`encode_move`.
+    :return: The :class:`chess.Move` for `action`, or `None` if `action` is :data:`PASS_ACTION`.
+    """
+    if action == PASS_ACTION:
+        return None
+    promotion, from_to = divmod(int(action), 64 * 64)
+    from_square, to_square = divmod(from_to, 64)
+    return chess.Move(from_square, to_square, PROMOTIONS[promotion])
+
+
+class RBCEnv(object):
+    """
+    An environment where an agent plays a :class:`LocalGame` against an opponent :class:`Player`.
+
+    Example usage: ::
+
+        env = RBCEnv(RandomBot)
+        observation = env.reset()
+        done = False
+        while not done:
+            action = np.random.choice(np.flatnonzero(env.action_mask()))
+            observation, reward, done, info = env.step(action)
+    """
+
+    def __init__(self, opponent_fn: Callable[[], Player], color: Optional[Color] = None, seed: Optional[int] = None,
+                 observation: Optional[np.ndarray] = None, **game_kwargs):
+        """
+        :param opponent_fn: A function that returns the opponent :class:`Player`, called at the start of each game.
+            A subclass of :class:`Player` can be used directly.
+        :param color: The color the agent plays as. Use None to pick a random color each game.
+        :param seed: Seed for picking random colors.
+        :param observation: An array with shape `(NUM_PLANES, 8, 8)` to write observations into. Allocated if not
+            given.
+        :param game_kwargs: Keyword arguments for :class:`LocalGame`. Clocks are unlimited by default.
+        """
+        self.opponent_fn = opponent_fn
+        self.color = color
+        self.random = random.Random(seed)
+        self.game_kwargs = dict(seconds_per_player=None, seconds_increment=None)
+        self.game_kwargs.update(game_kwargs)
+
+        self.observation = observation if observation is not None else \
+            np.zeros((NUM_PLANES, 8, 8), dtype=np.float32)
+
+        self.game = None
+        self.opponent = None
+        self.agent_color = None
+        self.phase = None
+        self._sense_actions = None
+        self._move_encodings = None
+
+    def reset(self) -> np.ndarray:
+        """
+        Starts a new game. If the agent is black, the opponent plays its first turn before this returns.
+
+        :return: The observation for the agent's first sense phase.
+        """
+        self.game = LocalGame(**self.game_kwargs)
+        self.opponent = self.opponent_fn()
+        self.agent_color = self.color if self.color is not None else self.random.choice(chess.COLORS)
+
+        agent_name = 'Agent'
+        opponent_name = self.opponent.__class__.__name__
+        if self.agent_color == chess.WHITE:
+            self.game.store_players(agent_name, opponent_name)
+        else:
+            self.game.store_players(opponent_name, agent_name)
+
+        self.game.enable_observation_planes(self.agent_color, self.observation)
+        self.opponent.handle_game_start(not self.agent_color, self.game.board.copy(), agent_name)
+        self.game.start()
+
+        if self.agent_color == chess.BLACK:
+            play_turn(self.game, self.opponent, end_turn_last=True)
+
+        self._start_agent_turn()
+        return self.observation
+
+    def _start_agent_turn(self):
+        self.phase = SENSE_PHASE
+        self._sense_actions = self.game.sense_actions()
+        self._move_encodings = {encode_move(move) for move in self.game.move_actions()}
+
+    def action_mask(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        :param out: Optional boolean array with shape `(NUM_ACTIONS,)` to write the mask into.
+        :return: A boolean array with shape `(NUM_ACTIONS,)` that is `True` for the valid actions in the current
+            phase.
+        """
+        if out is None:
+            out = np.zeros(NUM_ACTIONS, dtype=np.bool_)
+        else:
+            out[:] = False
+        if self.phase == SENSE_PHASE:
+            out[self._sense_actions] = True
+        else:
+            out[list(self._move_encodings)] = True
+        out[PASS_ACTION] = True
+        return out
+
+    def step(self, action: int) -> Tuple[np.ndarray, float, bool, dict]:
+        """
+        Applies the agent's action for the current phase. After a move step the opponent plays its turn before this
+        returns.
+
+        :param action: The action to take, see the module documentation.
+        :return: A tuple of the observation, the reward, whether the game is over, and an info dict. The reward is
+            `1` if the agent won, `-1` if it lost, and `0` otherwise. The info dict contains the `phase` of the next
+            step, and the `winner_color` and `win_reason` once the game is over.
+        :raises ValueError: If `action` is not valid in the current phase, see :meth:`action_mask`.
+        :raises RuntimeError: If the game is over, or :meth:`reset` wasn't called yet.
+        """
+        if self.phase is None:
+            raise RuntimeError('RBCEnv::step({}): the game is over, call reset() to start a new one.'.format(action))
+
+        if self.phase == SENSE_PHASE:
+            square = None if action == PASS_ACTION else int(action)
+            if square is not None and square not in self._sense_actions:
+                raise ValueError('RBCEnv::step({}): {} is not a valid sense action.'.format(action, action))
+            self.game.sense(square)
+            self.phase = MOVE_PHASE
+            return self.observation, 0.0, False, {'phase': self.phase}
+
+        if action != PASS_ACTION and action not in self._move_encodings:
+            raise ValueError('RBCEnv::step({}): {} is not a valid move action.'.format(action, action))
+        self.game.move(decode_move(action))
+        self.game.end_turn()
+
+        if not self.game.is_over():
+            play_turn(self.game, self.opponent, end_turn_last=True)
+
+        if self.game.is_over():
+            return self._end_game()
+
+        self._start_agent_turn()
+        return self.observation, 0.0, False, {'phase': self.phase}
+
+    def _end_game(self):
+        self.game.end()
+        winner_color = self.game.get_winner_color()
+        win_reason = self.game.get_win_reason()
+        self.opponent.handle_game_end(winner_color, win_reason, self.game.get_game_history())
+        self.phase = None
+
+        reward = 0.0 if winner_color is None else (1.0 if winner_color == self.agent_color else -1.0)
+        return self.observation, reward, True, {'phase': None, 'winner_color': winner_color, 'win_reason': win_reason}
+
+
+class VectorRBCEnv(object):
+    """
+    Steps several :class:`RBCEnv` one after the other in the same process. Observations and action masks for all
+    environments are written into shared batch arrays, and environments are reset automatically when their game ends.
+    """
+
+    def __init__(self, num_envs: int, opponent_fn: Callable[[], Player], seed: Optional[int] = None,
+                 observations: Optional[np.ndarray] = None, action_masks: Optional[np.ndarray] = None,
+                 **env_kwargs):
+        """
+        :param num_envs: The number of environments.
+        :param opponent_fn: See :class:`RBCEnv`.
+        :param seed: Seed for the environments. Environment i uses `seed + i`.
+        :param observations: Optional array with shape `(num_envs, NUM_PLANES, 8, 8)` to write observations into.
+        :param action_masks: Optional boolean array with shape `(num_envs, NUM_ACTIONS)` to write action masks into.
+        :param env_kwargs: Keyword arguments for :class:`RBCEnv`.
+        """
+        self.num_envs = num_envs
+        self.observations = observations if observations is not None else \
+            np.zeros((num_envs, NUM_PLANES, 8, 8), dtype=np.float32)
+        self.action_masks = action_masks if action_masks is not None else \
+            np.zeros((num_envs, NUM_ACTIONS), dtype=np.bool_)
+        self.envs = [RBCEnv(opponent_fn, seed=None if seed is None else seed + i, observation=self.observations[i],
+                            **env_kwargs) for i in range(num_envs)]
+
+    def reset(self) -> np.ndarray:
+        """
+        :return: The observations of all the environments, with shape `(num_envs, NUM_PLANES, 8, 8)`. This is the
+            same array on every call, updated in place.
+        """
+        for i, env in enumerate(self.envs):
+            env.reset()
+            env.action_mask(out=self.action_masks[i])
+        return self.observations
+
+    def step(self, actions: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[dict]]:
+        """
+        Steps every environment with its action. When an environment's game ends it is reset, and its info dict has
+        a copy of the final observation under `terminal_observation`.
+
+        :param actions: One action per environment.
+        :return: The observations, rewards, dones and info dicts of all the environments. :attr:`action_masks`
+            holds the valid actions for the next step.
+        """
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=np.bool_)
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            observation, rewards[i], dones[i], info = env.step(action)
+            if dones[i]:
+                info['terminal_observation'] = observation.copy()
+                env.reset()
+            env.action_mask(out=self.action_masks[i])
+            infos.append(info)
+        return self.observations, rewards, dones, infos
+
+    def close(self):
+        pass
+
+
+class VectorEnvWorkerError(Exception):
+    """Raised by a :class:`SubprocVectorRBCEnv` when an environment or its opponent raised an exception in a worker."""
+    pass
+
+
+def _shared_arrays(observations_buffer, action_masks_buffer, start: int, num_envs: int):
+    # numpy views of the observations and action masks of environments [start, start + num_envs) in the shared buffers
+    observations = np.frombuffer(observations_buffer, dtype=np.float32, count=num_envs * NUM_PLANES * 64,
+                                 offset=start * NUM_PLANES * 64 * 4).reshape(num_envs, NUM_PLANES, 8, 8)
+    action_masks = np.frombuffer(action_masks_buffer, dtype=np.bool_, count=num_envs * NUM_ACTIONS,
+                                 offset=start * NUM_ACTIONS).reshape(num_envs, NUM_ACTIONS)
+    return observations, action_masks
+
+
+def _vector_env_worker(connection, observations_buffer, action_masks_buffer, start, num_envs, opponent_fn, seed,
+                       env_kwargs):
+    observations, action_masks = _shared_arrays(observations_buffer, action_masks_buffer, start, num_envs)
+    env = VectorRBCEnv(num_envs, opponent_fn, seed=seed, observations=observations, action_masks=action_masks,
+                       **env_kwargs)
+    try:
+        while True:
+            command, data = connection.recv()
+            if command == 'close':
+                break
+            try:
+                if command == 'reset':
+                    env.reset()
+                    connection.send(('ok', None))
+                elif command == 'step':
+                    _, rewards, dones, infos = env.step(data)
+                    connection.send(('ok', (rewards, dones, infos)))
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        connection.close()
+
+
+class SubprocVectorRBCEnv(object):
+    """
+    Like :class:`VectorRBCEnv`, but the environments are split between worker processes that step in parallel.
+    Observations and action masks are written by the workers directly into shared memory, so only the actions,
+    rewards, dones and info dicts are sent between processes.
+
+    `opponent_fn` must be picklable, e.g. a :class:`Player` subclass or a module level function.
+    """
+
+    def __init__(self, num_envs: int, opponent_fn: Callable[[], Player], num_workers: Optional[int] = None,
+                 seed: Optional[int] = None, context: Optional[str] = None, **env_kwargs):
+        """
+        :param num_envs: The total number of environments.
+        :param opponent_fn: See :class:`RBCEnv`.
+        :param num_workers: The number of worker processes. Defaults to the number of CPUs, at most `num_envs`.
+        :param seed: Seed for the environments. Environment i uses `seed + i`.
+        :param context: The :mod:`multiprocessing` start method to use, e.g. `'fork'` or `'spawn'`.
+        :param env_kwargs: Keyword arguments for :class:`RBCEnv`.
+        """
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+        ctx = multiprocessing.get_context(context)
+
+        self.num_envs = num_envs
+        observations_buffer = ctx.RawArray('b', num_envs * NUM_PLANES * 64 * 4)
+        action_masks_buffer = ctx.RawArray('b', num_envs * NUM_ACTIONS)
+        self.observations, self.action_masks = _shared_arrays(observations_buffer, action_masks_buffer, 0, num_envs)
+
+        # split the environments as evenly as possible between the workers
+        bounds = [num_envs * i // num_workers for i in range(num_workers + 1)]
+        self.slices = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+        self.connections = []
+        self.processes = []
+        for worker_slice in self.slices:
+            parent_connection, child_connection = ctx.Pipe()
+            process = ctx.Process(target=_vector_env_worker, daemon=True, args=(
+                child_connection, observations_buffer, action_masks_buffer, worker_slice.start,
+                worker_slice.stop - worker_slice.start, opponent_fn,
+                None if seed is None else seed + worker_slice.start, env_kwargs))
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    def _receive(self) -> list:
+        # every worker is waited for before raising, so that none is left with a reply the next call would read
+        replies = [connection.recv() for connection in self.connections]
+        errors = [value for status, value in replies if status == 'error']
+        if errors:
+            raise VectorEnvWorkerError('environment raised an exception in a worker process:\n{}'.format(errors[0]))
+        return [value for _, value in replies]
+
+    def reset(self) -> np.ndarray:
+        """
+        See :meth:`VectorRBCEnv.reset`.
+
+        :raises VectorEnvWorkerError: If an environment raised an exception in a worker.
+        """
+        for connection in self.connections:
+            connection.send(('reset', None))
+        self._receive()
+        return self.observations
+
+    def step(self, actions: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[dict]]:
+        """
+        See :meth:`VectorRBCEnv.step`.
+
+        :raises VectorEnvWorkerError: If an environment raised an exception in a worker.
+        """
+        actions = list(actions)
+        for connection, worker_slice in zip(self.connections, self.slices):
+            connection.send(('step', actions[worker_slice]))
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=np.bool_)
+        infos = []
+        for worker_slice, (worker_rewards, worker_dones, worker_infos) in zip(self.slices, self._receive()):
+            rewards[worker_slice] = worker_rewards
+            dones[worker_slice] = worker_dones
+            infos.extend(worker_infos)
+        return self.observations, rewards, dones, infos
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(('close', None))
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
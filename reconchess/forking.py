@@ -0,0 +1,124 @@
+"""
+Helpers for starting game processes from a parent that has already loaded the bots, so that the memory of the loaded
+bots is shared copy-on-write between the processes instead of being loaded again in each one.
+"""
+import multiprocessing
+import multiprocessing.forkserver
+import os
+from typing import Iterable, Dict
+from .types import *
+
+START_METHODS = multiprocessing.get_all_start_methods()
+"""The :mod:`multiprocessing` start methods available on this platform."""
+
+
+def bot_module_name(bot_source: str) -> str:
+    """
+    :param bot_source: The path to a bot source file or a bot module name, as given to :func:`load_player`.
+    :return: The name of the module that :func:`load_player` imports for `bot_source`.
+    """
+    if os.path.exists(bot_source):
+        return os.path.splitext(os.path.basename(os.path.abspath(bot_source)))[0]
+    return bot_source
+
+
+def game_process_context(start_method: Optional[str], bot_sources: Iterable[str]):
+    """
+    Gets a :mod:`multiprocessing` context for game processes, call after the bots were loaded with
+    :func:`load_player`.
+
+    - `'fork'` forks game processes from the current process, so they share the already loaded bots copy-on-write.
+    - `'forkserver'` imports the bots once in the fork server, and forks game processes from it. The fork server is
+      started here, so the bots are only preloaded if it isn't running yet.
+    - `'spawn'` starts every game process from scratch, loading the bots again in each one.
+
+    :param start_method: One of :data:`START_METHODS`, or None for the platform default.
+    :param bot_sources: The bots that game processes will load, see :func:`bot_module_name`.
+    :return: A :mod:`multiprocessing` context.
+    """
+    ctx = multiprocessing.get_context(start_method)
+    if ctx.get_start_method() == 'forkserver':
+        bot_sources = list(bot_sources)
+        ctx.set_forkserver_preload(['reconchess'] + [bot_module_name(source) for source in bot_sources])
+
+        # the fork server is a new interpreter that doesn't get our sys.path, so it can only import bot source files
+        # if their directories are on its PYTHONPATH
+        directories = [os.path.dirname(os.path.abspath(source)) for source in bot_sources if os.path.exists(source)]
+        python_path = os.environ.get('PYTHONPATH')
+        os.environ['PYTHONPATH'] = os.pathsep.join(directories + ([python_path] if python_path else []))
+        try:
+            multiprocessing.forkserver.ensure_running()
+        finally:
+            if python_path is None:
+                del os.environ['PYTHONPATH']
+            else:
+                os.environ['PYTHONPATH'] = python_path
+    return ctx
+
+
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    :param pid: A process id.
+    :return: The `rss`, `pss`, `shared` and `private` memory of the process in bytes, or None if it isn't available.
+        Only Linux is supported. `pss` divides each shared page between the processes that share it.
+    """
+    try:
+        with open('/proc/{}/smaps_rollup'.format(pid)) as fp:
+            lines = fp.readlines()
+    except OSError:
+        return None
+
+    fields = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 3 and parts[2] == 'kB':
+            fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def memory_usage(pids: Iterable[int]) -> Optional[Dict[str, int]]:
+    """
+    :param pids: The process ids to include, e.g. the current process and its game processes.
+    :return: The number of `processes` whose memory is available, and the sum of their `rss` and `pss` in bytes, or
+        None if memory usage isn't available for any of them. See :func:`process_memory`.
+    """
+    usages = [usage for usage in map(process_memory, pids) if usage is not None]
+    if not usages:
+        return None
+
+    return {
+        'processes': len(usages),
+        'rss': sum(usage['rss'] for usage in usages),
+        'pss': sum(usage['pss'] for usage in usages),
+    }
+
+
+def format_memory_usage(usage: Dict[str, int]) -> str:
+    """
+    Summarizes how much memory is shared between processes. The savings are the memory that would be used if every
+    process had its own copy of the pages it shares (the sum of RSS), minus the memory actually used (the sum of PSS).
+
+    :param usage: The memory usage of the processes, see :func:`memory_usage`.
+    :return: A one line summary.
+    """
+    mb = 1024 * 1024
+    rss = usage['rss']
+    pss = usage['pss']
+    return '{} processes: {:.1f} MB resident if unshared, {:.1f} MB proportional, ' \
+           '{:.1f} MB ({:.0%}) saved by copy-on-write sharing'.format(usage['processes'], rss / mb, pss / mb,
+                                                                      (rss - pss) / mb, (rss - pss) / rss if rss else 0)
+
+
+def memory_report(pids: Iterable[int]) -> Optional[str]:
+    """
+    :param pids: The process ids to include, e.g. the current process and its game processes.
+    :return: :func:`format_memory_usage` of the processes, or None if memory usage isn't available.
+    """
+    usage = memory_usage(pids)
+    return format_memory_usage(usage) if usage is not None else None
@@ -1,13 +1,17 @@
 from abc import abstractmethod
-from datetime import datetime
 import math
-from typing import Optional
+import random
+from typing import Optional, Callable
 
 import chess
+import logging
 import requests
 import time
 from .utilities import *
 from .history import GameHistory, GameHistoryDecoder
+from .request_metrics import RequestMetricsSink, send_request
+
+logger = logging.getLogger(__name__)
 
 
 class Game(object):
@@ -131,6 +135,40 @@ class Game(object):
         pass
 
 
+class VirtualClock(object):
+    """
+    A deterministic clock for :class:`LocalGame`. Time only passes when the game charges for an action, so games
+    played with the same actions use the same amount of time regardless of how long the players take.
+
+    The default costs stand in for a bot that thinks for a few seconds per turn. Together they are a second more than
+    the default `seconds_increment` of :class:`LocalGame`, so with the default settings each clock loses a second per
+    turn and a long enough game times out. Pass costs of 0 to stop time entirely.
+    """
+
+    SENSE_COST = 3.0
+    """Default seconds charged for each sense."""
+
+    MOVE_COST = 3.0
+    """Default seconds charged for each move."""
+
+    def __init__(self, sense_cost: Optional[float] = None, move_cost: Optional[float] = None):
+        """
+        :param sense_cost: Seconds charged for each call to :meth:`LocalGame.sense`. Default is :attr:`SENSE_COST`.
+        :param move_cost: Seconds charged for each call to :meth:`LocalGame.move`. Default is :attr:`MOVE_COST`.
+        """
+        sense_cost = self.SENSE_COST if sense_cost is None else sense_cost
+        move_cost = self.MOVE_COST if move_cost is None else move_cost
+        self.sense_cost = sense_cost
+        self.move_cost = move_cost
+        self.seconds = 0.0
+
+    def __call__(self) -> float:
+        return self.seconds
+
+    def advance(self, seconds: float):
+        self.seconds += seconds
+
+
 class LocalGame(Game):
     """
     The local implementation of :class:`Game`. Used to run games locally instead of remotely via a server.
@@ -142,6 +180,7 @@ class LocalGame(Game):
             seconds_increment: Optional[float] = 5,
             reversible_moves_limit: Optional[int] = 100,
             full_turn_limit: Optional[int] = None,
+            clock: Optional[Callable[[], float]] = None,
     ):
         """
         Constructs the Game object
@@ -154,6 +193,8 @@ class LocalGame(Game):
             Use None for unlimited. Default is 100 (a non-optional version of the "`50-move rule`_").
         :param full_turn_limit: Maximum number of full turns (both players move) before game is a draw.
             Use None for unlimited. Default is None.
+        :param clock: Function returning the current time in seconds, used for the players' clocks. Pass a
+            :class:`VirtualClock` to make the time used deterministic. Default is :func:`time.monotonic`.
 
         .. _50-move rule: https://en.wikipedia.org/wiki/Fifty-move_rule
         """
@@ -161,6 +202,8 @@ class LocalGame(Game):
         self.seconds_increment = seconds_increment if seconds_increment is not None else 0
         self.reversible_moves_limit = reversible_moves_limit if reversible_moves_limit is not None else math.inf
         self.full_turn_limit = full_turn_limit if full_turn_limit is not None else math.inf
+        self.clock = clock if clock is not None else time.monotonic
+        self._virtual_clock = clock if isinstance(clock, VirtualClock) else None
 
         self.turn = chess.WHITE
         self.board = chess.Board()
@@ -177,13 +220,59 @@ class LocalGame(Game):
 
         self.move_results = None
 
+        # (board state, value) pairs so the values are only recomputed when the board changes
+        self._move_actions_cache = None
+        self._fen_cache = None
+
+        # color -> ObservationEncoder, for colors that enabled observation planes
+        self._observation_encoders = {}
+
+    def _board_state(self):
+        board = self.board
+        return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+                board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.castling_rights,
+                board.ep_square, board.turn, board.halfmove_clock, board.fullmove_number)
+
+    def _fen(self) -> str:
+        state = self._board_state()
+        if self._fen_cache is None or self._fen_cache[0] != state:
+            self._fen_cache = state, self.board.fen(en_passant='fen')
+        return self._fen_cache[1]
+
+    def enable_observation_planes(self, color: Color, planes=None):
+        """
+        Starts encoding the observations of `color` as bitplanes, see :mod:`reconchess.observation`. The planes are
+        updated in place by :meth:`sense`, :meth:`move` and :meth:`end_turn`, so that they are current when each of the
+        player's callbacks is called. Requires `numpy`.
+
+        :param color: The color of the player.
+        :param planes: Optional `numpy.float32` array with shape `(NUM_PLANES, 8, 8)` to write the planes into.
+        :return: The array of observation planes.
+        """
+        from .observation import ObservationEncoder
+
+        encoder = ObservationEncoder(color, planes)
+        if color == self.turn:
+            encoder.start_turn(self.board, self.move_results)
+        self._observation_encoders[color] = encoder
+        return encoder.planes
+
+    def get_observation_planes(self, color: Color):
+        """
+        :param color: The color of the player.
+        :return: The array of observation planes of `color`, or None if :meth:`enable_observation_planes` wasn't
+            called for `color`.
+        """
+        encoder = self._observation_encoders.get(color)
+        return encoder.planes if encoder is not None else None
+
     def start(self):
         """
         Starts off the clock for the first player.
 
         :return: None.
         """
-        self.current_turn_start_time = datetime.now()
+        self.current_turn_start_time = self.clock()
 
     def end(self):
         """
@@ -204,8 +293,8 @@ class LocalGame(Game):
         """
         :return: The amount of seconds left for the current player.
         """
-        if not self._is_finished and self.current_turn_start_time:
-            elapsed_since_turn_start = (datetime.now() - self.current_turn_start_time).total_seconds()
+        if not self._is_finished and self.current_turn_start_time is not None:
+            elapsed_since_turn_start = self.clock() - self.current_turn_start_time
             return self.seconds_left_by_color[self.turn] - elapsed_since_turn_start
         else:
             return self.seconds_left_by_color[self.turn]
@@ -220,7 +309,13 @@ class LocalGame(Game):
         """
         :return: List of moves that are possible with only knowledge of your pieces
         """
-        return None if self._is_finished else move_actions(self.board)
+        if self._is_finished:
+            return None
+
+        state = self._board_state()
+        if self._move_actions_cache is None or self._move_actions_cache[0] != state:
+            self._move_actions_cache = state, move_actions(self.board)
+        return list(self._move_actions_cache[1])
 
     def opponent_move_results(self) -> Optional[Square]:
         return self.move_results
@@ -229,23 +324,21 @@ class LocalGame(Game):
         if self._is_finished:
             return []
 
-        if square is None:
-            # don't sense anything
-            sense_result = []
-        else:
-            if square not in self.sense_actions():
-                raise ValueError('LocalGame::sense({}): {} is not a valid square.'.format(square, square))
+        if square is not None and square not in self.sense_actions():
+            raise ValueError('LocalGame::sense({}): {} is not a valid square.'.format(square, square))
 
-            rank, file = chess.square_rank(square), chess.square_file(square)
-            sense_result = []
-            for delta_rank in [1, 0, -1]:
-                for delta_file in [-1, 0, 1]:
-                    if 0 <= rank + delta_rank <= 7 and 0 <= file + delta_file <= 7:
-                        sense_square = chess.square(file + delta_file, rank + delta_rank)
-                        sense_result.append((sense_square, self.board.piece_at(sense_square)))
+        # sensing None doesn't sense anything
+        sense_result = sense_on(self.board, square)
 
         self.__game_history.store_sense(self.turn, square, sense_result)
 
+        if self._virtual_clock is not None:
+            self._virtual_clock.advance(self._virtual_clock.sense_cost)
+
+        encoder = self._observation_encoders.get(self.turn)
+        if encoder is not None:
+            encoder.sense(self.board, square)
+
         return sense_result
 
     def move(self, requested_move: Optional[chess.Move]) \
@@ -253,41 +346,31 @@ class LocalGame(Game):
         if self._is_finished:
             return requested_move, None, None
 
-        if requested_move is None:
-            # pass move
-            taken_move = None
-
-            # doesn't capture anything
-            opt_capture_square = None
-        else:
-            # add in a queen promotion if the move doesn't have one but could have one
-            move = add_pawn_queen_promotion(self.board, requested_move)
-            if move not in self.move_actions():
-                raise ValueError('Requested move {} was not in move_actions()'.format(requested_move))
-
-            # calculate taken move
-            taken_move = self._revise_move(move)
-
-            # calculate capture square
-            opt_capture_square = capture_square_of_move(self.board, taken_move)
+        # passing is always allowed
+        allowed_moves = self.move_actions() if requested_move is not None else None
+        taken_move, opt_capture_square = take_move(self.board, requested_move, allowed_moves)
 
         # store move information before the move is pushed, as pushing a move
         # will change the turn over to the opponent
         self.__game_history.store_move(self.turn, requested_move, taken_move, opt_capture_square)
-        self.__game_history.store_fen_before_move(self.turn, self.board.fen(en_passant='fen'))
+        self.__game_history.store_fen_before_move(self.turn, self._fen())
 
         # apply move
         self.board.push(taken_move if taken_move is not None else chess.Move.null())
 
-        self.__game_history.store_fen_after_move(self.turn, self.board.fen(en_passant='fen'))
+        self.__game_history.store_fen_after_move(self.turn, self._fen())
 
         # store results of move for notifying other player
         self.move_results = opt_capture_square
 
-        return requested_move, taken_move, opt_capture_square
+        if self._virtual_clock is not None:
+            self._virtual_clock.advance(self._virtual_clock.move_cost)
+
+        encoder = self._observation_encoders.get(self.turn)
+        if encoder is not None:
+            encoder.move(self.board, opt_capture_square)
 
-    def _revise_move(self, move):
-        return revise_move(self.board, move)
+        return requested_move, taken_move, opt_capture_square
 
     def end_turn(self):
         """
@@ -299,12 +382,16 @@ class LocalGame(Game):
 
         :return: None
         """
-        elapsed = datetime.now() - self.current_turn_start_time
-        self.seconds_left_by_color[self.turn] -= elapsed.total_seconds()
+        now = self.clock()
+        self.seconds_left_by_color[self.turn] -= now - self.current_turn_start_time
         self.seconds_left_by_color[self.turn] += self.seconds_increment
 
         self.turn = not self.turn
-        self.current_turn_start_time = datetime.now()
+        self.current_turn_start_time = now
+
+        encoder = self._observation_encoders.get(self.turn)
+        if encoder is not None:
+            encoder.start_turn(self.board, self.move_results)
 
     def get_game_history(self) -> Optional[GameHistory]:
         return self.__game_history if self.is_over() else None
@@ -365,80 +452,233 @@ class RemoteGame(Game):
 
     All the methods implemented are pass-throughs to the server. Each method submits a HTTP request to the corresponding
     end point on the server.
+
+    Requests advertise the newest JSON format this package supports in the `X-Reconchess-JSON-Version` header. Request
+    bodies are sent in the version 1 format until the server responds with a newer version in the same header.
+    Responses in any version are decoded.
+
+    The exceptions are :meth:`sense_actions` and :meth:`move_actions`, which only depend on the player's own pieces.
+    After :meth:`start`, the game mirrors the player's pieces from the starting board, its own taken moves, and the
+    squares where the opponent captured its pieces, and computes the actions from the mirror without a request.
+
+    Similarly, :meth:`get_seconds_left` only requests the player's clock once per turn, and extrapolates it with
+    :func:`time.monotonic` for the rest of the turn.
     """
 
-    def __init__(self, server_url, game_id, auth):
+    LATENCY_SMOOTHING = 0.2
+    """The weight of the newest round trip time in :attr:`latency`."""
+
+    JSON_VERSION_HEADER = 'X-Reconchess-JSON-Version'
+
+    POLL_INTERVAL = 0.5
+    """Seconds between requests to the server while :meth:`is_over` waits for the opponent."""
+
+    RETRY_INTERVAL = 0.5
+    """Seconds to wait before retrying a request that failed."""
+
+    def __init__(self, server_url, game_id, auth, mirror_actions: bool = True, verify_actions: float = 0.0,
+                 local_clock: bool = True, metrics: Optional[RequestMetricsSink] = None):
+        """
+        :param server_url: The URL of the server.
+        :param game_id: The id of the game on the server.
+        :param auth: The (username, password) to authenticate with.
+        :param mirror_actions: Whether to compute :meth:`sense_actions` and :meth:`move_actions` locally instead of
+            requesting them from the server.
+        :param verify_actions: The fraction of locally computed actions to check against the server, e.g. 1.0 while
+            debugging. The server's actions are used from then on if they ever differ.
+        :param local_clock: Whether to extrapolate :meth:`get_seconds_left` locally between requests to the server.
+        :param metrics: Optional :class:`RequestMetricsSink` to record every request to the server in, including
+            retries. :func:`play_remote_game` notifies it when the game ends. Requests that fail without a response
+            are also logged to the `reconchess.game` logger.
+        """
         self.game_url = '{}/api/games/{}'.format(server_url, game_id)
         self.session = requests.Session()
         self.session.auth = auth
+        self.session.headers[self.JSON_VERSION_HEADER] = str(CHESS_JSON_VERSION)
+        self.encoder_cls = ChessJSONEncoder
+        self.metrics = metrics
+
+        self.mirror_actions = mirror_actions
+        self.verify_actions = verify_actions
+        self._verify_rng = random.Random()
+        self._color = None
+        self._starting_board = None
+
+        # the player's own pieces, with the player to move, or None if actions are requested from the server
+        self._mirror = None
+
+        # the opponent move results of the current turn, once they have been requested
+        self._opponent_move_results = None
+        self._has_opponent_move_results = False
+
+        self.local_clock = local_clock
+        self.clock = time.monotonic
+        self.latency = None
+        """Smoothed round trip time of requests to the server in seconds, or None before the first request."""
+
+        # (seconds left, local time the server measured it) for the current turn, or None if not synced since the turn
+        # started
+        self._clock_sync = None
+
+    def _negotiate_json_version(self, response):
+        server_version = response.headers.get(self.JSON_VERSION_HEADER)
+        if server_version is not None and server_version.isdigit():
+            version = min(int(server_version), CHESS_JSON_VERSION)
+            self.encoder_cls = CHESS_JSON_ENCODERS.get(version, ChessJSONEncoder)
 
     def _get(self, endpoint, decoder_cls=ChessJSONDecoder):
         url = '{}/{}'.format(self.game_url, endpoint)
+        attempt = 0
         while True:
             try:
-                response = self.session.get(url)
+                response = send_request(self.session, 'GET', url, self.metrics, attempt)
                 if response.status_code == 200:
+                    self._negotiate_json_version(response)
                     return response.json(cls=decoder_cls)
                 elif response.status_code >= 500:
-                    time.sleep(0.5)
+                    time.sleep(self.RETRY_INTERVAL)
                 else:
                     raise ValueError(response.text)
             except requests.RequestException as e:
-                print(e)
-                time.sleep(0.5)
+                logger.warning('Retrying request to %s after error: %s', url, e)
+                time.sleep(self.RETRY_INTERVAL)
+            attempt += 1
 
     def _post(self, endpoint, obj):
         url = '{}/{}'.format(self.game_url, endpoint)
-        data = json.dumps(obj, cls=ChessJSONEncoder)
+        data = chess_json_dumps(obj, cls=self.encoder_cls)
+        attempt = 0
         while True:
             try:
-                response = self.session.post(url, data=data)
+                response = send_request(self.session, 'POST', url, self.metrics, attempt, data=data)
                 if response.status_code == 200:
+                    self._negotiate_json_version(response)
                     return response.json(cls=ChessJSONDecoder)
                 elif response.status_code >= 500:
-                    time.sleep(0.5)
+                    time.sleep(self.RETRY_INTERVAL)
                 else:
                     raise ValueError(response.text)
             except requests.RequestException as e:
-                print(e)
-                time.sleep(0.5)
+                logger.warning('Retrying request to %s after error: %s', url, e)
+                time.sleep(self.RETRY_INTERVAL)
+            attempt += 1
 
     def get_player_color(self):
-        return self._get('color')['color']
+        if self._color is None:
+            self._color = self._get('color')['color']
+        return self._color
 
     def get_starting_board(self):
-        return self._get('starting_board')['board']
+        if self._starting_board is None:
+            self._starting_board = self._get('starting_board')['board']
+        return self._starting_board.copy()
 
     def get_opponent_name(self):
         return self._get('opponent_name')['opponent_name']
 
+    def _verify(self, endpoint, actions, key=list):
+        if self.verify_actions <= 0 or self._verify_rng.random() >= self.verify_actions:
+            return actions
+
+        server_actions = self._get(endpoint)[endpoint]
+        if key(server_actions) != key(actions):
+            logger.warning('%s computed locally %s differ from the server %s, requesting them from the server from '
+                           'now on.', endpoint, actions, server_actions)
+            self._mirror = None
+        return server_actions
+
     def sense_actions(self) -> List[Square]:
-        return self._get('sense_actions')['sense_actions']
+        if self._mirror is None:
+            return self._get('sense_actions')['sense_actions']
+        return self._verify('sense_actions', list(chess.SQUARES))
 
     def move_actions(self) -> List[chess.Move]:
-        return self._get('move_actions')['move_actions']
+        if self._mirror is None:
+            return self._get('move_actions')['move_actions']
+
+        # the opponent may have captured one of our pieces since our last move
+        self.opponent_move_results()
+
+        # the server may generate en passant captures twice, so the order and duplicates are not compared
+        return self._verify('move_actions', move_actions(self._mirror), key=set)
+
+    def _sync_clock(self):
+        start = self.clock()
+        seconds_left = self._get('seconds_left')['seconds_left']
+        end = self.clock()
+
+        round_trip = end - start
+        if self.latency is None:
+            self.latency = round_trip
+        else:
+            self.latency += self.LATENCY_SMOOTHING * (round_trip - self.latency)
+
+        # assume the server measured the clock half way through the request
+        self._clock_sync = seconds_left, (start + end) / 2
 
     def get_seconds_left(self) -> float:
-        return self._get('seconds_left')['seconds_left']
+        """
+        :return: The seconds the player has left, requested from the server on the first call of each turn and
+            extrapolated locally after that.
+        """
+        if not self.local_clock:
+            return self._get('seconds_left')['seconds_left']
+
+        if self._clock_sync is None:
+            self._sync_clock()
+        seconds_left, synced_at = self._clock_sync
+        return seconds_left - (self.clock() - synced_at)
+
+    def get_usable_seconds_left(self) -> float:
+        """
+        :return: :meth:`get_seconds_left` minus the time the next request takes to reach the server, i.e. how long the
+            player can think before sending its next action.
+        """
+        seconds_left = self.get_seconds_left()
+        return seconds_left - self.latency / 2 if self.latency is not None else seconds_left
 
     def start(self):
+        if self.mirror_actions:
+            board = self.get_starting_board()
+            board.turn = self.get_player_color()
+            self._mirror = without_opponent_pieces(board)
         self._post('ready', {})
 
     def is_my_turn(self) -> bool:
         return self._get('is_my_turn')['is_my_turn']
 
     def opponent_move_results(self) -> Optional[Square]:
-        return self._get('opponent_move_results')['opponent_move_results']
+        if not self._has_opponent_move_results:
+            self._opponent_move_results = self._get('opponent_move_results')['opponent_move_results']
+            self._has_opponent_move_results = True
+
+            capture_square = self._opponent_move_results
+            if self._mirror is not None and capture_square is not None:
+                self._mirror.remove_piece_at(capture_square)
+                self._mirror.castling_rights &= ~chess.BB_SQUARES[capture_square]
+        return self._opponent_move_results
 
     def sense(self, square: Optional[Square]) -> List[Tuple[Square, Optional[chess.Piece]]]:
         return self._post('sense', {'square': square})['sense_result']
 
     def move(self, requested_move: Optional[chess.Move]) -> Tuple[
         Optional[chess.Move], Optional[chess.Move], Optional[Square]]:
-        return self._post('move', {'requested_move': requested_move})['move_result']
+        if self._mirror is not None:
+            self.opponent_move_results()
+
+        move_result = self._post('move', {'requested_move': requested_move})['move_result']
+
+        taken_move = move_result[1]
+        if self._mirror is not None and taken_move is not None:
+            self._mirror.push(taken_move)
+            self._mirror.turn = self._color
+            self._mirror.ep_square = None
+        return move_result
 
     def end_turn(self):
         self._post('end_turn', {})
+        self._has_opponent_move_results = False
+        self._clock_sync = None
 
     def is_over(self) -> bool:
         while True:
@@ -446,8 +686,10 @@ class RemoteGame(Game):
             if status['is_over']:
                 return True
             if status['is_my_turn']:
+                # a sync taken during the opponent's turn was of a clock that wasn't running
+                self._clock_sync = None
                 return False
-            time.sleep(0.5)
+            time.sleep(self.POLL_INTERVAL)
 
     def get_winner_color(self) -> Optional[Color]:
         return self._get('winner_color')['winner_color']
@@ -1,22 +1,88 @@
 import chess
 from .types import *
 from typing import Callable, TypeVar, Iterable, Mapping
+import gzip
 import json
 import math
-from .utilities import ChessJSONEncoder, ChessJSONDecoder
+import os
+from .utilities import ChessJSONEncoder, ChessJSONDecoder, chess_json_dump
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 T = TypeVar('T')
 
+# names of the getters that can be passed to GameHistory.collect
+_COLLECT_GETTER_NAMES = frozenset([
+    'sense', 'sense_result', 'requested_move', 'taken_move', 'capture_square', 'move_result',
+    'truth_board_before_move', 'truth_board_after_move', 'truth_fen_before_move', 'truth_fen_after_move',
+])
+
+
+def open_history_file(filename, mode: str = 'rb'):
+    """
+    Opens a game history file in binary mode. Files ending in `.gz` are gzip compressed and files ending in `.zst` are
+    zstandard compressed (requires the `zstandard` package), otherwise the file is not compressed. Compression and
+    decompression happen as the file is written and read.
+
+    :param filename: The path to the file.
+    :param mode: `'rb'` to read or `'wb'` to write.
+    :return: A file object.
+    """
+    filename = os.fspath(filename)
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode)
+    elif filename.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError('The zstandard package is required to read or write {}'.format(filename))
+        return zstandard.open(filename, mode)
+    else:
+        return open(filename, mode)
+
 
 class Turn(object):
     """
     The representation of a single turn in a game. Contains the color of the player who played this turn, as well
     as the number of turns the player has taken so far.
+
+    Turns are immutable and interned, so constructing the same turn twice returns the same object.
     """
 
-    def __init__(self, color: Color, turn_number: int):
-        self.color = color
-        self.turn_number = turn_number
+    __slots__ = ('color', 'turn_number')
+
+    _interned = {}
+
+    def __new__(cls, color: Color, turn_number: int):
+        key = (color, turn_number)
+        turn = cls._interned.get(key)
+        if turn is None:
+            turn = object.__new__(cls)
+            object.__setattr__(turn, 'color', color)
+            object.__setattr__(turn, 'turn_number', turn_number)
+            cls._interned[key] = turn
+        return turn
+
+    @classmethod
+    def from_ply(cls, ply: int):
+        """
+        :param ply: The index of the turn in the game, counting both players' turns.
+        :return: The :class:`Turn` at index `ply`. White's turns are the even indices and black's are the odd ones.
+        """
+        return cls(ply % 2 == 0, ply // 2)
+
+    @property
+    def ply(self) -> int:
+        """
+        :return: The index of this turn in the game, counting both players' turns. See :meth:`from_ply`.
+        """
+        return 2 * self.turn_number + (0 if self.color == chess.WHITE else 1)
 
     @property
     def next(self):
@@ -32,6 +98,15 @@ class Turn(object):
         """
         return Turn(not self.color, self.turn_number - (1 if self.color == chess.WHITE else 0))
 
+    def __setattr__(self, key, value):
+        raise AttributeError('Turn is immutable')
+
+    def __reduce__(self):
+        return Turn, (self.color, self.turn_number)
+
+    def __hash__(self):
+        return hash((self.color, self.turn_number))
+
     def __eq__(self, other):
         if not isinstance(other, Turn):
             return NotImplemented
@@ -42,18 +117,13 @@ class Turn(object):
         if not isinstance(other, Turn):
             return NotImplemented
 
-        if self.turn_number < other.turn_number:
-            return True
-        elif self.turn_number > other.turn_number:
-            return False
-        else:
-            return self.color == chess.WHITE and other.color == chess.BLACK
+        return self.ply < other.ply
 
     def __le__(self, other):
         if not isinstance(other, Turn):
             return NotImplemented
 
-        return self == other or self < other
+        return self.ply <= other.ply
 
     def __str__(self):
         return 'Turn({}, {})'.format(chess.COLOR_NAMES[self.color], self.turn_number)
@@ -124,20 +194,22 @@ class GameHistory(object):
 
     def save(self, filename):
         """
-        Save the game history to a json file.
+        Save the game history to a json file. The file is compressed if `filename` ends in `.gz` or `.zst`, see
+        :func:`open_history_file`.
 
         :param filename: The file to save to.
         """
-        with open(filename, 'w', newline='') as fp:
-            json.dump(self, fp, cls=GameHistoryEncoder)
+        with open_history_file(filename, 'wb') as fp:
+            chess_json_dump(self, fp, cls=GameHistoryEncoder)
 
     @classmethod
     def from_file(cls, filename):
         """
-        :param filename: The json file to load the :class:`GameHistory` object from.
+        :param filename: The json file to load the :class:`GameHistory` object from. Compressed files are
+            decompressed based on their extension, see :func:`open_history_file`.
         :return: The :class:`GameHistory` object that was originally saved to the file using :meth:`save`.
         """
-        with open(filename, newline='') as fp:
+        with open_history_file(filename) as fp:
             return json.load(fp, cls=GameHistoryDecoder)
 
     def store_players(self, white_name: str, black_name: str):
@@ -210,7 +282,15 @@ class GameHistory(object):
         :return: The number of turns saved in this object. If `color` is specified, get the number of turns for that
             player.
         """
-        return len(list(self.turns(color=color)))
+        if self.is_empty():
+            return 0
+
+        last_ply = self.last_turn().ply
+        if color is None:
+            return last_ply + 1
+        else:
+            # the number of plies of the player's color in [0, last_ply]
+            return (last_ply + (2 if color == chess.WHITE else 1)) // 2
 
     def turns(self, color: Color = None, start=0, stop=math.inf) -> Iterable[Turn]:
         """
@@ -246,15 +326,14 @@ class GameHistory(object):
             `color` is specified, gets the turns only for that player.
         """
         if self.is_empty():
-            return
+            return iter(())
 
-        turn = Turn(color if color is not None else chess.WHITE, start)
-        stop_turn = Turn(color if color is not None else chess.WHITE, stop)
-        last_turn = self.last_turn()
-        while turn <= last_turn and turn < stop_turn:
-            if color is None or turn.color == color:
-                yield turn
-            turn = turn.next
+        # turn numbers never exceed the number of turns, and range() needs ints, e.g. for the default stop of inf
+        stop = int(min(stop, self.num_turns()))
+        first_color = color if color is not None else chess.WHITE
+        first_ply = Turn(first_color, int(start)).ply
+        end_ply = min(self.last_turn().ply + 1, Turn(first_color, stop).ply)
+        return map(Turn.from_ply, range(first_ply, end_ply, 1 if color is None else 2))
 
     def is_first_turn(self, turn: Turn):
         """
@@ -619,13 +698,98 @@ class GameHistory(object):
         :param turns: The turns in question.
         :return: A list of the data, where each element is the value of the getter function on the corresponding turn.
         """
-        if get_turn_data_fn not in [self.sense, self.sense_result, self.requested_move, self.taken_move,
-                                    self.capture_square, self.move_result, self.truth_board_before_move,
-                                    self.truth_board_after_move, self.truth_fen_before_move, self.truth_fen_after_move]:
+        if getattr(get_turn_data_fn, '__self__', None) is not self or \
+                getattr(get_turn_data_fn, '__name__', None) not in _COLLECT_GETTER_NAMES:
             raise ValueError('get_turn_data_fn must be one of the history getter functions')
         for turn in turns:
             yield get_turn_data_fn(turn)
 
+    def senses(self, color: Color) -> List[Optional[Square]]:
+        """
+        Get all of a player's sense actions at once. Faster than calling :meth:`sense` for each turn.
+
+        Examples:
+            >>> history.senses(WHITE)
+            [E7, None, D4, ...]
+
+        :param color: The color of the player.
+        :return: A list where the i-th element is the sense action on :code:`Turn(color, i)`.
+        """
+        return list(self._senses[color])
+
+    def sense_results(self, color: Color) -> List[List[Tuple[Square, Optional[chess.Piece]]]]:
+        """
+        Get all of a player's sense results at once. Faster than calling :meth:`sense_result` for each turn.
+
+        :param color: The color of the player.
+        :return: A list where the i-th element is the sense result on :code:`Turn(color, i)`.
+        """
+        return list(self._sense_results[color])
+
+    def sense_results_array(self, color: Color):
+        """
+        Get all of a player's sense results stacked into a single `numpy` array. Requires `numpy` to be installed.
+
+        Each square is encoded as `-1` if it was not sensed, `0` if it was sensed and empty, or
+        :code:`piece_type + (0 if piece.color == WHITE else 6)` if it contained a piece. For example a white pawn is `1`
+        and a black king is `12`.
+
+        Examples:
+            >>> history.sense_results_array(WHITE).shape
+            (24, 64)
+
+        :param color: The color of the player.
+        :return: A `numpy.int8` array with shape `(num_senses, 64)`, where row i is the sense result on
+            :code:`Turn(color, i)` indexed by :class:`Square`.
+        """
+        if np is None:
+            raise ImportError('numpy is required for GameHistory.sense_results_array')
+
+        sense_results = self._sense_results[color]
+        rows, squares, values = [], [], []
+        for i, sense_result in enumerate(sense_results):
+            for square, piece in sense_result:
+                rows.append(i)
+                squares.append(square)
+                values.append(0 if piece is None else piece.piece_type + (0 if piece.color else 6))
+
+        array = np.full((len(sense_results), 64), -1, dtype=np.int8)
+        array[rows, squares] = values
+        return array
+
+    def requested_moves(self, color: Color) -> List[Optional[chess.Move]]:
+        """
+        Get all of a player's requested moves at once. Faster than calling :meth:`requested_move` for each turn.
+
+        :param color: The color of the player.
+        :return: A list where the i-th element is the requested move on :code:`Turn(color, i)`.
+        """
+        return list(self._requested_moves[color])
+
+    def taken_moves(self, color: Color) -> List[Optional[chess.Move]]:
+        """
+        Get all of a player's taken moves at once. Faster than calling :meth:`taken_move` for each turn.
+
+        Examples:
+            >>> history.taken_moves(WHITE)
+            [Move(E2, E4), None, Move(D1, H5), ...]
+
+        :param color: The color of the player.
+        :return: A list where the i-th element is the taken move on :code:`Turn(color, i)`.
+        """
+        return list(self._taken_moves[color])
+
+    def capture_squares(self, color: Color) -> List[Optional[Square]]:
+        """
+        Get all of the squares where a player captured an opponent piece at once. Faster than calling
+        :meth:`capture_square` for each turn.
+
+        :param color: The color of the player.
+        :return: A list where the i-th element is the capture square on :code:`Turn(color, i)`, or `None` if no capture
+            occurred.
+        """
+        return list(self._capture_squares[color])
+
     def __eq__(self, other):
         if not isinstance(other, GameHistory):
             return NotImplemented
@@ -653,7 +817,8 @@ class GameHistoryEncoder(ChessJSONEncoder):
                 'fens_before_move': o._fens_before_move,
                 'fens_after_move': o._fens_after_move,
                 'winner_color': o._winner_color,
-                'win_reason': o._win_reason,
+                # encoded here because orjson serializes enums by value without calling default()
+                'win_reason': self.default(o._win_reason) if o._win_reason is not None else None,
             }
         return super().default(o)
 
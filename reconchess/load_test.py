@@ -0,0 +1,335 @@
+"""
+Load testing of the remote play path. Games are played by bots in threads of this process, through the same
+:class:`RemoteGame` and :class:`reconchess.scripts.rc_connect.RBCServer` requests that :code:`rc-connect` makes, and
+every request and turn is timed. Invitations are accepted by the
+:class:`reconchess.scripts.rc_connect.InvitationManager` that :code:`rc-connect` uses. Use it against a :class:`reconchess.local_server.LocalServer` or a test deployment of
+the server, not against the tournament server. ::
+
+    with LocalServer(latency=0.02) as server:
+        results, saturation = find_saturation(server.url, lambda i: ('load{}'.format(i), 'password'))
+        for stats in results:
+            print(stats.format())
+
+The bots run in the same process as the measurements, so with many concurrent games the measured latencies include
+time spent waiting for the GIL. Bots that think for longer than :class:`RandomBot` make this worse.
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+import chess
+from typing import Callable
+from .types import *
+from .game import RemoteGame
+from .play import play_remote_game
+from .player import Player
+from .profiling import PhaseHooks, NO_TIMING
+from .request_metrics import RequestMetricsSink, endpoint_name
+from .bots.random_bot import RandomBot
+from .scripts.rc_connect import RBCServer, InvitationManager, PooledGameThread
+
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    :param values: The values, in any order.
+    :param q: The percentile, between 0 and 100.
+    :return: The nearest rank percentile of `values`, or None if there are none.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+class LoadStats(RequestMetricsSink):
+    """
+    The measurements of a load test. Can be updated from several threads. Requests are recorded by passing it as the
+    `metrics` of a :class:`RemoteGame` or an :class:`RBCServer`.
+    """
+
+    def __init__(self, concurrency: int = 1):
+        """
+        :param concurrency: The number of games played at the same time.
+        """
+        self.concurrency = concurrency
+        self.request_latencies = defaultdict(list)
+        """Endpoint name -> the seconds each request took, see :func:`endpoint_name`."""
+        self.statuses = defaultdict(Counter)
+        """Endpoint name -> HTTP status code, or exception class name for failed requests -> count."""
+        self.turn_latencies = []
+        """The seconds each turn took, from :func:`play_turn` starting to the turn ending."""
+        self.num_games = 0
+        self.num_failed_games = 0
+        self.seconds = 0.0
+        """The wall clock time of the load test."""
+        self._lock = threading.Lock()
+
+    def add_request(self, endpoint: str, seconds: float, status):
+        with self._lock:
+            self.request_latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def record_request(self, method: str, endpoint: str, status: Optional[int], duration_ns: int, bytes_sent: int,
+                       bytes_received: int, attempt: int, error: Optional[str] = None):
+        self.add_request(endpoint, duration_ns / 1e9, status if status is not None else error)
+
+    def add_turn(self, seconds: float):
+        with self._lock:
+            self.turn_latencies.append(seconds)
+
+    def add_game(self, failed: bool):
+        with self._lock:
+            self.num_games += 1
+            self.num_failed_games += failed
+
+    @property
+    def num_requests(self) -> int:
+        return sum(len(latencies) for latencies in self.request_latencies.values())
+
+    @property
+    def num_errors(self) -> int:
+        """The number of requests that failed, with an error status or an exception."""
+        return sum(count for statuses in self.statuses.values() for status, count in statuses.items()
+                   if not isinstance(status, int) or status >= 400)
+
+    @property
+    def num_retries(self) -> int:
+        """The number of requests that were retried, i.e. that failed with a 5xx status or an exception."""
+        return sum(count for statuses in self.statuses.values() for status, count in statuses.items()
+                   if not isinstance(status, int) or status >= 500)
+
+    @property
+    def turns_per_second(self) -> float:
+        return len(self.turn_latencies) / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> dict:
+        """
+        :return: The measurements as a JSON serializable dict, with latency percentiles in seconds.
+        """
+        def percentiles(values):
+            result = OrderedDict(('p{}'.format(q), percentile(values, q)) for q in PERCENTILES)
+            result['max'] = max(values) if values else None
+            return result
+
+        endpoints = OrderedDict()
+        for endpoint in sorted(self.request_latencies):
+            endpoints[endpoint] = OrderedDict([('count', len(self.request_latencies[endpoint]))])
+            endpoints[endpoint].update(percentiles(self.request_latencies[endpoint]))
+            endpoints[endpoint]['statuses'] = {str(status): count for status, count in self.statuses[endpoint].items()}
+
+        return OrderedDict([
+            ('concurrency', self.concurrency),
+            ('games', self.num_games),
+            ('failed_games', self.num_failed_games),
+            ('seconds', self.seconds),
+            ('turns', len(self.turn_latencies)),
+            ('turns_per_second', self.turns_per_second),
+            ('requests', self.num_requests),
+            ('errors', self.num_errors),
+            ('retries', self.num_retries),
+            ('turn_latency', percentiles(self.turn_latencies)),
+            ('endpoints', endpoints),
+        ])
+
+    def format(self) -> str:
+        """
+        :return: A human readable table of the measurements, with latencies in milliseconds.
+        """
+        def ms(seconds):
+            return '{:9.1f}'.format(seconds * 1000) if seconds is not None else '{:>9}'.format('-')
+
+        summary = self.summary()
+        lines = ['{} concurrent games: {} games ({} failed) in {:.1f}s, {:.1f} turns/s, {} requests, {} errors, '
+                 '{} retries'.format(self.concurrency, self.num_games, self.num_failed_games, self.seconds,
+                                     self.turns_per_second, self.num_requests, self.num_errors, self.num_retries),
+                 '{:<40}{:>8}'.format('', 'count') + ''.join('{:>9}'.format(key) for key in
+                                                              ['p{}'.format(q) for q in PERCENTILES] + ['max'])]
+        rows = [('turn', len(self.turn_latencies), summary['turn_latency'])]
+        rows += [(endpoint, stats['count'], stats) for endpoint, stats in summary['endpoints'].items()]
+        for name, count, stats in rows:
+            lines.append('{:<40}{:>8}'.format(name, count) + ''.join(ms(stats[key]) for key in
+                                                                      ['p{}'.format(q) for q in PERCENTILES] + ['max']))
+        return '\n'.join(lines)
+
+
+class _TurnTiming(object):
+    def __init__(self, stats: LoadStats):
+        self.stats = stats
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stats.add_turn(time.perf_counter() - self.start)
+
+
+class TurnTimer(PhaseHooks):
+    """A :class:`PhaseHooks` that adds the duration of every turn to a :class:`LoadStats`."""
+
+    def __init__(self, stats: LoadStats):
+        self.stats = stats
+
+    def phase(self, player, phase: str):
+        return _TurnTiming(self.stats) if phase == 'turn' else NO_TIMING
+
+
+class _LoadInvitationManager(InvitationManager):
+    # accepts invitations like rc-connect, but plays their games with play_fn(game_id) in threads of this process
+
+    def __init__(self, server: RBCServer, play_fn: Callable[[int], None], **kwargs):
+        super().__init__(server, None, 1, **kwargs)
+        self.play_fn = play_fn
+        self.finished = threading.Event()
+
+    def _play(self, invitation, game_id, finished):
+        try:
+            self.play_fn(game_id)
+        finally:
+            try:
+                self.server.copy().finish_invitation(invitation)
+            finally:
+                finished.value = True
+                self.finished.set()
+
+    def _start_game(self, invitation, game_id):
+        finished = self.ctx.Value('b', False)
+        thread = PooledGameThread(args=(invitation, game_id, finished), on_finish=self.wake, target=self._play)
+        # a game that hangs is given up on by play_load_game, and shouldn't keep the process alive
+        thread.daemon = True
+        thread.start()
+        return thread, finished
+
+
+def play_load_game(server_url: str, inviter_auth: Tuple[str, str], invitee_auth: Tuple[str, str],
+                   stats: LoadStats, bot_cls: Type[Player] = RandomBot, poll_interval: Optional[float] = None,
+                   invitation_poll_interval: float = 0.5, timeout: Optional[float] = None) -> bool:
+    """
+    Plays one game between two bots like :code:`rc-connect` does: the inviter sends an invitation, the invitee polls
+    for invitations, accepts it, and finishes it after the game with an :class:`InvitationManager`, and both play with
+    :func:`play_remote_game`. A game that can't be set up, e.g. because the invitation couldn't be sent, is recorded
+    as a failed game.
+
+    :param server_url: The URL of the server.
+    :param inviter_auth: The (username, password) of the bot that sends the invitation and plays white.
+    :param invitee_auth: The (username, password) of the bot that accepts the invitation and plays black.
+    :param stats: The :class:`LoadStats` to add the requests and turns to.
+    :param bot_cls: The class of the bots.
+    :param poll_interval: Seconds between requests while waiting for the opponent, see
+        :attr:`RemoteGame.POLL_INTERVAL`. Default is the :class:`RemoteGame` default.
+    :param invitation_poll_interval: Seconds between requests for invitations.
+    :param timeout: Seconds to wait for the game to finish, or None to wait forever.
+    :return: Whether both bots finished the game without an error.
+    """
+    inviter = RBCServer(server_url, inviter_auth, metrics=stats)
+    invitee = RBCServer(server_url, invitee_auth, metrics=stats)
+
+    try:
+        game_id = inviter.send_invitation(invitee_auth[0], chess.WHITE)
+    except Exception:
+        stats.add_game(True)
+        return False
+
+    errors = []
+    stop = threading.Event()
+
+    def play(auth, game_id):
+        try:
+            game = RemoteGame(server_url, game_id, auth, metrics=stats)
+            if poll_interval is not None:
+                game.POLL_INTERVAL = poll_interval
+            play_remote_game(server_url, game_id, auth, bot_cls(), hooks=TurnTimer(stats), game=game)
+        except Exception as e:
+            errors.append(e)
+
+    def accept_and_play():
+        # the invitee's only invitation is the one sent above
+        manager = _LoadInvitationManager(invitee, lambda accepted_id: play(invitee_auth, accepted_id),
+                                         min_poll_interval=invitation_poll_interval,
+                                         max_poll_interval=invitation_poll_interval)
+        try:
+            while not manager.finished.is_set() and not stop.is_set():
+                manager.step()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            manager.close()
+
+    threads = [threading.Thread(target=play, args=(inviter_auth, game_id), daemon=True),
+               threading.Thread(target=accept_and_play, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout)
+    stop.set()
+
+    failed = bool(errors) or any(thread.is_alive() for thread in threads)
+    stats.add_game(failed)
+    return not failed
+
+
+def run_load(server_url: str, auth_for: Callable[[int], Tuple[str, str]], num_games: int, concurrency: int,
+             **kwargs) -> LoadStats:
+    """
+    Plays `num_games` games with :func:`play_load_game`, `concurrency` at a time.
+
+    :param server_url: The URL of the server.
+    :param auth_for: Function from an index to the (username, password) of a bot. Indices `2 * i` and `2 * i + 1`
+        play the games of the `i`-th concurrent slot, so `2 * concurrency` different users are needed.
+    :param num_games: The number of games to play.
+    :param concurrency: The number of games to play at the same time.
+    :param kwargs: Keyword arguments for :func:`play_load_game`.
+    :return: The measurements.
+    """
+    stats = LoadStats(concurrency)
+    next_game = iter(range(num_games))
+    lock = threading.Lock()
+
+    def play_games(slot):
+        while True:
+            with lock:
+                if next(next_game, None) is None:
+                    return
+            play_load_game(server_url, auth_for(2 * slot), auth_for(2 * slot + 1), stats, **kwargs)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=play_games, args=(slot,), daemon=True) for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def find_saturation(server_url: str, auth_for: Callable[[int], Tuple[str, str]],
+                    levels: List[int] = (1, 2, 4, 8, 16, 32), games_per_level: Optional[int] = None,
+                    min_gain: float = 0.1, **kwargs) -> Tuple[List[LoadStats], Optional[int]]:
+    """
+    Runs :func:`run_load` at increasing numbers of concurrent games, until the number of turns played per second stops
+    growing or games fail.
+
+    :param server_url: The URL of the server.
+    :param auth_for: See :func:`run_load`.
+    :param levels: The numbers of concurrent games to try, in increasing order.
+    :param games_per_level: The number of games to play at each level. Default is twice the level.
+    :param min_gain: The smallest relative increase of turns per second that counts as an improvement.
+    :param kwargs: Keyword arguments for :func:`play_load_game`.
+    :return: The measurements at each level that was tried, and the saturation point: the last level that improved
+        the turns per second by at least `min_gain` without failed games, or None if even the first level had failed
+        games.
+    """
+    results = []
+    saturation = None
+    best = 0.0
+    for level in levels:
+        stats = run_load(server_url, auth_for, games_per_level or 2 * level, level, **kwargs)
+        results.append(stats)
+        if stats.num_failed_games > 0 or stats.turns_per_second < (1 + min_gain) * best:
+            break
+        saturation = level
+        best = stats.turns_per_second
+    return results, saturation
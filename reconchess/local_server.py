@@ -0,0 +1,543 @@
+import base64
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import chess
+from . import __version__
+from .types import *
+from .game import LocalGame
+from .history import GameHistoryEncoder
+from .utilities import ChessJSONDecoder, CHESS_JSON_VERSION, CHESS_JSON_ENCODERS, chess_json_dumps
+
+JSON_VERSION_HEADER = 'X-Reconchess-JSON-Version'
+
+
+class LocalServerError(Exception):
+    """An error response of the :class:`LocalServer`, with the HTTP status code of the response."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _User(object):
+    def __init__(self, user_id: int, username: str):
+        self.id = user_id
+        self.username = username
+        self.max_games = 4
+        self.ranked = False
+        self.version = 0
+
+
+class _Invitation(object):
+    def __init__(self, invitation_id: int, recipient: str, game_id: int):
+        self.id = invitation_id
+        self.recipient = recipient
+        self.game_id = game_id
+        self.accepted = False
+        self.finished = False
+
+
+class _ServerGame(object):
+    """A :class:`LocalGame` on the server, with the bookkeeping of the two players' requests."""
+
+    def __init__(self, game: LocalGame, white_name: str, black_name: str):
+        self.game = game
+        self.names = {chess.WHITE: white_name, chess.BLACK: black_name}
+        self.ready = set()
+        self.sensed = False
+        self.moved = False
+        self.lock = threading.Lock()
+        game.store_players(white_name, black_name)
+
+    def color_of(self, username: str) -> Color:
+        for color in chess.COLORS:
+            if self.names[color] == username:
+                return color
+        raise LocalServerError(401, 'Not a player in this game.')
+
+    def is_started(self) -> bool:
+        return len(self.ready) == 2
+
+    def is_over(self) -> bool:
+        game = self.game
+        if not game._is_finished and self.is_started() and game.is_over():
+            game.end()
+        return game._is_finished
+
+    def check_turn(self, color: Color):
+        if self.is_over():
+            raise LocalServerError(400, 'Game is finished.')
+        if not self.is_started() or self.game.turn != color:
+            raise LocalServerError(400, 'It is not your turn.')
+
+
+class LocalServer(object):
+    """
+    A local stand-in for the reconchess server, which implements the :ref:`reconchess-HTTP-api` used by
+    :class:`RemoteGame` and :code:`rc-connect`. Games are played on :class:`LocalGame` objects, and each request is
+    handled in its own thread, so any number of games can run at the same time.
+
+    Every request can be delayed by `latency` seconds plus up to `jitter` seconds, and a `failure_rate` fraction of
+    requests is answered with `failure_status` without being processed, like an overloaded server. The attributes can be
+    changed while the server is running.
+
+    There is no matchmaking for ranked games. Games are created by users sending each other invitations, or directly
+    with :meth:`create_game` and :meth:`invite`.
+
+    Example usage: ::
+
+        with LocalServer() as server:
+            game_id = server.create_game('alice', 'bob')
+            ...
+            play_remote_game(server.url, game_id, ('alice', 'password'), RandomBot())
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, passwords: Optional[dict] = None,
+                 latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, failure_status: int = 503,
+                 seconds_per_player: Optional[float] = 900, seconds_increment: Optional[float] = 5,
+                 json_version: int = CHESS_JSON_VERSION, seed: Optional[int] = None):
+        """
+        :param host: The host to listen on.
+        :param port: The port to listen on, or 0 for any free port. See :attr:`url`.
+        :param passwords: Username to password of the users that can log in, or None to let anyone log in with any
+            password.
+        :param latency: Seconds to wait before answering each request.
+        :param jitter: Maximum random seconds to wait on top of `latency`.
+        :param failure_rate: The fraction of requests to fail.
+        :param failure_status: The HTTP status code of failed requests.
+        :param seconds_per_player: See :class:`LocalGame`.
+        :param seconds_increment: See :class:`LocalGame`.
+        :param json_version: The newest version of the JSON format to answer with, see :class:`RemoteGame`.
+        :param seed: Seed for the random latencies and failures.
+        """
+        self.passwords = passwords
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.seconds_per_player = seconds_per_player
+        self.seconds_increment = seconds_increment
+        self.json_version = json_version
+        self.num_requests = 0
+        self.num_failures = 0
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._users = {}
+        self._games = {}
+        self._invitations = {}
+
+        self._http_server = _ThreadingHTTPServer((host, port), _RequestHandler)
+        self._http_server.local_server = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """The URL to pass to :class:`RemoteGame` and :code:`rc-connect` as the server URL."""
+        host, port = self._http_server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self) -> 'LocalServer':
+        """
+        Serves requests in a background thread.
+
+        :return: The server.
+        """
+        self._thread = threading.Thread(target=self._http_server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves requests in this thread until :meth:`stop` is called from another thread."""
+        self._http_server.serve_forever()
+
+    def stop(self):
+        """Stops serving requests and closes the socket."""
+        self._http_server.shutdown()
+        self._http_server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _user(self, username: str) -> _User:
+        with self._lock:
+            user = self._users.get(username)
+            if user is None:
+                user = self._users[username] = _User(len(self._users) + 1, username)
+            return user
+
+    def create_game(self, white_name: str, black_name: str) -> int:
+        """
+        :param white_name: The username of the white player.
+        :param black_name: The username of the black player.
+        :return: The id of the new game. It starts once both players have posted to its `ready` endpoint.
+        """
+        game = _ServerGame(LocalGame(self.seconds_per_player, self.seconds_increment), white_name, black_name)
+        with self._lock:
+            game_id = len(self._games) + 1
+            self._games[game_id] = game
+        return game_id
+
+    def invite(self, sender: str, recipient: str, color: Color) -> int:
+        """
+        Sends an invitation from one user to another, like the `/api/invitations/` endpoint.
+
+        :param sender: The username of the user sending the invitation.
+        :param recipient: The username of the user to invite.
+        :param color: The color of `sender`.
+        :return: The id of the game of the invitation.
+        """
+        names = {color: sender, not color: recipient}
+        game_id = self.create_game(names[chess.WHITE], names[chess.BLACK])
+        with self._lock:
+            invitation_id = len(self._invitations) + 1
+            self._invitations[invitation_id] = _Invitation(invitation_id, recipient, game_id)
+        return game_id
+
+    def get_game(self, game_id: int) -> LocalGame:
+        """
+        :param game_id: The id of a game.
+        :return: The :class:`LocalGame` the game is played on.
+        """
+        return self._game(game_id).game
+
+    def _game(self, game_id: int) -> _ServerGame:
+        game = self._games.get(game_id)
+        if game is None:
+            raise LocalServerError(404, 'Game {} does not exist.'.format(game_id))
+        return game
+
+    def _invitation(self, invitation_id: int, username: str) -> _Invitation:
+        invitation = self._invitations.get(invitation_id)
+        if invitation is None or invitation.recipient != username:
+            raise LocalServerError(400, 'Invitation {} does not exist.'.format(invitation_id))
+        return invitation
+
+    def authenticate(self, authorization: Optional[str]) -> str:
+        """
+        :param authorization: The value of the Authorization header of a request.
+        :return: The username of the user making the request.
+        :raises LocalServerError: With status 401 if the credentials are missing or wrong.
+        """
+        if authorization is None or not authorization.startswith('Basic '):
+            raise LocalServerError(401, 'Missing authentication information.')
+        try:
+            username, password = base64.b64decode(authorization[len('Basic '):]).decode().split(':', 1)
+        except ValueError:
+            raise LocalServerError(401, 'Malformed authentication information.')
+        if self.passwords is not None and self.passwords.get(username) != password:
+            raise LocalServerError(401, 'Invalid username or password.')
+        self._user(username)
+        return username
+
+    def handle(self, method: str, path: str, username: str, body) -> dict:
+        """
+        Answers an authenticated request.
+
+        :param method: `'GET'` or `'POST'`.
+        :param path: The path of the request, e.g. `'/api/games/1/color'`.
+        :param username: The user making the request.
+        :param body: The decoded JSON body of the request, or None.
+        :return: The JSON object of the response.
+        :raises LocalServerError: For error responses.
+        """
+        for route_method, pattern, handler in _ROUTES:
+            match = pattern.fullmatch(path)
+            if match is not None and route_method == method:
+                return handler(self, username, body or {}, *[int(group) for group in match.groups()])
+        raise LocalServerError(404, 'No endpoint {} {}.'.format(method, path))
+
+    # version and user endpoints
+
+    def _version(self, username, body):
+        return {'version': __version__}
+
+    def _active_users(self, username, body):
+        with self._lock:
+            return {'usernames': sorted(self._users)}
+
+    def _me(self, username, body):
+        user = self._user(username)
+        return {'id': user.id, 'username': user.username, 'max_games': user.max_games}
+
+    def _set_max_games(self, username, body):
+        if not isinstance(body.get('max_games'), int):
+            raise LocalServerError(400, 'max_games must be an integer.')
+        user = self._user(username)
+        user.max_games = body['max_games']
+        return {'id': user.id, 'username': user.username, 'max_games': user.max_games}
+
+    def _set_ranked(self, username, body):
+        if not isinstance(body.get('ranked'), bool):
+            raise LocalServerError(400, 'ranked must be a boolean.')
+        user = self._user(username)
+        user.ranked = body['ranked']
+        return {'id': user.id, 'username': user.username, 'ranked': user.ranked}
+
+    def _get_version(self, username, body):
+        user = self._user(username)
+        return {'id': user.id, 'username': user.username, 'version': user.version}
+
+    def _increment_version(self, username, body):
+        user = self._user(username)
+        user.version += 1
+        return {'id': user.id, 'username': user.username, 'version': user.version}
+
+    # invitation endpoints
+
+    def _get_invitations(self, username, body):
+        with self._lock:
+            return {'invitations': [invitation.id for invitation in self._invitations.values()
+                                    if invitation.recipient == username and not invitation.accepted]}
+
+    def _send_invitation(self, username, body):
+        if not isinstance(body.get('opponent'), str) or not isinstance(body.get('color'), bool):
+            raise LocalServerError(400, 'opponent must be a string and color a boolean.')
+        if self.passwords is not None and body['opponent'] not in self.passwords:
+            raise LocalServerError(400, 'User {} does not exist.'.format(body['opponent']))
+        return {'game_id': self.invite(username, body['opponent'], body['color'])}
+
+    def _accept_invitation(self, username, body, invitation_id):
+        with self._lock:
+            invitation = self._invitation(invitation_id, username)
+            if invitation.accepted:
+                raise LocalServerError(400, 'Invitation {} was already accepted.'.format(invitation_id))
+            invitation.accepted = True
+        return {'game_id': invitation.game_id}
+
+    def _finish_invitation(self, username, body, invitation_id):
+        invitation = self._invitation(invitation_id, username)
+        if not invitation.accepted:
+            raise LocalServerError(400, 'Invitation {} is not accepted.'.format(invitation_id))
+        invitation.finished = True
+        return {}
+
+    # game endpoints, which are called with the lock of the game held
+
+    def _color(self, server_game, color, body):
+        return {'color': color}
+
+    def _starting_board(self, server_game, color, body):
+        return {'board': chess.Board()}
+
+    def _opponent_name(self, server_game, color, body):
+        return {'opponent_name': server_game.names[not color]}
+
+    def _ready(self, server_game, color, body):
+        if color in server_game.ready:
+            raise LocalServerError(400, 'Already marked as ready.')
+        server_game.ready.add(color)
+        if server_game.is_started():
+            server_game.game.start()
+        return {}
+
+    def _sense_actions(self, server_game, color, body):
+        return {'sense_actions': server_game.game.sense_actions()}
+
+    def _move_actions(self, server_game, color, body):
+        return {'move_actions': server_game.game.move_actions()}
+
+    def _seconds_left(self, server_game, color, body):
+        if server_game.is_over():
+            raise LocalServerError(400, 'Game is finished.')
+        game = server_game.game
+        seconds_left = game.get_seconds_left() if game.turn == color else game.seconds_left_by_color[color]
+        return {'seconds_left': seconds_left}
+
+    def _opponent_move_results(self, server_game, color, body):
+        if server_game.is_over():
+            raise LocalServerError(400, 'Game is finished.')
+        return {'opponent_move_results': server_game.game.opponent_move_results()}
+
+    def _sense(self, server_game, color, body):
+        server_game.check_turn(color)
+        if server_game.sensed:
+            raise LocalServerError(400, 'Already sensed this turn.')
+        try:
+            sense_result = server_game.game.sense(body.get('square'))
+        except ValueError as e:
+            raise LocalServerError(400, str(e))
+        server_game.sensed = True
+        return {'sense_result': sense_result}
+
+    def _move(self, server_game, color, body):
+        server_game.check_turn(color)
+        if not server_game.sensed or server_game.moved:
+            raise LocalServerError(400, 'Must sense and then move once per turn.')
+        try:
+            move_result = server_game.game.move(body.get('requested_move'))
+        except ValueError as e:
+            raise LocalServerError(400, str(e))
+        server_game.moved = True
+        return {'move_result': move_result}
+
+    def _end_turn(self, server_game, color, body):
+        # the move may have ended the game, e.g. by capturing the king, but the turn still has to be ended
+        if not server_game.is_started() or server_game.game.turn != color:
+            raise LocalServerError(400, 'It is not your turn.')
+        if not server_game.moved:
+            raise LocalServerError(400, 'Must sense and move before ending the turn.')
+        if not server_game.is_over():
+            server_game.game.end_turn()
+            server_game.sensed = server_game.moved = False
+            server_game.is_over()
+        return {}
+
+    def _is_over(self, server_game, color, body):
+        return {'is_over': server_game.is_over()}
+
+    def _resign(self, server_game, color, body):
+        server_game.check_turn(color)
+        server_game.game.resign()
+        server_game.is_over()
+        return {}
+
+    def _error_resign(self, server_game, color, body):
+        game = server_game.game
+        if not server_game.is_over():
+            # the clock of the player to move is measured from the start of the turn
+            game.seconds_left_by_color[color] = 0
+            if game.turn == color and game.current_turn_start_time is not None:
+                game.current_turn_start_time = game.clock()
+            game.end()
+        return {}
+
+    def _is_my_turn(self, server_game, color, body):
+        return {'is_my_turn': self._my_turn(server_game, color)}
+
+    def _game_status(self, server_game, color, body):
+        return {'is_my_turn': self._my_turn(server_game, color), 'is_over': server_game.is_over()}
+
+    def _my_turn(self, server_game, color):
+        return server_game.is_started() and not server_game.is_over() and server_game.game.turn == color
+
+    def _winner_color(self, server_game, color, body):
+        self._check_over(server_game)
+        return {'winner_color': server_game.game.get_winner_color()}
+
+    def _win_reason(self, server_game, color, body):
+        self._check_over(server_game)
+        return {'win_reason': server_game.game.get_win_reason()}
+
+    def _game_history(self, server_game, color, body):
+        self._check_over(server_game)
+        return {'game_history': server_game.game.get_game_history()}
+
+    def _check_over(self, server_game):
+        if not server_game.is_over():
+            raise LocalServerError(400, 'Game is not over.')
+
+
+def _game_endpoint(handler):
+    def handle(server, username, body, game_id):
+        server_game = server._game(game_id)
+        color = server_game.color_of(username)
+        with server_game.lock:
+            return handler(server, server_game, color, body)
+    return handle
+
+
+_ROUTES = [
+    ('GET', '/api/version', LocalServer._version),
+    ('GET', '/api/users/', LocalServer._active_users),
+    ('POST', '/api/users/me', LocalServer._me),
+    ('POST', '/api/users/me/max_games', LocalServer._set_max_games),
+    ('POST', '/api/users/me/ranked', LocalServer._set_ranked),
+    ('GET', '/api/users/me/version', LocalServer._get_version),
+    ('POST', '/api/users/me/version', LocalServer._increment_version),
+    ('GET', '/api/invitations/', LocalServer._get_invitations),
+    ('POST', '/api/invitations/', LocalServer._send_invitation),
+    ('POST', r'/api/invitations/(\d+)', LocalServer._accept_invitation),
+    ('POST', r'/api/invitations/(\d+)/finish', LocalServer._finish_invitation),
+]
+for _method, _endpoint in [('GET', 'color'), ('GET', 'starting_board'), ('GET', 'opponent_name'), ('POST', 'ready'),
+                           ('GET', 'sense_actions'), ('GET', 'move_actions'), ('GET', 'seconds_left'),
+                           ('GET', 'opponent_move_results'), ('POST', 'sense'), ('POST', 'move'),
+                           ('POST', 'end_turn'), ('GET', 'is_over'), ('POST', 'resign'), ('POST', 'error_resign'),
+                           ('GET', 'is_my_turn'), ('GET', 'game_status'), ('GET', 'winner_color'),
+                           ('GET', 'win_reason'), ('GET', 'game_history')]:
+    _ROUTES.append((_method, r'/api/games/(\d+)/' + _endpoint, _game_endpoint(getattr(LocalServer, '_' + _endpoint))))
+_ROUTES = [(method, re.compile(pattern), handler) for method, pattern, handler in _ROUTES]
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 makes new connections wait for a retransmit when many games start at once
+    request_queue_size = 128
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    # keep connections alive, like the sessions of RemoteGame and RBCServer. the headers and the body are written
+    # separately, which would wait for delayed acknowledgements with Nagle's algorithm
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self, method):
+        server = self.server.local_server
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length) if length > 0 else b''
+
+        with server._lock:
+            server.num_requests += 1
+            delay = server.latency + server._rng.uniform(0, server.jitter) if server.jitter > 0 else server.latency
+            fail = server.failure_rate > 0 and server._rng.random() < server.failure_rate
+            if fail:
+                server.num_failures += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            self._respond(server.failure_status, 'Injected failure.')
+            return
+
+        client_version = self.headers.get(JSON_VERSION_HEADER)
+        version = min(int(client_version), server.json_version) if client_version and client_version.isdigit() else 1
+        try:
+            username = server.authenticate(self.headers.get('Authorization'))
+            body = json.loads(data.decode(), cls=ChessJSONDecoder) if data else None
+            obj = server.handle(method, self.path.split('?', 1)[0], username, body)
+        except LocalServerError as e:
+            self._respond(e.status, str(e))
+            return
+        except ValueError as e:
+            self._respond(400, str(e))
+            return
+
+        if 'game_history' in obj:
+            content = chess_json_dumps(obj, cls=GameHistoryEncoder)
+        else:
+            encoder_cls = CHESS_JSON_ENCODERS.get(version, CHESS_JSON_ENCODERS[1])
+            if isinstance(obj.get('win_reason'), WinReason):
+                # orjson serializes enums by value without calling default()
+                obj['win_reason'] = encoder_cls().default(obj['win_reason'])
+            content = chess_json_dumps(obj, cls=encoder_cls)
+        self._respond(200, content, 'application/json', {JSON_VERSION_HEADER: str(server.json_version)})
+
+    def _respond(self, status, content, content_type='text/plain', headers=None):
+        data = content.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
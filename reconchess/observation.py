@@ -0,0 +1,118 @@
+"""
+Encodes what a player observes during a game as `numpy` bitplanes. This module requires `numpy`.
+
+Observations are `numpy.float32` arrays with shape `(NUM_PLANES, 8, 8)`, indexed by `[plane, rank, file]`. The planes
+are described by the `*_PLANE(S)` constants in this module.
+"""
+import numpy as np
+import chess
+from .types import *
+from .utilities import SENSE_MASKS
+
+OWN_PIECE_PLANES = slice(0, 6)
+"""Your pieces, one plane per piece type in the order of :data:`chess.PIECE_TYPES`."""
+
+SENSED_PIECE_PLANES = slice(6, 12)
+"""Opponent pieces seen by your sense this turn, one plane per piece type."""
+
+SENSED_SQUARES_PLANE = 12
+"""The squares seen by your sense this turn."""
+
+CAPTURED_MY_PIECE_PLANE = 13
+"""The square where the opponent captured one of your pieces on their last move."""
+
+CAPTURED_OPPONENT_PIECE_PLANE = 14
+"""The square where you captured an opponent piece on your last move."""
+
+MOVE_PHASE_PLANE = 15
+"""All ones after you have sensed this turn, all zeros before."""
+
+COLOR_PLANE = 16
+"""All ones if you are white, all zeros if you are black."""
+
+NUM_PLANES = 17
+
+
+# SQUARE_BITS[square] is the bitboard of just that square
+SQUARE_BITS = np.array(chess.BB_SQUARES, dtype=np.uint64)
+
+
+class ObservationEncoder(object):
+    """
+    Keeps the observation planes of one player up to date from the true board of a game. The planes are updated in
+    place, and no arrays are allocated after construction.
+    """
+
+    def __init__(self, color: Color, planes: Optional[np.ndarray] = None):
+        """
+        :param color: The color of the player whose observations are encoded.
+        :param planes: A C-contiguous `numpy.float32` array with shape `(NUM_PLANES, 8, 8)` to write the observation
+            into. Allocated if not given.
+        """
+        self.color = color
+        self.planes = planes if planes is not None else np.zeros((NUM_PLANES, 8, 8), dtype=np.float32)
+
+        # scratch space for unpacking bitboards
+        self._flat_planes = self.planes.reshape(NUM_PLANES, 64)
+        self._bitboards = np.zeros((6, 1), dtype=np.uint64)
+        self._bits = np.zeros((6, 64), dtype=np.uint64)
+
+        self.reset()
+
+    def reset(self):
+        """Clears the planes for the start of a game."""
+        self.planes[:] = 0
+        self.planes[COLOR_PLANE] = 1 if self.color == chess.WHITE else 0
+
+    def _write_pieces(self, first_plane: int, board: chess.Board, mask: int):
+        # writes the bitboards of each piece type masked by `mask` to the 6 planes starting at `first_plane`
+        bitboards = self._bitboards
+        bitboards[0, 0] = board.pawns & mask
+        bitboards[1, 0] = board.knights & mask
+        bitboards[2, 0] = board.bishops & mask
+        bitboards[3, 0] = board.rooks & mask
+        bitboards[4, 0] = board.queens & mask
+        bitboards[5, 0] = board.kings & mask
+        np.bitwise_and(bitboards, SQUARE_BITS, out=self._bits)
+        np.not_equal(self._bits, 0, out=self._flat_planes[first_plane:first_plane + 6])
+
+    def _write_square(self, plane: int, square: Optional[Square]):
+        self.planes[plane] = 0
+        if square is not None:
+            self._flat_planes[plane, square] = 1
+
+    def start_turn(self, board: chess.Board, capture_square: Optional[Square]):
+        """
+        Updates the planes at the start of the player's turn.
+
+        :param board: The true board.
+        :param capture_square: The square where the opponent captured one of the player's pieces on their last move.
+        """
+        self._write_pieces(OWN_PIECE_PLANES.start, board, board.occupied_co[self.color])
+        self.planes[SENSED_PIECE_PLANES] = 0
+        self.planes[SENSED_SQUARES_PLANE] = 0
+        self._write_square(CAPTURED_MY_PIECE_PLANE, capture_square)
+        self.planes[MOVE_PHASE_PLANE] = 0
+
+    def sense(self, board: chess.Board, square: Optional[Square]):
+        """
+        Updates the planes after the player senses.
+
+        :param board: The true board.
+        :param square: The sensed square, or `None` if the player didn't sense.
+        """
+        mask = SENSE_MASKS[square] if square is not None else 0
+        self._write_pieces(SENSED_PIECE_PLANES.start, board, board.occupied_co[not self.color] & mask)
+        np.bitwise_and(SQUARE_BITS, np.uint64(mask), out=self._bits[0])
+        np.not_equal(self._bits[0], 0, out=self._flat_planes[SENSED_SQUARES_PLANE])
+        self.planes[MOVE_PHASE_PLANE] = 1
+
+    def move(self, board: chess.Board, capture_square: Optional[Square]):
+        """
+        Updates the planes after the player moves.
+
+        :param board: The true board after the move.
+        :param capture_square: The square where the player captured an opponent piece, if they did.
+        """
+        self._write_pieces(OWN_PIECE_PLANES.start, board, board.occupied_co[self.color])
+        self._write_square(CAPTURED_OPPONENT_PIECE_PLANE, capture_square)
@@ -1,12 +1,19 @@
+import random
+import threading
+from contextlib import contextmanager
 import chess
 from .types import *
 from .player import Player
-from .game import Game, LocalGame, RemoteGame
+from .game import Game, LocalGame, RemoteGame, VirtualClock
 from .history import GameHistory
+from .profiling import PhaseHooks, NO_HOOKS
+from .deadline import DeadlinePlayer
 
 
 def play_local_game(white_player: Player, black_player: Player, game: LocalGame = None,
-                    seconds_per_player: float = 900) -> Tuple[Optional[Color], Optional[WinReason], GameHistory]:
+                    seconds_per_player: float = 900, hooks: Optional[PhaseHooks] = None,
+                    seed: Optional[int] = None, ponder: bool = False, deadline_margin: Optional[float] = None) \
+        -> Tuple[Optional[Color], Optional[WinReason], GameHistory]:
     """
     Plays a game between the two players passed in. Uses :class:`LocalGame` to run the game, and just calls
     :func:`play_turn` until the game is over: ::
@@ -18,23 +25,44 @@ def play_local_game(white_player: Player, black_player: Player, game: LocalGame
     :param black_player: The black :class:`Player`.
     :param game: The :class:`LocalGame` object to use.
     :param seconds_per_player: The time each player has to play. Only used if `game` is not passed in.
+    :param hooks: Optional :class:`PhaseHooks` to instrument each turn with, see :func:`play_turn`.
+    :param seed: Optional seed to make the game reproducible. Each player's :attr:`Player.rng` is replaced with a
+        :class:`random.Random` seeded from `seed`, and if `game` is not passed in it uses a :class:`VirtualClock`.
+        Players that only use `self.rng` for randomness then produce identical game histories for the same seed.
+    :param ponder: Whether to let players ponder during their opponent's turns, see :meth:`Player.ponder`. The
+        players share the CPU while pondering, which slows down the player whose turn it is.
+    :param deadline_margin: Optional margin in seconds to run both players with deadlines, see
+        :class:`DeadlinePlayer`. Players that don't choose an action in time play the action they last published.
     :return: The results of the game, also passed to each player via :meth:`Player.handle_game_end`.
     """
-    players = [black_player, white_player]
+    if seed is not None:
+        rng = random.Random(seed)
+        white_player.rng = random.Random(rng.getrandbits(64))
+        black_player.rng = random.Random(rng.getrandbits(64))
 
     if game is None:
-        game = LocalGame(seconds_per_player=seconds_per_player)
+        game = LocalGame(seconds_per_player=seconds_per_player, clock=VirtualClock() if seed is not None else None)
 
     white_name = white_player.__class__.__name__
     black_name = black_player.__class__.__name__
     game.store_players(white_name, black_name)
 
+    if deadline_margin is not None:
+        white_player = DeadlinePlayer(white_player, deadline_margin)
+        black_player = DeadlinePlayer(black_player, deadline_margin)
+    players = [black_player, white_player]
+
+    for color, player in [(chess.WHITE, white_player), (chess.BLACK, black_player)]:
+        if player.wants_observation_planes:
+            player.handle_observation_planes(game.enable_observation_planes(color))
+
     white_player.handle_game_start(chess.WHITE, game.board.copy(), black_name)
     black_player.handle_game_start(chess.BLACK, game.board.copy(), white_name)
     game.start()
 
     while not game.is_over():
-        play_turn(game, players[game.turn], end_turn_last=True)
+        with pondering(players[not game.turn], enabled=ponder):
+            play_turn(game, players[game.turn], end_turn_last=True, hooks=hooks)
 
     game.end()
     winner_color = game.get_winner_color()
@@ -47,14 +75,34 @@ def play_local_game(white_player: Player, black_player: Player, game: LocalGame
     return winner_color, win_reason, game_history
 
 
-def play_remote_game(server_url, game_id, auth, player: Player):
-    game = RemoteGame(server_url, game_id, auth)
+def play_remote_game(server_url, game_id, auth, player: Player, hooks: Optional[PhaseHooks] = None,
+                     game: Optional[RemoteGame] = None):
+    """
+    Plays a game on a server with `player`, see :class:`RemoteGame`.
+
+    :param server_url: The URL of the server.
+    :param game_id: The id of the game on the server.
+    :param auth: The (username, password) to authenticate with.
+    :param player: The :class:`Player` to play the game with.
+    :param hooks: Optional :class:`PhaseHooks` to instrument each turn with, see :func:`play_turn`.
+    :param game: Optional :class:`RemoteGame` to play in, e.g. one constructed with non default options. Default is
+        `RemoteGame(server_url, game_id, auth)`.
+    :return: The winner color, win reason and :class:`GameHistory` of the game.
+    """
+    if game is None:
+        game = RemoteGame(server_url, game_id, auth)
 
     player.handle_game_start(game.get_player_color(), game.get_starting_board(), game.get_opponent_name())
     game.start()
 
-    while not game.is_over():
-        play_turn(game, player, end_turn_last=False)
+    while True:
+        # the opponent's turn, or the end of the game
+        with pondering(player):
+            is_over = game.is_over()
+        if is_over:
+            break
+
+        play_turn(game, player, end_turn_last=False, hooks=hooks)
 
     winner_color = game.get_winner_color()
     win_reason = game.get_win_reason()
@@ -62,10 +110,39 @@ def play_remote_game(server_url, game_id, auth, player: Player):
 
     player.handle_game_end(winner_color, win_reason, game_history)
 
+    if game.metrics is not None:
+        game.metrics.game_ended(game_id, game_history)
+
     return winner_color, win_reason, game_history
 
 
-def play_turn(game: Game, player: Player, end_turn_last=False):
+@contextmanager
+def pondering(player: Player, enabled: bool = True):
+    """
+    Runs :meth:`Player.ponder` in a background thread for the duration of the `with` block, if
+    :attr:`Player.wants_to_ponder` is `True`. On exit, the stop event is set and the thread is waited for. ::
+
+        with pondering(player):
+            is_over = game.is_over()
+
+    :param player: The :class:`Player` that is waiting for its turn.
+    :param enabled: Whether to ponder at all.
+    """
+    if not enabled or not player.wants_to_ponder:
+        yield
+        return
+
+    stop = threading.Event()
+    thread = threading.Thread(target=player.ponder, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def play_turn(game: Game, player: Player, end_turn_last=False, hooks: Optional[PhaseHooks] = None):
     """
     Coordinates playing a turn for `player` in `game`. Does the following sequentially:
 
@@ -78,18 +155,25 @@ def play_turn(game: Game, player: Player, end_turn_last=False):
     :param game: The :class:`Game` that `player` is playing in.
     :param player: The :class:`Player` whose turn it is.
     :param end_turn_last: Flag indicating whether to call :meth:`Game.end_turn` before or after :meth:`Player.handle_move_result`
+    :param hooks: Optional :class:`PhaseHooks` that each phase of the turn is run inside of, e.g. a :class:`PhaseTimer`.
     """
-    sense_actions = game.sense_actions()
-    move_actions = game.move_actions()
+    if hooks is None:
+        hooks = NO_HOOKS
 
-    notify_opponent_move_results(game, player)
+    with hooks.phase(player, 'turn'):
+        with hooks.phase(player, 'sense_actions'):
+            sense_actions = game.sense_actions()
+        with hooks.phase(player, 'move_actions'):
+            move_actions = game.move_actions()
 
-    play_sense(game, player, sense_actions, move_actions)
+        notify_opponent_move_results(game, player, hooks=hooks)
 
-    play_move(game, player, move_actions, end_turn_last=end_turn_last)
+        play_sense(game, player, sense_actions, move_actions, hooks=hooks)
 
+        play_move(game, player, move_actions, end_turn_last=end_turn_last, hooks=hooks)
 
-def notify_opponent_move_results(game: Game, player: Player):
+
+def notify_opponent_move_results(game: Game, player: Player, hooks: Optional[PhaseHooks] = None):
     """
     Passes the opponents move results to the player. Does the following sequentially:
 
@@ -98,12 +182,19 @@ def notify_opponent_move_results(game: Game, player: Player):
 
     :param game: The :class:`Game` that `player` is playing in.
     :param player: The :class:`Player` whose turn it is.
+    :param hooks: Optional :class:`PhaseHooks` that each phase is run inside of.
     """
-    opt_capture_square = game.opponent_move_results()
-    player.handle_opponent_move_result(opt_capture_square is not None, opt_capture_square)
+    if hooks is None:
+        hooks = NO_HOOKS
+
+    with hooks.phase(player, 'opponent_move_results'):
+        opt_capture_square = game.opponent_move_results()
+    with hooks.phase(player, 'handle_opponent_move_result'):
+        player.handle_opponent_move_result(opt_capture_square is not None, opt_capture_square)
 
 
-def play_sense(game: Game, player: Player, sense_actions: List[Square], move_actions: List[chess.Move]):
+def play_sense(game: Game, player: Player, sense_actions: List[Square], move_actions: List[chess.Move],
+               hooks: Optional[PhaseHooks] = None):
     """
     Runs the sense phase for `player` in `game`. Does the following sequentially:
 
@@ -115,13 +206,22 @@ def play_sense(game: Game, player: Player, sense_actions: List[Square], move_act
     :param player: The :class:`Player` whose turn it is.
     :param sense_actions: The possible sense actions for `player`.
     :param move_actions: The possible move actions for `player`.
+    :param hooks: Optional :class:`PhaseHooks` that each phase is run inside of.
     """
-    sense = player.choose_sense(sense_actions, move_actions, game.get_seconds_left())
-    sense_result = game.sense(sense)
-    player.handle_sense_result(sense_result)
+    if hooks is None:
+        hooks = NO_HOOKS
+
+    seconds_left = game.get_seconds_left()
+    with hooks.phase(player, 'choose_sense'):
+        sense = player.choose_sense(sense_actions, move_actions, seconds_left)
+    with hooks.phase(player, 'sense'):
+        sense_result = game.sense(sense)
+    with hooks.phase(player, 'handle_sense_result'):
+        player.handle_sense_result(sense_result)
 
 
-def play_move(game: Game, player: Player, move_actions: List[chess.Move], end_turn_last=False):
+def play_move(game: Game, player: Player, move_actions: List[chess.Move], end_turn_last=False,
+              hooks: Optional[PhaseHooks] = None):
     """
     Runs the move phase for `player` in `game`. Does the following sequentially:
 
@@ -137,15 +237,26 @@ def play_move(game: Game, player: Player, move_actions: List[chess.Move], end_tu
     :param player: The :class:`Player` whose turn it is.
     :param move_actions: The possible move actions for `player`.
     :param end_turn_last: Flag indicating whether to call :meth:`Game.end_turn` before or after :meth:`Player.handle_move_result`
+    :param hooks: Optional :class:`PhaseHooks` that each phase is run inside of.
     """
-    move = player.choose_move(move_actions, game.get_seconds_left())
-    requested_move, taken_move, opt_enemy_capture_square = game.move(move)
+    if hooks is None:
+        hooks = NO_HOOKS
+
+    seconds_left = game.get_seconds_left()
+    with hooks.phase(player, 'choose_move'):
+        move = player.choose_move(move_actions, seconds_left)
+    with hooks.phase(player, 'move'):
+        requested_move, taken_move, opt_enemy_capture_square = game.move(move)
 
     if not end_turn_last:
-        game.end_turn()
+        with hooks.phase(player, 'end_turn'):
+            game.end_turn()
 
-    player.handle_move_result(requested_move, taken_move,
-                              opt_enemy_capture_square is not None, opt_enemy_capture_square)
+    with hooks.phase(player, 'handle_move_result'):
+        player.handle_move_result(requested_move, taken_move,
+                                  opt_enemy_capture_square is not None, opt_enemy_capture_square)
 
     if end_turn_last:
-        game.end_turn()
+        with hooks.phase(player, 'end_turn'):
+            game.end_turn()
+
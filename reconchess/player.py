@@ -2,6 +2,8 @@ import os
 import sys
 import importlib
 import inspect
+import random
+import threading
 from abc import abstractmethod
 import chess
 from .types import *
@@ -25,7 +27,78 @@ class Player(object):
 
     Note that the :meth:`handle_game_start()` and :meth:`handle_game_end()` methods are only called at the start and
     the end of the game respectively. The rest are called repeatedly for each of your turns.
+
+    Players of a :class:`LocalGame` can also receive their observations as `numpy` bitplanes, see
+    :attr:`wants_observation_planes`, and any player can think during the opponent's turn, see :meth:`ponder()`.
+    """
+
+    rng = random
     """
+    The source of randomness for the player, with the interface of :class:`random.Random`. Defaults to the global
+    :mod:`random` module. :func:`play_local_game` replaces it with a seeded :class:`random.Random` when given a
+    `seed`, so players that only use `self.rng` play reproducibly.
+    """
+
+    wants_observation_planes = False
+    """
+    Set to `True` to have :func:`play_local_game` call :meth:`handle_observation_planes()` before
+    :meth:`handle_game_start()`. Requires `numpy`.
+    """
+
+    def handle_observation_planes(self, planes):
+        """
+        Provides your observations encoded as bitplanes, see :mod:`reconchess.observation`. The same array is updated in
+        place by the game before each of your callbacks, so it can be kept and read at any point of your turn.
+
+        Only called if :attr:`wants_observation_planes` is `True`, before :meth:`handle_game_start()`.
+
+        :param planes: A `numpy.float32` array with shape `(NUM_PLANES, 8, 8)`.
+        """
+        pass
+
+    deadline = None
+    """
+    When the player is run by a :class:`DeadlinePlayer`, the :func:`time.monotonic` time by which the running
+    :meth:`choose_sense()` or :meth:`choose_move()` has to return, otherwise `None`.
+    """
+
+    published_action = None
+    """The action last passed to :meth:`publish_action()`."""
+
+    def publish_action(self, action):
+        """
+        Publishes the best action found so far by the running :meth:`choose_sense()` or :meth:`choose_move()`, e.g. after
+        each iteration of a search. When the player is run by a :class:`DeadlinePlayer` and doesn't return before its
+        :attr:`deadline`, the published action is played instead.
+
+        :param action: A :class:`Square` or `None` during :meth:`choose_sense()`, a :class:`chess.Move` or `None`
+            during :meth:`choose_move()`.
+        """
+        self.published_action = action
+
+    wants_to_ponder = False
+    """
+    Set to `True` to have :meth:`ponder()` called while waiting for the opponent to play their turn.
+    """
+
+    def ponder(self, stop: threading.Event):
+        """
+        Provides a chance to think while the opponent plays their turn, e.g. to continue a search. Called from a
+        background thread when your turn ends, and only if :attr:`wants_to_ponder` is `True`. None of your other methods
+        are called until `ponder` returns.
+
+        Pondering is cooperative: `stop` is set as soon as the opponent's turn is over, and `ponder` should return
+        promptly after that, since the time until it returns is taken from your clock.
+
+        Example implementation: ::
+
+            def ponder(self, stop: threading.Event):
+                while not stop.is_set():
+                    self.search.iterate()
+
+        :param stop: Set when pondering should stop.
+        """
+        pass
 
     @abstractmethod
     def handle_game_start(self, color: Color, board: chess.Board, opponent_name: str):
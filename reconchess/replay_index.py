@@ -0,0 +1,223 @@
+import os
+import sqlite3
+import warnings
+import chess
+from typing import Iterable
+from .types import *
+from .history import GameHistory
+
+REPLAY_EXTENSIONS = ('.json', '.json.gz', '.json.zst')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    white_name TEXT,
+    black_name TEXT,
+    winner_color INTEGER,
+    win_reason TEXT,
+    num_white_turns INTEGER NOT NULL,
+    num_black_turns INTEGER NOT NULL,
+    num_turns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_white_name ON games (white_name);
+CREATE INDEX IF NOT EXISTS games_black_name ON games (black_name);
+"""
+
+_COLUMNS = ['path', 'white_name', 'black_name', 'winner_color', 'win_reason', 'num_white_turns', 'num_black_turns',
+            'num_turns']
+
+
+class IndexedGame(object):
+    """
+    A game found in a :class:`ReplayIndex`. The metadata is available without loading the replay file, and the
+    :class:`GameHistory` is only loaded the first time :attr:`history` is accessed.
+    """
+
+    def __init__(self, path: str, white_name: Optional[str], black_name: Optional[str], winner_color: Optional[Color],
+                 win_reason: Optional[WinReason], num_white_turns: int, num_black_turns: int, num_turns: int):
+        self.path = path
+        self.white_name = white_name
+        self.black_name = black_name
+        self.winner_color = winner_color
+        self.win_reason = win_reason
+        self.num_white_turns = num_white_turns
+        self.num_black_turns = num_black_turns
+        self.num_turns = num_turns
+        self._history = None
+
+    @property
+    def history(self) -> GameHistory:
+        """
+        :return: The :class:`GameHistory` stored in the replay file, loaded with :meth:`GameHistory.from_file`.
+        """
+        if self._history is None:
+            self._history = GameHistory.from_file(self.path)
+        return self._history
+
+    def __repr__(self):
+        return 'IndexedGame({!r})'.format(self.path)
+
+
+class ReplayIndex(object):
+    """
+    A SQLite index of the metadata of replay files saved with :meth:`GameHistory.save`, used to find games without
+    loading every replay.
+
+    Example usage: ::
+
+        index = ReplayIndex('replays.sqlite')
+        index.update('replays/')
+
+        # all games where MyBot lost by timeout as black in under 20 turns
+        for game in index.query(black_name='MyBot', winner_color=chess.WHITE, win_reason=WinReason.TIMEOUT,
+                                max_turns=19):
+            print(game.path, game.history.last_turn())
+    """
+
+    def __init__(self, db_path: str = ':memory:'):
+        """
+        :param db_path: The path to the SQLite database file. It is created if it doesn't exist.
+        """
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def update(self, directory: str, remove_missing: bool = True) -> int:
+        """
+        Indexes the replay files under `directory`. Only files that are new or were modified since they were last
+        indexed are loaded. Files that can't be read are skipped, see :meth:`add_files`.
+
+        :param directory: The directory to search for replay files, including sub directories.
+        :param remove_missing: Whether to remove games under `directory` whose files no longer exist.
+        :return: The number of replay files that were loaded.
+        """
+        paths = []
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename.endswith(REPLAY_EXTENSIONS):
+                    paths.append(os.path.abspath(os.path.join(dirpath, filename)))
+
+        num_loaded = self.add_files(paths)
+
+        if remove_missing:
+            prefix = os.path.join(os.path.abspath(directory), '')
+            existing = set(paths)
+            rows = self.connection.execute("SELECT path FROM games WHERE substr(path, 1, ?) = ?",
+                                           (len(prefix), prefix)).fetchall()
+            missing = [(path,) for path, in rows if path not in existing]
+            with self.connection:
+                self.connection.executemany('DELETE FROM games WHERE path = ?', missing)
+
+        return num_loaded
+
+    def add_files(self, paths: Iterable[str]) -> int:
+        """
+        Indexes the given replay files. Files that are already indexed and haven't been modified are skipped.
+
+        Files that can't be read, e.g. because they are corrupt or were deleted, are skipped with a warning and removed
+        from the index, and the rest are still indexed.
+
+        :param paths: The paths to the replay files.
+        :return: The number of replay files that were loaded.
+        """
+        indexed = {path: (mtime_ns, size) for path, mtime_ns, size in
+                   self.connection.execute('SELECT path, mtime_ns, size FROM games')}
+
+        rows = []
+        failed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+                if indexed.get(path) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                history = GameHistory.from_file(path)
+            except Exception as e:
+                warnings.warn('Skipping replay file {} that could not be read: {!r}'.format(path, e))
+                failed.append((path,))
+                continue
+
+            win_reason = history.get_win_reason()
+            num_white_turns = history.num_turns(chess.WHITE)
+            num_black_turns = history.num_turns(chess.BLACK)
+            rows.append((path, stat.st_mtime_ns, stat.st_size,
+                         history.get_white_player_name(), history.get_black_player_name(),
+                         history.get_winner_color(), win_reason.name if win_reason is not None else None,
+                         num_white_turns, num_black_turns, num_white_turns + num_black_turns))
+
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.connection.executemany('DELETE FROM games WHERE path = ?', failed)
+
+        return len(rows)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+    def query(self, white_name: Optional[str] = None, black_name: Optional[str] = None,
+              player_name: Optional[str] = None, winner_color: Optional[Color] = None,
+              loser_name: Optional[str] = None, win_reason: Optional[WinReason] = None,
+              min_turns: Optional[int] = None, max_turns: Optional[int] = None,
+              draws: Optional[bool] = None) -> List[IndexedGame]:
+        """
+        Finds the indexed games that match all of the given filters. Filters that are `None` are ignored.
+
+        :param white_name: The name of the white player.
+        :param black_name: The name of the black player.
+        :param player_name: The name of either player.
+        :param winner_color: The color of the winner.
+        :param loser_name: The name of the player who lost.
+        :param win_reason: The :class:`WinReason` of the game.
+        :param min_turns: Minimum number of turns in the game, counting both players, see
+            :meth:`GameHistory.num_turns`.
+        :param max_turns: Maximum number of turns in the game, counting both players.
+        :param draws: `True` to only find games without a winner, `False` to only find games with a winner.
+        :return: A list of :class:`IndexedGame` in path order.
+        """
+        conditions = []
+        params = []
+        for column, value in [('white_name', white_name), ('black_name', black_name),
+                              ('winner_color', winner_color)]:
+            if value is not None:
+                conditions.append('{} = ?'.format(column))
+                params.append(value)
+        if player_name is not None:
+            conditions.append('(white_name = ? OR black_name = ?)')
+            params += [player_name, player_name]
+        if loser_name is not None:
+            conditions.append('((white_name = ? AND winner_color = 0) OR (black_name = ? AND winner_color = 1))')
+            params += [loser_name, loser_name]
+        if win_reason is not None:
+            conditions.append('win_reason = ?')
+            params.append(win_reason.name)
+        if min_turns is not None:
+            conditions.append('num_turns >= ?')
+            params.append(min_turns)
+        if max_turns is not None:
+            conditions.append('num_turns <= ?')
+            params.append(max_turns)
+        if draws is not None:
+            conditions.append('winner_color IS NULL' if draws else 'winner_color IS NOT NULL')
+
+        sql = 'SELECT {} FROM games'.format(', '.join(_COLUMNS))
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY path'
+
+        games = []
+        for path, white, black, winner, reason, num_white_turns, num_black_turns, num_turns in \
+                self.connection.execute(sql, params):
+            games.append(IndexedGame(path, white, black, bool(winner) if winner is not None else None,
+                                     WinReason[reason] if reason is not None else None,
+                                     num_white_turns, num_black_turns, num_turns))
+        return games
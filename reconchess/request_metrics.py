@@ -0,0 +1,217 @@
+import json
+import os
+from abc import abstractmethod
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+import requests
+from .types import *
+from .history import GameHistory
+from .profiling import Histogram, BUCKET_BOUNDS_NS, elapsed_ns, _escape_label
+
+
+def endpoint_name(path: str) -> str:
+    """
+    :param path: The path of a request URL, e.g. `'/api/games/12/sense'`.
+    :return: The path with ids replaced by `<id>`, e.g. `'/api/games/<id>/sense'`.
+    """
+    return re.sub(r'/\d+(?=/|$)', '/<id>', path.split('?', 1)[0])
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    return len(body.encode()) if isinstance(body, str) else len(body)
+
+
+class RequestMetricsSink(object):
+    """
+    Interface for receiving metrics about the HTTP requests of :class:`RemoteGame` and
+    :class:`reconchess.scripts.rc_connect.RBCServer`. Pass an instance as their `metrics` argument. A sink may be shared
+    by several games, and called from several threads.
+    """
+
+    @abstractmethod
+    def record_request(self, method: str, endpoint: str, status: Optional[int], duration_ns: int, bytes_sent: int,
+                       bytes_received: int, attempt: int, error: Optional[str] = None):
+        """
+        :param method: The HTTP method, `'GET'` or `'POST'`.
+        :param endpoint: The path of the request with ids replaced, see :func:`endpoint_name`.
+        :param status: The HTTP status code of the response, or None if there was no response.
+        :param duration_ns: The time from sending the request to receiving the whole response, in nanoseconds.
+        :param bytes_sent: The size of the request body.
+        :param bytes_received: The size of the response body.
+        :param attempt: 0 for the first attempt of a request, and 1, 2, ... for its retries.
+        :param error: The class name of the exception raised instead of receiving a response, or None.
+        """
+        pass
+
+    def game_ended(self, game_id, game_history: Optional[GameHistory]):
+        """
+        Called by :func:`play_remote_game` when a game ends. Does nothing by default.
+
+        :param game_id: The id of the game on the server.
+        :param game_history: The :class:`GameHistory` of the game.
+        """
+        pass
+
+
+def send_request(session: requests.Session, method: str, url: str, metrics: Optional[RequestMetricsSink] = None,
+                 attempt: int = 0, **kwargs) -> requests.Response:
+    """
+    Sends a request with :meth:`requests.Session.request`, and records it in `metrics`.
+
+    :param session: The session to send the request with.
+    :param method: The HTTP method.
+    :param url: The URL of the request.
+    :param metrics: The :class:`RequestMetricsSink` to record the request in, or None.
+    :param attempt: See :meth:`RequestMetricsSink.record_request`.
+    :param kwargs: Keyword arguments for :meth:`requests.Session.request`.
+    :return: The response.
+    """
+    if metrics is None:
+        return session.request(method, url, **kwargs)
+
+    endpoint = endpoint_name(requests.utils.urlparse(url).path)
+    start = time.perf_counter()
+    try:
+        response = session.request(method, url, **kwargs)
+    except requests.RequestException as e:
+        bytes_sent = _body_size(e.request.body) if e.request is not None else 0
+        metrics.record_request(method, endpoint, None, elapsed_ns(start), bytes_sent, 0, attempt, e.__class__.__name__)
+        raise
+    metrics.record_request(method, endpoint, response.status_code, elapsed_ns(start), _body_size(response.request.body),
+                           len(response.content), attempt)
+    return response
+
+
+class _EndpointMetrics(object):
+    __slots__ = ('latency', 'statuses', 'retries', 'bytes_sent', 'bytes_received')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = Counter()
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def to_dict(self) -> dict:
+        return OrderedDict([
+            ('latency', self.latency.to_dict()),
+            ('statuses', OrderedDict((str(status), count) for status, count in sorted(self.statuses.items(), key=str))),
+            ('retries', self.retries),
+            ('bytes_sent', self.bytes_sent),
+            ('bytes_received', self.bytes_received),
+        ])
+
+
+class RequestMetrics(RequestMetricsSink):
+    """
+    A :class:`RequestMetricsSink` that aggregates the requests per method and endpoint: a latency :class:`Histogram`,
+    the count of each status code (or exception class name for requests without a response), the number of retries,
+    and the bytes sent and received.
+
+    With `output_dir`, the metrics are saved to `<game id>-requests.json` and the :class:`GameHistory` to
+    `<game id>.json` in `output_dir` at the end of each game, and then reset, so each file covers one game.
+
+    Example usage: ::
+
+        metrics = RequestMetrics()
+        game = RemoteGame(server_url, game_id, auth, metrics=metrics)
+        play_remote_game(server_url, game_id, auth, MyBot(), game=game)
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, output_dir: Optional[str] = None):
+        """
+        :param output_dir: Optional directory to save the metrics and history of each game to.
+        """
+        self.output_dir = output_dir
+        # (method, endpoint) -> _EndpointMetrics
+        self.endpoints = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record_request(self, method: str, endpoint: str, status: Optional[int], duration_ns: int, bytes_sent: int,
+                       bytes_received: int, attempt: int, error: Optional[str] = None):
+        with self._lock:
+            metrics = self.endpoints.get((method, endpoint))
+            if metrics is None:
+                metrics = self.endpoints[method, endpoint] = _EndpointMetrics()
+            metrics.latency.add(duration_ns)
+            metrics.statuses[status if status is not None else error] += 1
+            metrics.retries += attempt > 0
+            metrics.bytes_sent += bytes_sent
+            metrics.bytes_received += bytes_received
+
+    def reset(self):
+        """Discards all the metrics."""
+        with self._lock:
+            self.endpoints.clear()
+
+    def to_dict(self) -> dict:
+        """
+        :return: `{'<method> <endpoint>': {'latency': histogram dict, 'statuses': {status: count}, 'retries': count,
+            'bytes_sent': bytes, 'bytes_received': bytes}}`, see :meth:`Histogram.to_dict`.
+        """
+        with self._lock:
+            return OrderedDict(('{} {}'.format(method, endpoint), metrics.to_dict())
+                               for (method, endpoint), metrics in self.endpoints.items())
+
+    def to_json(self, **kwargs) -> str:
+        """
+        :param kwargs: Keyword arguments for :func:`json.dumps`.
+        :return: :meth:`to_dict` as a JSON string.
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = 'reconchess_request') -> str:
+        """
+        :param prefix: The prefix of the metric names.
+        :return: The metrics in the Prometheus text exposition format, labelled with `method` and `endpoint`: a
+            `<prefix>_duration_seconds` histogram, and `<prefix>s_total` (with a `status` label),
+            `<prefix>_retries_total`, `<prefix>_sent_bytes_total` and `<prefix>_received_bytes_total` counters.
+        """
+        duration = '{}_duration_seconds'.format(prefix)
+        lines = ['# HELP {} Time taken by HTTP requests.'.format(duration), '# TYPE {} histogram'.format(duration)]
+        counters = OrderedDict([('{}s_total'.format(prefix), []), ('{}_retries_total'.format(prefix), []),
+                                ('{}_sent_bytes_total'.format(prefix), []),
+                                ('{}_received_bytes_total'.format(prefix), [])])
+        with self._lock:
+            for (method, endpoint), metrics in self.endpoints.items():
+                labels = 'method="{}",endpoint="{}"'.format(method, _escape_label(endpoint))
+                cumulative = 0
+                for bound, count in zip(BUCKET_BOUNDS_NS, metrics.latency.bucket_counts):
+                    cumulative += count
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(duration, labels, repr(bound / 1e9), cumulative))
+                lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(duration, labels, metrics.latency.count))
+                lines.append('{}_sum{{{}}} {}'.format(duration, labels, repr(metrics.latency.sum_ns / 1e9)))
+                lines.append('{}_count{{{}}} {}'.format(duration, labels, metrics.latency.count))
+
+                requests_total, retries, sent, received = counters.values()
+                for status, count in sorted(metrics.statuses.items(), key=str):
+                    requests_total.append('{{{},status="{}"}} {}'.format(labels, _escape_label(str(status)), count))
+                retries.append('{{{}}} {}'.format(labels, metrics.retries))
+                sent.append('{{{}}} {}'.format(labels, metrics.bytes_sent))
+                received.append('{{{}}} {}'.format(labels, metrics.bytes_received))
+
+        for name, samples in counters.items():
+            lines.append('# TYPE {} counter'.format(name))
+            lines.extend(name + sample for sample in samples)
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path: str):
+        """
+        :param path: The path of the JSON file to save :meth:`to_dict` to.
+        """
+        with open(path, 'w') as fp:
+            fp.write(self.to_json(indent=2))
+
+    def game_ended(self, game_id, game_history: Optional[GameHistory]):
+        if self.output_dir is None:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.save(os.path.join(self.output_dir, '{}-requests.json'.format(game_id)))
+        if game_history is not None:
+            game_history.save(os.path.join(self.output_dir, '{}.json'.format(game_id)))
+        self.reset()
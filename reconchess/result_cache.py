@@ -0,0 +1,196 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+from . import __version__
+from .types import *
+from .game import LocalGame, VirtualClock
+from .history import GameHistory
+from .player import Player
+from .play import play_local_game
+
+CACHE_EXTENSION = '.json.gz'
+
+
+def player_source_hash(player_cls: Type[Player]) -> str:
+    """
+    :param player_cls: A subclass of :class:`Player`, e.g. as returned by :func:`load_player`.
+    :return: The sha256 hex digest of the source file of the module that defines `player_cls`. Note that other modules
+        imported by the bot are not included.
+    """
+    module = sys.modules[player_cls.__module__]
+    source_path = inspect.getsourcefile(module)
+    if source_path is None:
+        raise ValueError('Could not find the source file of {}'.format(player_cls))
+    with open(source_path, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+class ResultCache(object):
+    """
+    A content addressed cache of the results of seeded games between two bots. Seeded games are deterministic (see
+    :func:`play_local_game`), so a game is only played if its bots' source, the seed or the game configuration
+    changed since it was cached.
+
+    Each game is stored as a compressed :class:`GameHistory` file named after the hash of its inputs. When the files
+    take up more than `max_bytes`, the least recently used ones are deleted.
+
+    Example usage: ::
+
+        cache = ResultCache('.rbc-cache')
+        _, white_cls = load_player('my_bot.py')
+        _, black_cls = load_player('reconchess.bots.random_bot')
+        for seed in range(100):
+            winner_color, win_reason, history = cache.play(white_cls, black_cls, seed)
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = 1024 ** 3):
+        """
+        :param directory: The directory to store the cached games in. Created if it doesn't exist.
+        :param max_bytes: The maximum total size of the cached games in bytes. Use None for unlimited.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # path -> (last used time, size) of every cached game
+        self._entries = {}
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename.endswith(CACHE_EXTENSION):
+                    path = os.path.join(dirpath, filename)
+                    stat = os.stat(path)
+                    self._entries[path] = (stat.st_mtime, stat.st_size)
+
+    def key(self, white_cls: Type[Player], black_cls: Type[Player], seed: int, **game_config) -> str:
+        """
+        :param white_cls: The white :class:`Player` subclass.
+        :param black_cls: The black :class:`Player` subclass.
+        :param seed: The seed of the game.
+        :param game_config: The keyword arguments for :class:`LocalGame` and :class:`VirtualClock`, see :meth:`play`.
+        :return: The hex digest that identifies the game.
+        """
+        inputs = {
+            'reconchess': __version__,
+            'white': [white_cls.__module__, white_cls.__qualname__, player_source_hash(white_cls)],
+            'black': [black_cls.__module__, black_cls.__qualname__, player_source_hash(black_cls)],
+            'seed': seed,
+            'game': game_config,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + CACHE_EXTENSION)
+
+    def get(self, key: str) -> Optional[GameHistory]:
+        """
+        :param key: A key from :meth:`key`.
+        :return: The cached :class:`GameHistory`, or None if the game isn't cached.
+        """
+        path = self._path(key)
+        try:
+            history = GameHistory.from_file(path)
+        except FileNotFoundError:
+            self._entries.pop(path, None)
+            return None
+
+        # mark it as recently used
+        now = time.time()
+        os.utime(path, (now, now))
+        self._entries[path] = (now, os.path.getsize(path))
+        return history
+
+    def put(self, key: str, history: GameHistory):
+        """
+        Stores a game, then evicts the least recently used games if the cache is over its size limit.
+
+        :param key: A key from :meth:`key`.
+        :param history: The :class:`GameHistory` of the game.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temporary file first so that readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp.gz', dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            history.save(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        self._entries[path] = (time.time(), os.path.getsize(path))
+        self.evict()
+
+    def size(self) -> int:
+        """
+        :return: The total size of the cached games in bytes.
+        """
+        return sum(size for _, size in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def evict(self):
+        """Deletes the least recently used games until the cache is within `max_bytes`."""
+        if self.max_bytes is None:
+            return
+
+        total = self.size()
+        for path, (_, size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            del self._entries[path]
+            total -= size
+
+    def play(self, white_cls: Type[Player], black_cls: Type[Player], seed: int,
+             seconds_per_player: Optional[float] = 900, seconds_increment: Optional[float] = 5,
+             reversible_moves_limit: Optional[int] = 100, full_turn_limit: Optional[int] = None,
+             sense_cost: Optional[float] = None, move_cost: Optional[float] = None) \
+            -> Tuple[Optional[Color], Optional[WinReason], GameHistory]:
+        """
+        Returns the cached results of the game, or plays it with :func:`play_local_game` and caches the results.
+
+        The game is played on a :class:`VirtualClock` so that it is deterministic.
+
+        :param white_cls: The white :class:`Player` subclass.
+        :param black_cls: The black :class:`Player` subclass.
+        :param seed: The seed of the game.
+        :param seconds_per_player: See :class:`LocalGame`.
+        :param seconds_increment: See :class:`LocalGame`.
+        :param reversible_moves_limit: See :class:`LocalGame`.
+        :param full_turn_limit: See :class:`LocalGame`.
+        :param sense_cost: See :class:`VirtualClock`. Default is :attr:`VirtualClock.SENSE_COST`.
+        :param move_cost: See :class:`VirtualClock`. Default is :attr:`VirtualClock.MOVE_COST`.
+        :return: The winner color, win reason and :class:`GameHistory` of the game.
+        """
+        # the resolved costs go in the key, so changing the defaults doesn't return games played with the old ones
+        sense_cost = VirtualClock.SENSE_COST if sense_cost is None else sense_cost
+        move_cost = VirtualClock.MOVE_COST if move_cost is None else move_cost
+        game_config = dict(seconds_per_player=seconds_per_player, seconds_increment=seconds_increment,
+                           reversible_moves_limit=reversible_moves_limit, full_turn_limit=full_turn_limit,
+                           sense_cost=sense_cost, move_cost=move_cost)
+        key = self.key(white_cls, black_cls, seed, **game_config)
+
+        history = self.get(key)
+        if history is not None:
+            self.hits += 1
+            return history.get_winner_color(), history.get_win_reason(), history
+
+        self.misses += 1
+        game = LocalGame(seconds_per_player=seconds_per_player, seconds_increment=seconds_increment,
+                         reversible_moves_limit=reversible_moves_limit, full_turn_limit=full_turn_limit,
+                         clock=VirtualClock(sense_cost=sense_cost, move_cost=move_cost))
+        winner_color, win_reason, history = play_local_game(white_cls(), black_cls(), game=game, seed=seed)
+        self.put(key, history)
+        return winner_color, win_reason, history
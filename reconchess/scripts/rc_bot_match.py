@@ -1,29 +1,70 @@
 import argparse
 import datetime
+import multiprocessing
+import os
 import traceback
 import chess
-from reconchess import load_player, play_local_game, LocalGame
+from reconchess import load_player, play_local_game, LocalGame, VirtualClock, ResultCache
+from reconchess.forking import START_METHODS, game_process_context, memory_usage, format_memory_usage
 
+REPLAY_EXTENSIONS = {
+    'none': '.json',
+    'gz': '.json.gz',
+    'zst': '.json.zst',
+}
 
-def main():
-    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument('white_bot_path', help='path to white bot source file')
-    parser.add_argument('black_bot_path', help='path to black bot source file')
-    parser.add_argument('--seconds_per_player', default=900, type=float,
-                        help='number of seconds each player has to play the entire game.')
-    args = parser.parse_args()
 
+def replay_directory(output_dir, layout, white_bot_name, black_bot_name, now):
+    """
+    :param output_dir: The base directory for replays.
+    :param layout: `'flat'` to put every replay in `output_dir`, `'date'` to shard replays into a sub directory per
+        day, or `'pair'` to shard replays into a sub directory per pair of bots.
+    :param white_bot_name: The name of the white bot.
+    :param black_bot_name: The name of the black bot.
+    :param now: The :class:`datetime.datetime` the game finished.
+    :return: The directory to save the replay in.
+    """
+    if layout == 'date':
+        return os.path.join(output_dir, now.strftime('%Y'), now.strftime('%m'), now.strftime('%d'))
+    elif layout == 'pair':
+        return os.path.join(output_dir, '{}-{}'.format(white_bot_name, black_bot_name))
+    return output_dir
+
+
+def play_match(args, game_index=0):
+    """
+    Plays one game between the bots given on the command line and saves its replay.
+
+    :param args: The parsed command line arguments.
+    :param game_index: The index of the game when playing several, added to the seed.
+    :return: The winner of the game: a color name, `'Draw'` or `'ERROR'`.
+    """
     white_bot_name, white_player_cls = load_player(args.white_bot_path)
     black_bot_name, black_player_cls = load_player(args.black_bot_path)
 
-    game = LocalGame(args.seconds_per_player)
+    seed = args.seed + game_index if args.seed is not None else None
+    # the cache only plays a game of its own on a miss
+    game = None
 
     try:
-        winner_color, win_reason, history = play_local_game(white_player_cls(), black_player_cls(), game=game)
+        if args.cache_dir is not None:
+            cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+            winner_color, win_reason, history = cache.play(white_player_cls, black_player_cls, seed,
+                                                           seconds_per_player=args.seconds_per_player)
+            if cache.hits:
+                print('Reusing cached result.')
+        else:
+            clock = VirtualClock() if seed is not None else None
+            game = LocalGame(args.seconds_per_player, clock=clock)
+            winner_color, win_reason, history = play_local_game(white_player_cls(), black_player_cls(), game=game,
+                                                                seed=seed, deadline_margin=args.deadline_margin)
 
         winner = 'Draw' if winner_color is None else chess.COLOR_NAMES[winner_color]
     except:
         traceback.print_exc()
+        if game is None:
+            # the game the cache was playing isn't available, so save an empty replay
+            game = LocalGame(args.seconds_per_player)
         game.end()
 
         winner = 'ERROR'
@@ -32,12 +73,86 @@ def main():
     print('Game Over!')
     print('Winner: {}!'.format(winner))
 
-    timestamp = datetime.datetime.now().strftime('%Y_%m_%d-%H_%M_%S')
+    now = datetime.datetime.now()
+    timestamp = now.strftime('%Y_%m_%d-%H_%M_%S')
+    if args.num_games > 1:
+        timestamp += '-{}'.format(game_index)
 
-    replay_path = '{}-{}-{}-{}.json'.format(white_bot_name, black_bot_name, winner, timestamp)
+    replay_dir = replay_directory(args.output_dir, args.layout, white_bot_name, black_bot_name, now)
+    os.makedirs(replay_dir, exist_ok=True)
+
+    replay_path = os.path.join(replay_dir, '{}-{}-{}-{}{}'.format(white_bot_name, black_bot_name, winner, timestamp,
+                                                                   REPLAY_EXTENSIONS[args.compression]))
     print('Saving replay to {}...'.format(replay_path))
     history.save(replay_path)
 
+    return winner
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('white_bot_path', help='path to white bot source file')
+    parser.add_argument('black_bot_path', help='path to black bot source file')
+    parser.add_argument('--seconds_per_player', default=900, type=float,
+                        help='number of seconds each player has to play the entire game.')
+    parser.add_argument('--output-dir', default='.', help='directory to save the replay in.')
+    parser.add_argument('--layout', default='flat', choices=['flat', 'date', 'pair'],
+                        help='how to shard replays into sub directories of the output directory.')
+    parser.add_argument('--compression', default='none', choices=sorted(REPLAY_EXTENSIONS.keys()),
+                        help='compression to use for the replay file. zst requires the zstandard package.')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the bots and a virtual game clock, so that the game can be reproduced. game i '
+                             'of --num-games uses seed + i.')
+    parser.add_argument('--cache-dir', default=None,
+                        help='directory of a result cache to reuse the results of previously played seeded games. '
+                             'Requires --seed.')
+    parser.add_argument('--cache-max-mb', type=float, default=1024, help='maximum size of the result cache.')
+    parser.add_argument('--deadline-margin', type=float, default=None,
+                        help='stop waiting for a bot\'s sense or move this many seconds before its clock runs out, and '
+                             'play the action it last published instead. Not used with --cache-dir.')
+    parser.add_argument('--num-games', type=int, default=1, help='number of games to play.')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='number of processes to play games in at the same time.')
+    parser.add_argument('--start-method', default=None, choices=START_METHODS,
+                        help='how to start game processes. fork and forkserver load the bots once and share them '
+                             'copy-on-write, spawn loads them in every process. Defaults to the platform default.')
+    parser.add_argument('--report-memory', action='store_true', default=False,
+                        help='print how much memory the game processes share at the peak of their memory use. Linux '
+                             'only.')
+    parser.add_argument('--memory-interval', type=float, default=1,
+                        help='seconds between samples of the memory use with --report-memory.')
+    args = parser.parse_args()
+
+    if args.cache_dir is not None and args.seed is None:
+        parser.error('--cache-dir requires --seed')
+
+    if args.processes <= 1:
+        for game_index in range(args.num_games):
+            play_match(args, game_index)
+        return
+
+    # load the bots before starting the processes so they can be shared copy-on-write
+    load_player(args.white_bot_path)
+    load_player(args.black_bot_path)
+    ctx = game_process_context(args.start_method, [args.white_bot_path, args.black_bot_path])
+
+    with ctx.Pool(args.processes) as pool:
+        results = pool.starmap_async(play_match, [(args, i) for i in range(args.num_games)])
+        if args.report_memory:
+            # sample while the games are being played and keep the sample that used the most memory
+            peak = None
+            while not results.ready():
+                results.wait(timeout=args.memory_interval)
+                usage = memory_usage([os.getpid()] + [child.pid for child in multiprocessing.active_children()])
+                if usage is not None and (peak is None or usage['pss'] > peak['pss']):
+                    peak = usage
+            if peak is not None:
+                print('Peak memory: {}'.format(format_memory_usage(peak)))
+        winners = results.get()
+
+    print('Results: {}'.format(', '.join('{} {}'.format(winners.count(winner), winner)
+                                         for winner in sorted(set(winners)))))
+
 
 if __name__ == '__main__':
     main()
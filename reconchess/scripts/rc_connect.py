@@ -1,18 +1,36 @@
 import argparse
+import os
 import requests
 import multiprocessing
+import multiprocessing.connection
+import threading
+import queue
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 import time
 import getpass
 import traceback
 from datetime import datetime
 import reconchess
-from reconchess import load_player, play_remote_game
+from reconchess import load_player, play_remote_game, RemoteGame
+from reconchess.worker_pool import PlayerWorkerPool
+from reconchess.forking import START_METHODS, game_process_context, memory_report
+from reconchess.request_metrics import RequestMetrics, send_request
 import sys
 import signal
 
 
+class AuthenticationError(Exception):
+    """Raised by :class:`RBCServer` when the server rejects the username or password."""
+
+
 class RBCServer:
-    def __init__(self, server_url, auth):
+    def __init__(self, server_url, auth, metrics=None):
+        """
+        :param server_url: The URL of the server.
+        :param auth: The (username, password) to authenticate with.
+        :param metrics: Optional :class:`reconchess.request_metrics.RequestMetricsSink` to record every request in.
+        """
         self.server_url = server_url
         self.invitations_url = '{}/api/invitations'.format(server_url)
         self.user_url = '{}/api/users'.format(server_url)
@@ -20,28 +38,31 @@ class RBCServer:
         self.game_url = '{}/api/games'.format(server_url)
         self.session = requests.Session()
         self.session.auth = auth
-
-    def _get(self, endpoint):
-        response = self.session.get(endpoint)
+        self.metrics = metrics
+
+    def copy(self):
+        """
+        :return: A new connection to the same server with the same credentials and metrics sink, e.g. for use in
+            another thread.
+        """
+        return RBCServer(self.server_url, self.session.auth, metrics=self.metrics)
+
+    def _request(self, method, endpoint, json=None):
+        attempt = 0
+        response = send_request(self.session, method, endpoint, self.metrics, attempt, json=json)
         while response.status_code >= 500:
             time.sleep(0.5)
-            response = self.session.get(endpoint)
+            attempt += 1
+            response = send_request(self.session, method, endpoint, self.metrics, attempt, json=json)
         if response.status_code == 401:
-            print('Authentication Error!')
-            print(response.text)
-            quit()
+            raise AuthenticationError(response.text)
         return response.json()
 
+    def _get(self, endpoint):
+        return self._request('GET', endpoint)
+
     def _post(self, endpoint, json=None):
-        response = self.session.post(endpoint, json=json)
-        while response.status_code >= 500:
-            time.sleep(0.5)
-            response = self.session.post(endpoint, json=json)
-        if response.status_code == 401:
-            print('Authentication Error!')
-            print(response.text)
-            quit()
-        return response.json()
+        return self._request('POST', endpoint, json=json)
 
     def get_reconchess_version(self):
         return self._get('{}/api/version'.format(self.server_url))['version']
@@ -80,20 +101,31 @@ class RBCServer:
         self._post('{}/version'.format(self.me_url))
 
 
-def accept_invitation_and_play(server_url, auth, invitation_id, bot_cls, finished):
-    # make sure this process doesn't react to interrupt signals
-    signal.signal(signal.SIGTERM, signal.SIG_IGN)
-    signal.signal(signal.SIGINT, signal.SIG_IGN)
+def accept_invitation_and_play(server_url, auth, invitation_id, bot_cls, finished, pool=None, game_id=None,
+                               metrics_dir=None):
+    if pool is None:
+        # make sure this process doesn't react to interrupt signals
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
 
-    print('[{}] Accepting invitation {}.'.format(datetime.now(), invitation_id))
+    # saved with the game history at the end of the game
+    metrics = RequestMetrics(output_dir=metrics_dir) if metrics_dir is not None else None
+    server = RBCServer(server_url, auth, metrics=metrics)
 
-    server = RBCServer(server_url, auth)
-    game_id = server.accept_invitation(invitation_id)
+    # the invitation may have already been accepted by the InvitationManager
+    if game_id is None:
+        print('[{}] Accepting invitation {}.'.format(datetime.now(), invitation_id))
+        game_id = server.accept_invitation(invitation_id)
 
     print('[{}] Invitation {} accepted. Playing game {}.'.format(datetime.now(), invitation_id, game_id))
 
     try:
-        play_remote_game(server_url, game_id, auth, bot_cls())
+        game = RemoteGame(server_url, game_id, auth, metrics=metrics)
+        if pool is None:
+            play_remote_game(server_url, game_id, auth, bot_cls(), game=game)
+        else:
+            with pool.player() as player:
+                play_remote_game(server_url, game_id, auth, player, game=game)
         print('[{}] Finished game {}'.format(datetime.now(), game_id))
     except:
         print('[{}] Fatal error in game {}:'.format(datetime.now(), game_id))
@@ -104,6 +136,38 @@ def accept_invitation_and_play(server_url, auth, invitation_id, bot_cls, finishe
         finished.value = True
 
 
+class PooledGameThread(threading.Thread):
+    """
+    Plays a game in a thread of this process, with the bot running in a worker of a :class:`PlayerWorkerPool`. Has
+    the same interface as the :class:`multiprocessing.Process` used for games without a pool.
+
+    Like game processes, the threads aren't daemons, so exiting waits for the games to finish, see
+    :func:`wait_for_pooled_games`.
+    """
+
+    def __init__(self, args, on_finish=None, target=accept_invitation_and_play):
+        super().__init__(target=target, args=args)
+        self.on_finish = on_finish
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            if self.on_finish is not None:
+                self.on_finish()
+
+    def terminate(self):
+        # the game has already finished or its worker died, so there is nothing to stop
+        pass
+
+
+def wait_for_pooled_games():
+    """Waits for every :class:`PooledGameThread` to finish its game, including finishing its invitation."""
+    for thread in threading.enumerate():
+        if isinstance(thread, PooledGameThread):
+            thread.join()
+
+
 def check_package_version(server):
     server_version = server.get_reconchess_version()
     if server_version != reconchess.__version__:
@@ -144,61 +208,319 @@ def unranked_mode(server):
     server.set_ranked(False)
 
 
-def listen_for_invitations(server, bot_cls, max_concurrent_games):
-    connected = False
-    process_by_invitation = {}
-    finished_by_invitation = {}
-    while True:
-        try:
-            # get unaccepted invitations
-            invitations = server.get_invitations()
-
-            # set max games on server if this is the first successful connection after being disconnected
-            if not connected:
-                print('[{}] Connected successfully to server!'.format(datetime.now()))
-                connected = True
-                server.set_max_games(max_concurrent_games)
-
-            # filter out finished processes
-            finished_invitations = []
-            for invitation in process_by_invitation.keys():
-                if not process_by_invitation[invitation].is_alive() or finished_by_invitation[invitation].value:
-                    finished_invitations.append(invitation)
-            for invitation in finished_invitations:
-                print('[{}] Terminating process for invitation {}'.format(datetime.now(), invitation))
-                process_by_invitation[invitation].terminate()
-                del process_by_invitation[invitation]
-                del finished_by_invitation[invitation]
-
-            # accept invitations until we have #max_concurrent_games processes alive
-            for invitation in invitations:
-                # only accept the invitation if we have room and the invite doesn't have a process already
-                if invitation not in process_by_invitation:
+def host_load():
+    """
+    :return: The 1 minute load average of the host divided by its number of CPUs.
+    """
+    return os.getloadavg()[0] / (os.cpu_count() or 1)
+
+
+class InvitationManager(object):
+    """
+    Accepts invitations from the server and plays a game for each of them, at most `capacity` games at a time.
+
+    - The server is polled for invitations every `min_poll_interval` seconds while there are free game slots, and
+      every `max_poll_interval` seconds while they are all taken. A finished game wakes the manager up immediately.
+    - Invitations are accepted concurrently by a pool of threads, and each game starts as soon as its invitation has
+      been accepted.
+    - Invitations that can't be accepted yet wait in a heap of at most `max_pending` invitations, lowest `priority`
+      first. The rest stay on the server until a later poll finds room for them, and are only reported once.
+    - When game processes (or the workers of `pool`) are forked, they are only started while no invitation is being
+      accepted, since a forked process inherits the locks that the accepting threads hold, e.g. of stdout.
+    - An :class:`AuthenticationError` while polling or accepting is raised by :meth:`step`, since nothing can be played
+      without valid credentials.
+    - With `max_load` set, the capacity drops by one while the host load (see :func:`host_load`) is above `max_load`
+      and grows back by one while it is below 3/4 of `max_load`, at most once every `capacity_interval` seconds. The
+      server is told about every change with :meth:`RBCServer.set_max_games`.
+    """
+
+    def __init__(self, server, bot_cls, max_concurrent_games, pool=None, ctx=multiprocessing, report_memory=False,
+                 min_poll_interval=0.5, max_poll_interval=5.0, max_pending=64, priority=None, num_accept_threads=4,
+                 max_load=None, capacity_interval=60.0, load=host_load, metrics_dir=None):
+        """
+        :param server: The :class:`RBCServer`.
+        :param bot_cls: The bot class to play games with, unused when `pool` is given.
+        :param max_concurrent_games: The maximum number of games to play at the same time.
+        :param pool: A :class:`PlayerWorkerPool` to play games in threads of this process with, or None to play each
+            game in its own process.
+        :param ctx: The :mod:`multiprocessing` context to start game processes with.
+        :param report_memory: Whether to print how much memory is shared between game processes when games start or
+            finish.
+        :param min_poll_interval: Seconds between polls while there are free game slots.
+        :param max_poll_interval: Seconds between polls while all game slots are taken.
+        :param max_pending: The maximum number of invitations waiting to be accepted.
+        :param priority: A function from invitation id to a sort key, or None to accept the oldest invitations first.
+        :param num_accept_threads: The maximum number of invitations to accept at the same time.
+        :param max_load: The host load above which the capacity is reduced, or None for a fixed capacity.
+        :param capacity_interval: The minimum seconds between capacity changes.
+        :param load: A function returning the host load.
+        :param metrics_dir: A directory to save the request metrics and history of each game to, see
+            :class:`reconchess.request_metrics.RequestMetrics`, or None to not record request metrics.
+        """
+        self.server = server
+        self.bot_cls = bot_cls
+        self.max_concurrent_games = max_concurrent_games
+        self.capacity = max_concurrent_games
+        self.pool = pool
+        self.ctx = ctx
+        self.report_memory = report_memory
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_pending = max_pending
+        self.priority = priority
+        self.max_load = max_load
+        self.capacity_interval = capacity_interval
+        self.load = load
+        self.metrics_dir = metrics_dir
+        self.connected = False
+
+        # heap of (priority key, invitation), and the invitations in it
+        self._pending = []
+        self._pending_invitations = set()
+        # offered invitations that didn't fit in the heap, which were already reported
+        self._dropped_invitations = set()
+        self._error = None
+        self._accepting = set()
+        self._num_accepts_in_flight = 0
+        self._accepts_lock = threading.Lock()
+        start_method = pool.start_method if pool is not None else ctx.get_start_method()
+        self._forks = start_method == 'fork'
+        self._accepted = queue.Queue()
+        self._games = {}
+        self._executor = ThreadPoolExecutor(num_accept_threads)
+        self._local = threading.local()
+        self._wake_reader, self._wake_writer = multiprocessing.Pipe(duplex=False)
+        self._wake_lock = threading.Lock()
+        self._last_poll = None
+        self._last_capacity_change = time.monotonic()
+
+    def num_games(self):
+        """:return: The number of games being played."""
+        return len(self._games)
+
+    def pending(self):
+        """:return: The invitations waiting to be accepted, in the order they will be accepted."""
+        return [invitation for _, invitation in sorted(self._pending)]
+
+    def free_slots(self):
+        """:return: The number of invitations that can be accepted right now."""
+        return self.capacity - len(self._games) - len(self._accepting)
+
+    def poll_interval(self):
+        """:return: The seconds to wait between polls, which depends on whether there are free game slots."""
+        return self.min_poll_interval if self.free_slots() > 0 else self.max_poll_interval
+
+    def wake(self):
+        """Makes :meth:`wait` return early. Safe to call from any thread."""
+        with self._wake_lock:
+            self._wake_writer.send_bytes(b'')
+
+    def wait(self, timeout):
+        """
+        Waits until :meth:`wake` is called, a game process exits, or `timeout` seconds pass.
+
+        :param timeout: The maximum seconds to wait.
+        """
+        # game threads call wake() when they finish, but game processes may die without doing so
+        sentinels = [process.sentinel for process, _ in self._games.values() if hasattr(process, 'sentinel')]
+        multiprocessing.connection.wait([self._wake_reader] + sentinels, timeout)
+        while self._wake_reader.poll():
+            self._wake_reader.recv_bytes()
+
+    def poll(self):
+        """Gets the unaccepted invitations from the server and queues the new ones."""
+        self._last_poll = time.monotonic()
+        invitations = self.server.get_invitations()
+
+        # set max games on server if this is the first successful connection after being disconnected
+        if not self.connected:
+            print('[{}] Connected successfully to server!'.format(datetime.now()))
+            self.connected = True
+            self.server.set_max_games(self.capacity)
+
+        # invitations that aren't offered anymore were withdrawn
+        offered = set(invitations)
+        if not self._pending_invitations <= offered:
+            self._pending = [entry for entry in self._pending if entry[1] in offered]
+            heapq.heapify(self._pending)
+            self._pending_invitations &= offered
+        self._dropped_invitations &= offered
+
+        for invitation in invitations:
+            if invitation not in self._games and invitation not in self._accepting \
+                    and invitation not in self._pending_invitations:
+                if invitation not in self._dropped_invitations:
                     print('[{}] Received invitation {}.'.format(datetime.now(), invitation))
+                key = self.priority(invitation) if self.priority is not None else invitation
+                heapq.heappush(self._pending, (key, invitation))
+                self._pending_invitations.add(invitation)
+
+        if len(self._pending) > self.max_pending:
+            # a sorted list is a heap
+            self._pending = heapq.nsmallest(self.max_pending, self._pending)
+            kept = {invitation for _, invitation in self._pending}
+            for invitation in sorted(self._pending_invitations - kept - self._dropped_invitations):
+                print('[{}] Not enough game slots to play invitation {}.'.format(datetime.now(), invitation))
+            self._dropped_invitations |= self._pending_invitations - kept
+            self._pending_invitations = kept
+        self._dropped_invitations -= self._pending_invitations
+
+    def process(self):
+        """
+        Reaps finished games, starts the games of accepted invitations, updates the capacity, and accepts pending
+        invitations while there are free game slots.
+        """
+        # only this thread submits accepts, so none start until the processes below have been forked
+        with self._accepts_lock:
+            can_fork = not self._forks or self._num_accepts_in_flight == 0
+
+        # replace crashed workers before they are needed
+        if self.pool is not None and can_fork:
+            self.pool.supervise()
+
+        num_finished = self._reap()
+        # accepted games wait for the accepts in flight, which wake the manager up when they are done
+        num_started = self._start_accepted() if can_fork or self.pool is not None else 0
+        self._update_capacity()
+
+        while self._pending and self.free_slots() > 0:
+            _, invitation = heapq.heappop(self._pending)
+            self._pending_invitations.discard(invitation)
+            self._accepting.add(invitation)
+            with self._accepts_lock:
+                self._num_accepts_in_flight += 1
+            self._executor.submit(self._accept, invitation)
+
+        if self.report_memory and (num_started or num_finished):
+            report = memory_report([os.getpid()] + [child.pid for child in multiprocessing.active_children()])
+            if report is not None:
+                print('[{}] Memory: {}'.format(datetime.now(), report))
+
+    def step(self):
+        """
+        Polls if it is time to, processes, and then waits until there is something to do.
+
+        :raises AuthenticationError: If the server rejected the credentials.
+        """
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+        if self._last_poll is None or time.monotonic() >= self._last_poll + self.poll_interval():
+            try:
+                self.poll()
+            except AuthenticationError:
+                raise
+            except requests.RequestException as e:
+                self.connected = False
+                print('[{}] Failed to connect to server'.format(datetime.now()))
+                print(e)
+            except Exception:
+                print("Error in invitation processing: ")
+                traceback.print_exc()
 
-                    if len(process_by_invitation) < max_concurrent_games:
-                        # start the process for playing a game
-                        finished = multiprocessing.Value('b', False)
-                        process = multiprocessing.Process(
-                            target=accept_invitation_and_play,
-                            args=(server.server_url, server.session.auth, invitation, bot_cls, finished))
-                        process.start()
-
-                        # store the process so we can check when it finishes
-                        process_by_invitation[invitation] = process
-                        finished_by_invitation[invitation] = finished
-                    else:
-                        print('[{}] Not enough game slots to play invitation {}.'.format(datetime.now(), invitation))
-
-        except requests.RequestException as e:
-            connected = False
-            print('[{}] Failed to connect to server'.format(datetime.now()))
-            print(e)
+        try:
+            self.process()
         except Exception:
             print("Error in invitation processing: ")
             traceback.print_exc()
 
-        time.sleep(5)
+        self.wait(max(0.0, self._last_poll + self.poll_interval() - time.monotonic()))
+
+    def run(self):
+        """Accepts invitations and plays games forever."""
+        while True:
+            self.step()
+
+    def close(self):
+        """Waits for invitations that are being accepted. Games that are being played are left running."""
+        self._executor.shutdown(wait=True)
+
+    def _accept(self, invitation):
+        # sessions aren't shared between threads
+        if not hasattr(self._local, 'server'):
+            self._local.server = self.server.copy()
+
+        print('[{}] Accepting invitation {}.'.format(datetime.now(), invitation))
+        game_id = None
+        try:
+            game_id = self._local.server.accept_invitation(invitation)
+        except AuthenticationError as e:
+            # raised in the main thread by step()
+            self._error = e
+        except Exception:
+            print('[{}] Failed to accept invitation {}:'.format(datetime.now(), invitation))
+            traceback.print_exc()
+        finally:
+            # frees the invitation's game slot whatever happened
+            self._accepted.put((invitation, game_id))
+            with self._accepts_lock:
+                self._num_accepts_in_flight -= 1
+            self.wake()
+
+    def _start_accepted(self):
+        num_started = 0
+        while True:
+            try:
+                invitation, game_id = self._accepted.get_nowait()
+            except queue.Empty:
+                return num_started
+
+            self._accepting.discard(invitation)
+            if game_id is not None:
+                self._games[invitation] = self._start_game(invitation, game_id)
+                num_started += 1
+
+    def _start_game(self, invitation, game_id):
+        finished = self.ctx.Value('b', False)
+        if self.pool is not None:
+            process = PooledGameThread(
+                args=(self.server.server_url, self.server.session.auth, invitation, None, finished, self.pool,
+                      game_id, self.metrics_dir),
+                on_finish=self.wake)
+        else:
+            process = self.ctx.Process(
+                target=accept_invitation_and_play,
+                args=(self.server.server_url, self.server.session.auth, invitation, self.bot_cls, finished),
+                kwargs={'game_id': game_id, 'metrics_dir': self.metrics_dir})
+        process.start()
+        return process, finished
+
+    def _reap(self):
+        finished_invitations = [invitation for invitation, (process, finished) in self._games.items()
+                                if not process.is_alive() or finished.value]
+        for invitation in finished_invitations:
+            print('[{}] Terminating process for invitation {}'.format(datetime.now(), invitation))
+            self._games[invitation][0].terminate()
+            del self._games[invitation]
+        return len(finished_invitations)
+
+    def _update_capacity(self):
+        if self.max_load is None or time.monotonic() - self._last_capacity_change < self.capacity_interval:
+            return
+
+        load = self.load()
+        capacity = self.capacity
+        if load > self.max_load and capacity > 1:
+            capacity -= 1
+        elif load < 0.75 * self.max_load and capacity < self.max_concurrent_games:
+            capacity += 1
+
+        if capacity != self.capacity:
+            print('[{}] Host load is {:.2f}, playing at most {} games.'.format(datetime.now(), load, capacity))
+            self.capacity = capacity
+            self._last_capacity_change = time.monotonic()
+            if self.connected:
+                self.server.set_max_games(capacity)
+
+
+def listen_for_invitations(server, bot_cls, max_concurrent_games, pool=None, ctx=multiprocessing,
+                           report_memory=False, **kwargs):
+    """
+    Accepts invitations and plays games forever with an :class:`InvitationManager`, which takes the keyword arguments.
+    """
+    InvitationManager(server, bot_cls, max_concurrent_games, pool=pool, ctx=ctx, report_memory=report_memory,
+                      **kwargs).run()
 
 
 def ask_for_username():
@@ -236,34 +558,81 @@ def main():
                         help='Force your ranked version to stay the same with no prompts.')
     parser.add_argument('--max-concurrent-games', type=int, default=4,
                         help='The maximum number of games to play at the same time.')
+    parser.add_argument('--worker-pool', action='store_true', default=False,
+                        help='Load the bot once in each of --max-concurrent-games worker processes and reuse them for '
+                             'every game, instead of starting a new process for each game.')
+    parser.add_argument('--start-method', default=None, choices=START_METHODS,
+                        help='How to start game processes. fork shares the bot loaded by this process with every game '
+                             'copy-on-write, forkserver loads the bot once in a fork server, and spawn loads the bot '
+                             'in every game process. Defaults to the platform default.')
+    parser.add_argument('--report-memory', action='store_true', default=False,
+                        help='Print how much memory is shared between game processes when games start or finish. '
+                             'Linux only.')
+    parser.add_argument('--min-poll-interval', type=float, default=0.5,
+                        help='Seconds between checks for invitations while there are free game slots.')
+    parser.add_argument('--max-poll-interval', type=float, default=5,
+                        help='Seconds between checks for invitations while all game slots are taken.')
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help='The maximum number of invitations to queue while all game slots are taken.')
+    parser.add_argument('--max-load', type=float, default=None,
+                        help='Play fewer games while the load average per CPU of this machine is above this, and tell '
+                             'the server. By default --max-concurrent-games are always played.')
+    parser.add_argument('--request-metrics-dir', default=None,
+                        help='Save the latency, status codes, retries and bytes transferred of the requests of each '
+                             'game to <game id>-requests.json in this directory, next to the game history.')
     args = parser.parse_args()
 
-    bot_name, bot_cls = load_player(args.bot_path)
+    if args.worker_pool:
+        # only the workers load the bot
+        bot_cls = None
+    else:
+        _, bot_cls = load_player(args.bot_path)
 
     username = ask_for_username() if args.username is None else args.username
     password = ask_for_password() if args.password is None else args.password
     auth = username, password
 
-    server = RBCServer(args.server_url, auth)
+    try:
+        server = RBCServer(args.server_url, auth)
 
-    # verify we have the correct version of reconchess package
-    check_package_version(server)
+        # verify we have the correct version of reconchess package
+        check_package_version(server)
 
-    def handle_term(signum, frame):
-        print('[{}] Received terminate signal, waiting for games to finish and then exiting...'.format(datetime.now()))
-        unranked_mode(server)
-        sys.exit(0)
+        pool = None
 
-    signal.signal(signal.SIGINT, handle_term)
-    signal.signal(signal.SIGTERM, handle_term)
+        def handle_term(signum, frame):
+            print('[{}] Received terminate signal, waiting for games to finish and then exiting...'.format(
+                datetime.now()))
+            unranked_mode(server)
+            if pool is not None:
+                # the workers are daemon processes that would be killed at exit along with the games they play
+                wait_for_pooled_games()
+                pool.close()
+            sys.exit(0)
 
-    # tell the server whether we want to do ranked matches or not
-    if args.ranked:
-        ranked_mode(server, args.keep_version)
-    else:
-        unranked_mode(server)
+        signal.signal(signal.SIGINT, handle_term)
+        signal.signal(signal.SIGTERM, handle_term)
+
+        # tell the server whether we want to do ranked matches or not
+        if args.ranked:
+            ranked_mode(server, args.keep_version)
+        else:
+            unranked_mode(server)
 
-    listen_for_invitations(server, bot_cls, args.max_concurrent_games)
+        if args.worker_pool:
+            ctx = multiprocessing
+            pool = PlayerWorkerPool(args.bot_path, args.max_concurrent_games, context=args.start_method)
+        else:
+            ctx = game_process_context(args.start_method, [args.bot_path])
+
+        listen_for_invitations(server, bot_cls, args.max_concurrent_games, pool=pool, ctx=ctx,
+                               report_memory=args.report_memory, min_poll_interval=args.min_poll_interval,
+                               max_poll_interval=args.max_poll_interval, max_pending=args.max_pending,
+                               max_load=args.max_load, metrics_dir=args.request_metrics_dir)
+    except AuthenticationError as e:
+        print('Authentication Error!')
+        print(e)
+        sys.exit(1)
 
 
 if __name__ == '__main__':
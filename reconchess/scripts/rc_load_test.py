@@ -0,0 +1,71 @@
+import argparse
+import json
+from reconchess import load_player
+from reconchess.local_server import LocalServer
+from reconchess.load_test import find_saturation, run_load
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                     description='Plays games between bots on a server through the remote play path, '
+                                                 'and reports request and turn latencies, errors and retries.')
+    parser.add_argument('--server-url', default=None,
+                        help='URL of the server. Don\'t use the tournament server. By default a local server is '
+                             'started in this process.')
+    parser.add_argument('--username-prefix', default='load',
+                        help='Bots log in as this prefix followed by an index, from 0 to twice the number of concurrent '
+                             'games.')
+    parser.add_argument('--password', default='password', help='Password of every bot.')
+    parser.add_argument('--bot', default='reconchess.bots.random_bot', help='Path to bot source or bot module name.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                        help='Numbers of concurrent games to try. With more than one, stops at the saturation point.')
+    parser.add_argument('--games', type=int, default=None,
+                        help='Number of games at each concurrency. Defaults to twice the concurrency.')
+    parser.add_argument('--min-gain', type=float, default=0.1,
+                        help='The smallest relative increase of turns per second that counts as an improvement.')
+    parser.add_argument('--poll-interval', type=float, default=None,
+                        help='Seconds between requests while waiting for the opponent. Defaults to the RemoteGame '
+                             'default.')
+    parser.add_argument('--game-timeout', type=float, default=3600, help='Seconds to wait for each game to finish.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latency of the local server.')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Failure rate of the local server.')
+    parser.add_argument('--json', default=None, help='Path to write the measurements to as JSON.')
+    args = parser.parse_args()
+
+    _, bot_cls = load_player(args.bot)
+
+    def auth_for(index):
+        return '{}{}'.format(args.username_prefix, index), args.password
+
+    local_server = None
+    server_url = args.server_url
+    if server_url is None:
+        local_server = LocalServer(latency=args.latency, failure_rate=args.failure_rate).start()
+        server_url = local_server.url
+
+    kwargs = dict(bot_cls=bot_cls, poll_interval=args.poll_interval, timeout=args.game_timeout)
+    try:
+        if len(args.concurrency) == 1:
+            results = [run_load(server_url, auth_for, args.games or 2 * args.concurrency[0], args.concurrency[0],
+                                **kwargs)]
+            saturation = None
+        else:
+            results, saturation = find_saturation(server_url, auth_for, args.concurrency, args.games, args.min_gain,
+                                                  **kwargs)
+    finally:
+        if local_server is not None:
+            local_server.stop()
+
+    for stats in results:
+        print(stats.format())
+        print()
+    if len(args.concurrency) > 1:
+        print('Saturation point: {} concurrent games'.format(saturation))
+
+    if args.json is not None:
+        with open(args.json, 'w') as fp:
+            json.dump({'results': [stats.summary() for stats in results], 'saturation': saturation}, fp, indent=2)
+
+
+if __name__ == '__main__':
+    main()
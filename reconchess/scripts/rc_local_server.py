@@ -0,0 +1,47 @@
+import argparse
+from datetime import datetime
+from reconchess.local_server import LocalServer
+
+
+def parse_user(text):
+    username, sep, password = text.partition(':')
+    if not sep:
+        raise argparse.ArgumentTypeError('expected username:password, got {!r}'.format(text))
+    return username, password
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                     description='Runs a local stand-in for the reconchess server, e.g. for testing '
+                                                 'bots with rc-connect or load testing without the real server.')
+    parser.add_argument('--host', default='127.0.0.1', help='The host to listen on.')
+    parser.add_argument('--port', type=int, default=8000, help='The port to listen on.')
+    parser.add_argument('--user', type=parse_user, action='append', default=None, dest='users',
+                        help='A username:password that can log in. Can be repeated. By default anyone can log in '
+                             'with any password.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering each request.')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Maximum random seconds to wait on top of --latency.')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='The fraction of requests to answer with --failure-status.')
+    parser.add_argument('--failure-status', type=int, default=503, help='The HTTP status code of failed requests.')
+    parser.add_argument('--seconds-per-player', type=float, default=900,
+                        help='Number of seconds each player has to play the entire game.')
+    parser.add_argument('--seconds-increment', type=float, default=5,
+                        help='Seconds added to a player\'s clock on each turn.')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for the random latencies and failures.')
+    args = parser.parse_args()
+
+    server = LocalServer(args.host, args.port, passwords=dict(args.users) if args.users is not None else None,
+                         latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                         failure_status=args.failure_status, seconds_per_player=args.seconds_per_player,
+                         seconds_increment=args.seconds_increment, seed=args.seed)
+    print('[{}] Serving on {}'.format(datetime.now(), server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ import chess
 import datetime
 import random
 from reconchess import play_remote_game
-from reconchess.scripts.rc_connect import RBCServer, ask_for_auth
+from reconchess.scripts.rc_connect import RBCServer, AuthenticationError, ask_for_auth
 from reconchess.scripts.rc_play import UIPlayer
 
 
@@ -18,7 +18,12 @@ def main():
 
     server = RBCServer(args.server_url, auth)
 
-    usernames = server.get_active_users()
+    try:
+        usernames = server.get_active_users()
+    except AuthenticationError as e:
+        print('Authentication Error!')
+        print(e)
+        quit()
 
     if auth[0] in usernames:
         usernames.remove(auth[0])
@@ -0,0 +1,182 @@
+import chess
+from typing import Iterable, Iterator, Set
+from .types import *
+from .utilities import SENSE_MASKS
+
+WindowKey = Tuple[int, ...]
+
+
+def _piece_bitboards(board: chess.Board) -> List[int]:
+    # the pieces of each type in the order of chess.PIECE_TYPES, and the white pieces
+    return [board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            board.occupied_co[chess.WHITE]]
+
+
+def encode_window(board: chess.Board, square: Square) -> WindowKey:
+    """
+    :param board: The board to sense.
+    :param square: The sensed square.
+    :return: A hashable encoding of the result of sensing `square` on `board`, see :func:`sense_on`. Two boards have the
+        same encoding if and only if sensing `square` on them has the same result.
+    """
+    mask = SENSE_MASKS[square]
+    return tuple(bb & mask for bb in _piece_bitboards(board))
+
+
+def encode_sense_result(sense_result: List[Tuple[Square, Optional[chess.Piece]]]) -> WindowKey:
+    """
+    :param sense_result: The result of sensing a square, as given to :meth:`Player.handle_sense_result`.
+    :return: The same encoding as :func:`encode_window` for the boards where sensing has this result.
+    """
+    bbs = [0] * (len(chess.PIECE_TYPES) + 1)
+    for square, piece in sense_result:
+        if piece is not None:
+            bbs[piece.piece_type - 1] |= chess.BB_SQUARES[square]
+            if piece.color == chess.WHITE:
+                bbs[-1] |= chess.BB_SQUARES[square]
+    return tuple(bbs)
+
+
+class SenseIndex(object):
+    """
+    An index of candidate boards, e.g. the boards the game could be on, by what sensing each square would show on them.
+    For every square, the boards are grouped by the contents of the sense window, so that the boards consistent with a
+    sense result are found with one lookup instead of by comparing every board. The expected number of boards left
+    after sensing each square is kept up to date as boards are added and removed.
+
+    Boards are identified by the id returned by :meth:`add`. They aren't copied, so they must not be changed while they
+    are in the index.
+
+    Example usage: ::
+
+        index = SenseIndex(candidate_boards)
+
+        # in choose_sense: the square that leaves the fewest boards on average
+        expected = index.expected_num_remaining()
+        square = min(sense_actions, key=lambda square: expected[square])
+
+        # in handle_sense_result
+        index.prune(square, sense_result)
+    """
+
+    def __init__(self, boards: Iterable[chess.Board] = ()):
+        """
+        :param boards: The boards to add to the index.
+        """
+        self._boards = {}
+        self._keys = {}
+        self._groups = [{} for _ in chess.SQUARES]
+        self._sums_of_squares = [0] * len(chess.SQUARES)
+        self._next_id = 0
+        for board in boards:
+            self.add(board)
+
+    def __len__(self) -> int:
+        return len(self._boards)
+
+    def __contains__(self, board_id: int) -> bool:
+        return board_id in self._boards
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._boards)
+
+    def __getitem__(self, board_id: int) -> chess.Board:
+        return self._boards[board_id]
+
+    def boards(self) -> List[chess.Board]:
+        """
+        :return: The boards in the index.
+        """
+        return list(self._boards.values())
+
+    def add(self, board: chess.Board) -> int:
+        """
+        :param board: The board to add.
+        :return: The id of the board in the index.
+        """
+        board_id = self._next_id
+        self._next_id += 1
+        self._insert(board_id, board)
+        return board_id
+
+    def _insert(self, board_id: int, board: chess.Board):
+        bbs = _piece_bitboards(board)
+        keys = [tuple(bb & mask for bb in bbs) for mask in SENSE_MASKS]
+        for square, key in enumerate(keys):
+            group = self._groups[square].setdefault(key, set())
+            # (n + 1)^2 - n^2
+            self._sums_of_squares[square] += 2 * len(group) + 1
+            group.add(board_id)
+        self._boards[board_id] = board
+        self._keys[board_id] = keys
+
+    def remove(self, board_id: int):
+        """
+        :param board_id: The id of the board to remove.
+        :raises KeyError: If the board isn't in the index.
+        """
+        del self._boards[board_id]
+        for square, key in enumerate(self._keys.pop(board_id)):
+            groups = self._groups[square]
+            group = groups[key]
+            group.remove(board_id)
+            # n^2 - (n - 1)^2
+            self._sums_of_squares[square] -= 2 * len(group) + 1
+            if not group:
+                del groups[key]
+
+    def consistent(self, square: Optional[Square], sense_result: List[Tuple[Square, Optional[chess.Piece]]]) \
+            -> Set[int]:
+        """
+        :param square: The sensed square, or `None` if the player didn't sense.
+        :param sense_result: The result of sensing `square`.
+        :return: The ids of the boards where sensing `square` has the result `sense_result`.
+        """
+        if square is None:
+            return set(self._boards)
+        return set(self._groups[square].get(encode_sense_result(sense_result), ()))
+
+    def prune(self, square: Optional[Square], sense_result: List[Tuple[Square, Optional[chess.Piece]]]) -> List[int]:
+        """
+        Removes the boards that aren't :meth:`consistent` with a sense result.
+
+        :param square: The sensed square, or `None` if the player didn't sense.
+        :param sense_result: The result of sensing `square`.
+        :return: The ids of the removed boards.
+        """
+        kept = self.consistent(square, sense_result)
+        removed = [board_id for board_id in self._boards if board_id not in kept]
+        if len(kept) < len(removed):
+            # indexing the boards that are kept again is cheaper than removing the others
+            boards = self._boards
+            self._boards = {}
+            self._keys = {}
+            self._groups = [{} for _ in chess.SQUARES]
+            self._sums_of_squares = [0] * len(chess.SQUARES)
+            for board_id in sorted(kept):
+                self._insert(board_id, boards[board_id])
+        else:
+            for board_id in removed:
+                self.remove(board_id)
+        return removed
+
+    def num_groups(self, square: Square) -> int:
+        """
+        :param square: The sensed square.
+        :return: The number of different results of sensing `square` on the boards.
+        """
+        return len(self._groups[square])
+
+    def expected_num_remaining(self) -> List[float]:
+        """
+        If the game is on one of the boards chosen uniformly at random, the number of boards left after sensing a square
+        is the size of the group of that board. The expected size is the sum of the squared group sizes over the number
+        of boards, which is kept up to date by :meth:`add` and :meth:`remove`.
+
+        :return: The expected number of :meth:`consistent` boards after sensing each square, in the order of
+            :data:`chess.SQUARES`. All zeros if the index is empty.
+        """
+        if not self._boards:
+            return [0.0] * len(chess.SQUARES)
+        num_boards = len(self._boards)
+        return [sum_of_squares / num_boards for sum_of_squares in self._sums_of_squares]
@@ -0,0 +1,110 @@
+import math
+import chess
+from .types import *
+from .utilities import sense_on, move_actions, take_move
+
+
+class SimulationState(object):
+    """
+    A lightweight version of the state of a :class:`LocalGame` for bots that simulate games, e.g. in a search. Senses
+    and moves have the same results as in :class:`LocalGame`, but there are no clocks, no :class:`GameHistory`, and no
+    checks that actions are valid.
+
+    Moves are undone in O(1) with :meth:`pop`, and :meth:`copy` doesn't copy the moves that can be undone. ::
+
+        state = SimulationState(board)
+        for move in state.move_actions():
+            state.push(move)
+            value = evaluate(state)
+            state.pop()
+    """
+
+    __slots__ = ['board', 'move_results', 'reversible_moves_limit', 'full_turn_limit', '_move_results_stack']
+
+    def __init__(self, board: Optional[chess.Board] = None, move_results: Optional[Square] = None,
+                 reversible_moves_limit: Optional[int] = 100, full_turn_limit: Optional[int] = None):
+        """
+        :param board: The true board, with the player to move next. Copied. Default is the starting position.
+        :param move_results: The square where the last move captured a piece, or None.
+        :param reversible_moves_limit: See :class:`LocalGame`.
+        :param full_turn_limit: See :class:`LocalGame`.
+        """
+        self.board = board.copy(stack=False) if board is not None else chess.Board()
+        self.move_results = move_results
+        self.reversible_moves_limit = reversible_moves_limit if reversible_moves_limit is not None else math.inf
+        self.full_turn_limit = full_turn_limit if full_turn_limit is not None else math.inf
+        self._move_results_stack = []
+
+    @classmethod
+    def from_game(cls, game) -> 'SimulationState':
+        """
+        :param game: A :class:`LocalGame`.
+        :return: The current state of `game`.
+        """
+        return cls(game.board, game.move_results, game.reversible_moves_limit, game.full_turn_limit)
+
+    @property
+    def turn(self) -> Color:
+        """The color of the player to move."""
+        return self.board.turn
+
+    def copy(self) -> 'SimulationState':
+        """
+        :return: A copy of the state, without the moves that can be undone with :meth:`pop`.
+        """
+        state = SimulationState.__new__(SimulationState)
+        state.board = self.board.copy(stack=False)
+        state.move_results = self.move_results
+        state.reversible_moves_limit = self.reversible_moves_limit
+        state.full_turn_limit = self.full_turn_limit
+        state._move_results_stack = []
+        return state
+
+    def sense_actions(self) -> List[Square]:
+        """:return: See :meth:`LocalGame.sense_actions`."""
+        return list(chess.SQUARES)
+
+    def move_actions(self) -> List[chess.Move]:
+        """:return: See :meth:`LocalGame.move_actions`."""
+        return move_actions(self.board)
+
+    def opponent_move_results(self) -> Optional[Square]:
+        """:return: See :meth:`LocalGame.opponent_move_results`."""
+        return self.move_results
+
+    def sense(self, square: Optional[Square]) -> List[Tuple[Square, Optional[chess.Piece]]]:
+        """:return: See :meth:`LocalGame.sense`."""
+        return sense_on(self.board, square)
+
+    def push(self, requested_move: Optional[chess.Move]) \
+            -> Tuple[Optional[chess.Move], Optional[chess.Move], Optional[Square]]:
+        """
+        Plays a move for the player to move, like :meth:`LocalGame.move` followed by :meth:`LocalGame.end_turn`.
+
+        :param requested_move: One of :meth:`move_actions`, or None to pass. Not checked.
+        :return: The requested move, the taken move, and the square of the captured piece if there was one.
+        """
+        taken_move, capture_square = take_move(self.board, requested_move)
+        self._move_results_stack.append(self.move_results)
+        self.board.push(taken_move if taken_move is not None else chess.Move.null())
+        self.move_results = capture_square
+        return requested_move, taken_move, capture_square
+
+    def pop(self):
+        """Undoes the last :meth:`push`."""
+        self.board.pop()
+        self.move_results = self._move_results_stack.pop()
+
+    def is_over(self) -> bool:
+        """:return: Whether a king was captured or a move limit was reached, see :meth:`LocalGame.is_over`."""
+        board = self.board
+        return board.king(chess.WHITE) is None or board.king(chess.BLACK) is None or \
+            board.fullmove_number > self.full_turn_limit or board.halfmove_clock >= self.reversible_moves_limit
+
+    def get_winner_color(self) -> Optional[Color]:
+        """:return: The color of the player whose king wasn't captured, or None if no king was captured."""
+        if self.board.king(chess.WHITE) is None:
+            return chess.BLACK
+        elif self.board.king(chess.BLACK) is None:
+            return chess.WHITE
+        return None
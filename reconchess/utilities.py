@@ -4,10 +4,39 @@ try:
     import simplejson as json
 except ImportError:
     import json
+import functools
 import chess
 from .types import *
 
 BACK_RANKS = list(chess.SquareSet(chess.BB_BACKRANKS))
+SLIDING_PIECE_TYPES = [chess.PAWN, chess.ROOK, chess.BISHOP, chess.QUEEN]
+
+
+def _sense_squares(square: Square) -> List[Square]:
+    rank, file = chess.square_rank(square), chess.square_file(square)
+    squares = []
+    for delta_rank in [1, 0, -1]:
+        for delta_file in [-1, 0, 1]:
+            if 0 <= rank + delta_rank <= 7 and 0 <= file + delta_file <= 7:
+                squares.append(chess.square(file + delta_file, rank + delta_rank))
+    return squares
+
+
+# the squares seen by sensing each square, from the top left to the bottom right of the window
+SENSE_SQUARES = [_sense_squares(square) for square in chess.SQUARES]
+
+# the bitboard of the squares seen by sensing each square
+SENSE_MASKS = [sum(chess.BB_SQUARES[sense_square] for sense_square in SENSE_SQUARES[square])
+               for square in chess.SQUARES]
+
+
+def sense_on(board: chess.Board, square: Optional[Square]) -> List[Tuple[Square, Optional[chess.Piece]]]:
+    """
+    :return: The result of sensing `square` on `board`, see :meth:`LocalGame.sense`. Empty if `square` is `None`.
+    """
+    if square is None:
+        return []
+    return [(sense_square, board.piece_at(sense_square)) for sense_square in SENSE_SQUARES[square]]
 
 
 def add_pawn_queen_promotion(board: chess.Board, move: chess.Move) -> chess.Move:
@@ -35,24 +64,52 @@ def is_illegal_castle(board: chess.Board, move: chess.Move) -> bool:
 
     # illegal if any pieces are between king & rook
     rook_square = chess.square(7 if board.is_kingside_castling(move) else 0, chess.square_rank(move.from_square))
-    between_squares = chess.SquareSet(chess.between(move.from_square, rook_square))
-    if any(map(lambda s: board.piece_at(s), between_squares)):
+    if board.occupied & chess.between(move.from_square, rook_square):
         return True
 
     # its legal
     return False
 
 
+def _slide_ray(from_square: Square, to_square: Square) -> Tuple[Tuple[Square, ...], int]:
+    # The squares a piece passes over going from `from_square` to `to_square`, nearest first and ending with the
+    # to-square. For squares that are not on a common rank, file or diagonal this is just the to-square.
+    squares = list(chess.SquareSet(chess.between(from_square, to_square)))
+    if to_square < from_square:
+        squares.reverse()
+    squares.append(to_square)
+    mask = (chess.between(from_square, to_square) | chess.BB_SQUARES[to_square]) & ~chess.BB_SQUARES[from_square]
+    return tuple(squares), mask
+
+
+# SLIDE_RAYS[from_square][to_square] is a tuple of (ray squares, ray mask), see :func:`_slide_ray`
+SLIDE_RAYS = [[_slide_ray(from_square, to_square) for to_square in chess.SQUARES] for from_square in chess.SQUARES]
+
+
 def slide_move(board: chess.Board, move: chess.Move) -> Optional[chess.Move]:
-    # We iterate longest to shortest so the revised move is the longest pseudo-legal move.
-    # If the to-square < from-square then we want our list in sorted order.
-    # Otherwise we want it in reverse order.
-    # In either case, we need to add the to-square to the front of our list manually.
-    squares = chess.SquareSet(chess.between(move.from_square, move.to_square))
-    if move.to_square > move.from_square:
-        squares = reversed(squares)
-    for slide_square in [move.to_square] + list(squares):
-        revised = chess.Move(move.from_square, slide_square, move.promotion)
+    # The revised move is the longest pseudo-legal move along the ray from the from-square to the to-square.
+    # No piece can move past the first occupied square on that ray, so only the squares up to and including it
+    # are candidates. The first blocker is found by bit scanning the ray mask against the board's occupancy.
+    from_square = move.from_square
+    squares, mask = SLIDE_RAYS[from_square][move.to_square]
+    blockers = mask & board.occupied
+    if blockers:
+        blocker = chess.lsb(blockers) if move.to_square > from_square else chess.msb(blockers)
+        squares = squares[:chess.square_distance(from_square, blocker)]
+
+    if (board.bishops | board.rooks | board.queens) & chess.BB_SQUARES[from_square]:
+        # sliding pieces can capture the blocker if it is an opponent piece, otherwise they stop just before it.
+        # if that move isn't pseudo-legal then no shorter one is either.
+        if board.occupied_co[board.turn] & chess.BB_SQUARES[squares[-1]]:
+            squares = squares[:-1]
+        if not squares:
+            return None
+        revised = chess.Move(from_square, squares[-1], move.promotion)
+        return revised if board.is_pseudo_legal(revised) else None
+
+    # pawns can't capture forwards and can only move up to two squares, so check each remaining square
+    for slide_square in reversed(squares):
+        revised = chess.Move(from_square, slide_square, move.promotion)
         if board.is_pseudo_legal(revised):
             return revised
     return None
@@ -112,12 +169,13 @@ def revise_move(board, move):
     if is_illegal_castle(board, move):
         return None
 
-    # if the piece is a sliding piece, slide it as far as it can go
+    # if the piece is a sliding piece, slide it as far as it can go. slide_move only returns pseudo-legal moves,
+    # and any other piece has already failed the pseudo-legal check above.
     piece = board.piece_at(move.from_square)
-    if piece.piece_type in [chess.PAWN, chess.ROOK, chess.BISHOP, chess.QUEEN]:
-        move = slide_move(board, move)
+    if piece.piece_type in SLIDING_PIECE_TYPES:
+        return slide_move(board, move)
 
-    return move if board.is_pseudo_legal(move) else None
+    return None
 
 
 def move_actions(board: chess.Board) -> List[chess.Move]:
@@ -127,32 +185,113 @@ def move_actions(board: chess.Board) -> List[chess.Move]:
     return moves_without_opponent_pieces(board) + pawn_capture_moves_on(board)
 
 
+def take_move(board: chess.Board, requested_move: Optional[chess.Move],
+              allowed_moves: Optional[List[chess.Move]] = None) -> Tuple[Optional[chess.Move], Optional[Square]]:
+    """
+    Applies the rules for moving to `requested_move` without pushing it: a queen promotion is added if the move could
+    have one, the move is revised with :func:`revise_move`, and the square of the piece it captures is found.
+
+    :param board: The board with the player to move.
+    :param requested_move: The requested move, or None to pass.
+    :param allowed_moves: Optional moves to check the promoted move against, e.g. :func:`move_actions`.
+    :return: The taken move, and the square of the captured piece if there is one.
+    :raises ValueError: If the move isn't one of `allowed_moves`.
+    """
+    if requested_move is None:
+        return None, None
+
+    # add in a queen promotion if the move doesn't have one but could have one
+    move = add_pawn_queen_promotion(board, requested_move)
+    if allowed_moves is not None and move not in allowed_moves:
+        raise ValueError('Requested move {} was not in move_actions()'.format(requested_move))
+
+    taken_move = revise_move(board, move)
+    return taken_move, capture_square_of_move(board, taken_move)
+
+
+# Each chess type is encoded as a JSON object with a tag that identifies the type, and a string value.
+# Version 1 objects look like ``{"type": "Move", "value": "e2e4"}``, and version 2 objects use a short tag as the only
+# key, like ``{"$m": "e2e4"}``. Decoders accept both versions.
+CHESS_JSON_VERSION = 2
+
+# there are only a few thousand distinct pieces and moves, so their parsed fields are cached. the objects themselves
+# are mutable, so a new one is made for every decoded value
+@functools.lru_cache(maxsize=None)
+def _piece_fields(symbol: str) -> tuple:
+    piece = chess.Piece.from_symbol(symbol)
+    return piece.piece_type, piece.color
+
+
+@functools.lru_cache(maxsize=None)
+def _move_fields(uci: str) -> tuple:
+    move = chess.Move.from_uci(uci)
+    return move.from_square, move.to_square, move.promotion, move.drop
+
+
+def _decode_piece(symbol: str) -> chess.Piece:
+    return chess.Piece(*_piece_fields(symbol))
+
+
+def _decode_move(uci: str) -> chess.Move:
+    return chess.Move(*_move_fields(uci))
+
+
+# (type, version 1 tag, version 2 tag, function to encode value, function to decode value)
+_CHESS_JSON_TYPES = [
+    (chess.Piece, 'Piece', '$p', chess.Piece.symbol, _decode_piece),
+    (chess.Move, 'Move', '$m', chess.Move.uci, _decode_move),
+    (chess.Board, 'Board', '$b', chess.Board.fen, chess.Board),
+    (WinReason, 'WinReason', '$w', lambda reason: reason.name, WinReason.__getitem__),
+]
+
+_V1_ENCODE_FNS = {cls: (lambda o, tag=tag, fn=fn: {'type': tag, 'value': fn(o)})
+                  for cls, tag, _, fn, _ in _CHESS_JSON_TYPES}
+_V2_ENCODE_FNS = {cls: (lambda o, tag=tag, fn=fn: {tag: fn(o)})
+                  for cls, _, tag, fn, _ in _CHESS_JSON_TYPES}
+_V1_DECODE_FNS = {tag: fn for _, tag, _, _, fn in _CHESS_JSON_TYPES}
+_V2_DECODE_FNS = {tag: fn for _, _, tag, _, fn in _CHESS_JSON_TYPES}
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
 class ChessJSONEncoder(json.JSONEncoder):
+    """Encodes chess objects using version 1 of the JSON format, e.g. ``{"type": "Move", "value": "e2e4"}``."""
+
+    version = 1
+    _encode_fns = _V1_ENCODE_FNS
+
     def default(self, o):
-        if isinstance(o, chess.Piece):
-            return {
-                'type': 'Piece',
-                'value': o.symbol(),
-            }
-        elif isinstance(o, chess.Move):
-            return {
-                'type': 'Move',
-                'value': o.uci(),
-            }
-        elif isinstance(o, chess.Board):
-            return {
-                'type': 'Board',
-                'value': o.fen(),
-            }
-        elif isinstance(o, WinReason):
-            return {
-                'type': 'WinReason',
-                'value': o.name,
-            }
+        encode_fn = self._encode_fns.get(type(o))
+        if encode_fn is None:
+            # fall back to isinstance checks for subclasses of the chess types
+            for cls, fn in self._encode_fns.items():
+                if isinstance(o, cls):
+                    encode_fn = fn
+                    break
+        if encode_fn is not None:
+            return encode_fn(o)
         return super().default(o)
 
 
+class CompactChessJSONEncoder(ChessJSONEncoder):
+    """Encodes chess objects using version 2 of the JSON format, e.g. ``{"$m": "e2e4"}``."""
+
+    version = 2
+    _encode_fns = _V2_ENCODE_FNS
+
+
+CHESS_JSON_ENCODERS = {
+    ChessJSONEncoder.version: ChessJSONEncoder,
+    CompactChessJSONEncoder.version: CompactChessJSONEncoder,
+}
+
+
 class ChessJSONDecoder(json.JSONDecoder):
+    """Decodes chess objects encoded with any version of the JSON format."""
+
     def __init__(self, *args, **kwargs):
         hook = self._object_hook
         if 'object_hook' in kwargs:
@@ -161,13 +300,53 @@ class ChessJSONDecoder(json.JSONDecoder):
         super().__init__(object_hook=hook, *args, **kwargs)
 
     def _object_hook(self, obj):
-        if 'type' in obj:
-            if obj['type'] == 'Piece':
-                return chess.Piece.from_symbol(obj['value'])
-            elif obj['type'] == 'Move':
-                return chess.Move.from_uci(obj['value'])
-            elif obj['type'] == 'Board':
-                return chess.Board(fen=obj['value'])
-            elif obj['type'] == 'WinReason':
-                return WinReason[obj['value']]
+        if len(obj) == 1:
+            (tag, value), = obj.items()
+            decode_fn = _V2_DECODE_FNS.get(tag)
+            if decode_fn is not None:
+                return decode_fn(value)
+        elif 'type' in obj:
+            decode_fn = _V1_DECODE_FNS.get(obj['type'])
+            if decode_fn is not None:
+                return decode_fn(obj['value'])
         return obj
+
+
+def _orjson_dumps(obj, cls: Type[ChessJSONEncoder]) -> bytes:
+    # chess.Move and chess.Piece are dataclasses in newer versions of python-chess, so they need to be passed
+    # through to default() as well
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+    return orjson.dumps(obj, default=cls().default, option=option)
+
+
+def chess_json_dumps(obj, cls: Type[ChessJSONEncoder] = ChessJSONEncoder) -> str:
+    """
+    Serializes `obj` to a JSON string using `cls`. Uses `orjson` if it is installed, which is much faster than the
+    standard library, and gives the same output.
+
+    orjson serializes enums by value without calling :meth:`ChessJSONEncoder.default`, so a :class:`WinReason` has to
+    be encoded with `cls().default` before it is put in `obj`.
+
+    :param obj: The object to serialize.
+    :param cls: The :class:`ChessJSONEncoder` class to use for chess types.
+    :return: The JSON string.
+    """
+    if orjson is not None:
+        return _orjson_dumps(obj, cls).decode()
+    return json.dumps(obj, cls=cls)
+
+
+def chess_json_dump(obj, fp, cls: Type[ChessJSONEncoder] = ChessJSONEncoder):
+    """
+    Serializes `obj` as UTF-8 encoded JSON to the binary file `fp`. Like :func:`chess_json_dumps`, uses `orjson` if it
+    is installed. Otherwise the JSON is written in chunks as it is encoded.
+
+    :param obj: The object to serialize.
+    :param fp: A file object opened in binary mode.
+    :param cls: The :class:`ChessJSONEncoder` class to use for chess types.
+    """
+    if orjson is not None:
+        fp.write(_orjson_dumps(obj, cls))
+    else:
+        for chunk in cls().iterencode(obj):
+            fp.write(chunk.encode('utf-8'))
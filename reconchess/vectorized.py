@@ -0,0 +1,380 @@
+"""
+Move generation and move revision over stacks of boards with `numpy`, for bots that keep many candidate boards, e.g. the
+boards the opponent could have. This module requires `numpy`.
+
+A stack of `N` boards is a `numpy.uint64` array with shape `(N, 12)`, where `stack[i, plane]` is the bitboard of the
+pieces of board `i` in that plane, see :func:`piece_plane`. Castling rights are an optional `numpy.uint64` array with
+shape `(N,)` in the format of :attr:`chess.Board.castling_rights`. En passant isn't represented.
+
+Moves are numbered by :data:`MOVES`, so that the move actions of a stack are a sparse `(N, NUM_MOVES)` matrix, given as
+the row and column indices of its non zero entries. ::
+
+    stack, castling_rights = stack_boards(boards)
+    rows, cols = move_actions_on_stack(stack, chess.WHITE, castling_rights)
+    actions = np.zeros((len(boards), NUM_MOVES), dtype=bool)
+    actions[rows, cols] = True
+"""
+import numpy as np
+import chess
+from .types import *
+from typing import Sequence
+from .utilities import SLIDE_RAYS
+
+NUM_PLANES = 12
+
+PROMOTION_PIECE_TYPES = [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
+
+
+def piece_plane(color: Color, piece_type: PieceType) -> int:
+    """
+    :return: The plane of a stack with the pieces of `color` and `piece_type`. White pieces are in planes 0 to 5 and
+        black pieces in planes 6 to 11, each in the order of :data:`chess.PIECE_TYPES`.
+    """
+    return (0 if color == chess.WHITE else 6) + piece_type - 1
+
+
+def _is_queen_or_knight_move(from_square: Square, to_square: Square) -> bool:
+    file_delta = abs(chess.square_file(to_square) - chess.square_file(from_square))
+    rank_delta = abs(chess.square_rank(to_square) - chess.square_rank(from_square))
+    return file_delta == 0 or rank_delta == 0 or file_delta == rank_delta or {file_delta, rank_delta} == {1, 2}
+
+
+def _move_vocabulary() -> List[chess.Move]:
+    moves = []
+    for from_square in chess.SQUARES:
+        for to_square in chess.SQUARES:
+            if from_square != to_square and _is_queen_or_knight_move(from_square, to_square):
+                moves.append(chess.Move(from_square, to_square))
+
+    # pawn moves onto the back ranks, with every promotion
+    for from_rank, to_rank in [(6, 7), (1, 0)]:
+        for from_file in range(8):
+            for to_file in range(max(0, from_file - 1), min(7, from_file + 1) + 1):
+                for promotion in PROMOTION_PIECE_TYPES:
+                    moves.append(chess.Move(chess.square(from_file, from_rank), chess.square(to_file, to_rank),
+                                            promotion))
+    return moves
+
+
+MOVES = _move_vocabulary()
+"""Every move that a piece can make, including promotions. Columns of the move actions matrix index this list."""
+
+NUM_MOVES = len(MOVES)
+
+MOVE_INDICES = {move: index for index, move in enumerate(MOVES)}
+"""The index of each move of :data:`MOVES`."""
+
+# PLAIN_MOVE_INDICES[from_square, to_square] is the index of the move without a promotion, or -1
+PLAIN_MOVE_INDICES = np.full((64, 64), -1, dtype=np.int64)
+# PROMOTION_MOVE_INDICES[from_square, to_square, i] is the index of the move promoting to PROMOTION_PIECE_TYPES[i]
+PROMOTION_MOVE_INDICES = np.full((64, 64, len(PROMOTION_PIECE_TYPES)), -1, dtype=np.int64)
+for _index, _move in enumerate(MOVES):
+    if _move.promotion is None:
+        PLAIN_MOVE_INDICES[_move.from_square, _move.to_square] = _index
+    else:
+        PROMOTION_MOVE_INDICES[_move.from_square, _move.to_square,
+                               PROMOTION_PIECE_TYPES.index(_move.promotion)] = _index
+
+SQUARE_BITS = np.array(chess.BB_SQUARES, dtype=np.uint64)
+
+_NOT_FILE_A = ~chess.BB_FILE_A & chess.BB_ALL
+_NOT_FILE_H = ~chess.BB_FILE_H & chess.BB_ALL
+_NOT_FILES_AB = ~(chess.BB_FILE_A | chess.BB_FILE_B) & chess.BB_ALL
+_NOT_FILES_GH = ~(chess.BB_FILE_G | chess.BB_FILE_H) & chess.BB_ALL
+
+# square delta -> the squares that can move by the delta without wrapping around the board
+_SHIFT_MASKS = {
+    8: chess.BB_ALL, -8: chess.BB_ALL,
+    1: _NOT_FILE_H, -1: _NOT_FILE_A,
+    9: _NOT_FILE_H, -7: _NOT_FILE_H, 7: _NOT_FILE_A, -9: _NOT_FILE_A,
+    16: chess.BB_ALL, -16: chess.BB_ALL,
+    17: _NOT_FILE_H, -15: _NOT_FILE_H, 15: _NOT_FILE_A, -17: _NOT_FILE_A,
+    10: _NOT_FILES_GH, -6: _NOT_FILES_GH, 6: _NOT_FILES_AB, -10: _NOT_FILES_AB,
+}
+
+ROOK_DELTAS = [8, -8, 1, -1]
+BISHOP_DELTAS = [9, 7, -7, -9]
+KING_DELTAS = ROOK_DELTAS + BISHOP_DELTAS
+KNIGHT_DELTAS = [17, 15, 10, 6, -6, -10, -15, -17]
+
+# kinds of moves, which decide how promotions are added
+_PLAIN, _PAWN_PUSH, _PAWN_CAPTURE = 0, 1, 2
+
+
+def _u64(bb: int) -> np.uint64:
+    return np.uint64(bb)
+
+
+def _shift(bb: np.ndarray, delta: int) -> np.ndarray:
+    bb = bb & _u64(_SHIFT_MASKS[delta])
+    return bb << _u64(delta) if delta > 0 else bb >> _u64(-delta)
+
+
+def _occupied(stack: np.ndarray, color: Color) -> np.ndarray:
+    start = piece_plane(color, chess.PAWN)
+    return np.bitwise_or.reduce(stack[:, start:start + 6], axis=1)
+
+
+def _scan_bits(bbs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # the row, column and square of every set bit of a 2d array of bitboards
+    num_cols = bbs.shape[1]
+    indices = np.flatnonzero(bbs)
+    bbs = bbs.ravel()[indices]
+    all_indices, all_squares = [], []
+    while len(bbs):
+        lowest = bbs & (~bbs + _u64(1))
+        # powers of two are exact as floats, so their exponent is the square
+        all_indices.append(indices)
+        all_squares.append(np.frexp(lowest.astype(np.float64))[1] - 1)
+        bbs ^= lowest
+        remaining = bbs != 0
+        bbs = bbs[remaining]
+        indices = indices[remaining]
+
+    indices = np.concatenate(all_indices) if all_indices else np.zeros(0, dtype=np.int64)
+    squares = np.concatenate(all_squares).astype(np.int64) if all_squares else np.zeros(0, dtype=np.int64)
+    rows, cols = np.divmod(indices, num_cols)
+    return rows, cols, squares
+
+
+def stack_boards(boards: Sequence[chess.Board]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param boards: The boards to stack.
+    :return: The stack of the boards, and their castling rights.
+    """
+    stack = np.empty((len(boards), NUM_PLANES), dtype=np.uint64)
+    for i, board in enumerate(boards):
+        for color in chess.COLORS:
+            occupied = board.occupied_co[color]
+            for piece_type, bb in zip(chess.PIECE_TYPES, [board.pawns, board.knights, board.bishops, board.rooks,
+                                                           board.queens, board.kings]):
+                stack[i, piece_plane(color, piece_type)] = bb & occupied
+    castling_rights = np.array([board.castling_rights for board in boards], dtype=np.uint64)
+    return stack, castling_rights
+
+
+def unstack_board(stack: np.ndarray, index: int, turn: Color,
+                  castling_rights: Optional[np.ndarray] = None) -> chess.Board:
+    """
+    :param stack: A stack of boards.
+    :param index: The index of the board in the stack.
+    :param turn: The color to move.
+    :param castling_rights: Optional castling rights of the stack.
+    :return: The board as a :class:`chess.Board`, without en passant and move counters.
+    """
+    board = chess.Board.empty()
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            for square in chess.scan_forward(int(stack[index, piece_plane(color, piece_type)])):
+                board.set_piece_at(square, chess.Piece(piece_type, color))
+    board.turn = turn
+    if castling_rights is not None:
+        board.castling_rights = int(castling_rights[index])
+    return board
+
+
+def _castling_moves(stack: np.ndarray, color: Color, occupied: np.ndarray, castling_rights: np.ndarray,
+                    king_to_file: int) -> np.ndarray:
+    # the boards where the king can castle to `king_to_file`, see :func:`is_psuedo_legal_castle`
+    back_rank = 0 if color == chess.WHITE else 7
+    king_square = chess.square(4, back_rank)
+    rook_square = chess.square(7 if king_to_file == 6 else 0, back_rank)
+    rook_bit = _u64(chess.BB_SQUARES[rook_square])
+    return ((castling_rights & rook_bit) != 0) & \
+        ((stack[:, piece_plane(color, chess.ROOK)] & rook_bit) != 0) & \
+        ((stack[:, piece_plane(color, chess.KING)] & _u64(chess.BB_SQUARES[king_square])) != 0) & \
+        ((occupied & _u64(chess.between(king_square, rook_square))) == 0)
+
+
+def move_actions_on_stack(stack: np.ndarray, color: Color, castling_rights: Optional[np.ndarray] = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Generates :func:`move_actions` for every board of a stack: the pseudo legal moves of `color` with the opponent's
+    pieces removed, plus every pawn capture, even where there is no piece to capture.
+
+    :param stack: A stack of boards.
+    :param color: The color to generate moves for.
+    :param castling_rights: Optional castling rights of the stack. No castling moves are generated without them.
+    :return: The row and column indices of the sparse `(N, NUM_MOVES)` move actions matrix, sorted by row and then
+        column. Columns index :data:`MOVES`.
+    """
+    own = _occupied(stack, color)
+    empty = ~own
+
+    # (to-square bitboards of each board, from-square = to-square - delta, kind)
+    targets = []
+
+    for piece_types, deltas in [((chess.ROOK, chess.QUEEN), ROOK_DELTAS), ((chess.BISHOP, chess.QUEEN), BISHOP_DELTAS)]:
+        sliders = stack[:, piece_plane(color, piece_types[0])] | stack[:, piece_plane(color, piece_types[1])]
+        for delta in deltas:
+            # without opponent pieces, sliders move until they reach the edge or one of their own pieces
+            bb = sliders
+            for distance in range(1, 8):
+                bb = _shift(bb, delta) & empty
+                if not bb.any():
+                    break
+                targets.append((bb, delta * distance, _PLAIN))
+
+    for piece_type, deltas in [(chess.KNIGHT, KNIGHT_DELTAS), (chess.KING, KING_DELTAS)]:
+        pieces = stack[:, piece_plane(color, piece_type)]
+        for delta in deltas:
+            targets.append((_shift(pieces, delta) & empty, delta, _PLAIN))
+
+    pawns = stack[:, piece_plane(color, chess.PAWN)]
+    forward = 8 if color == chess.WHITE else -8
+    single_push = _shift(pawns, forward) & empty
+    third_rank = _u64(chess.BB_RANK_3 if color == chess.WHITE else chess.BB_RANK_6)
+    targets.append((single_push, forward, _PAWN_PUSH))
+    targets.append((_shift(single_push & third_rank, forward) & empty, 2 * forward, _PLAIN))
+    for delta in ([7, 9] if color == chess.WHITE else [-7, -9]):
+        targets.append((_shift(pawns, delta) & empty, delta, _PAWN_CAPTURE))
+
+    bbs = np.stack([bb for bb, _, _ in targets], axis=1)
+    deltas = np.array([delta for _, delta, _ in targets], dtype=np.int64)
+    kinds = np.array([kind for _, _, kind in targets], dtype=np.int64)
+
+    rows, slots, to_squares = _scan_bits(bbs)
+    from_squares = to_squares - deltas[slots]
+    kinds = kinds[slots]
+
+    back_rank = 7 if color == chess.WHITE else 0
+    promotes = (kinds != _PLAIN) & (to_squares // 8 == back_rank)
+    plain = ~promotes | (kinds == _PAWN_CAPTURE)
+
+    all_rows = [rows[plain]]
+    all_cols = [PLAIN_MOVE_INDICES[from_squares[plain], to_squares[plain]]]
+    for i in range(len(PROMOTION_PIECE_TYPES)):
+        all_rows.append(rows[promotes])
+        all_cols.append(PROMOTION_MOVE_INDICES[from_squares[promotes], to_squares[promotes], i])
+
+    if castling_rights is not None:
+        king_square = chess.square(4, 0 if color == chess.WHITE else 7)
+        for king_to_file in [6, 2]:
+            castle_rows = np.nonzero(_castling_moves(stack, color, own, castling_rights, king_to_file))[0]
+            all_rows.append(castle_rows)
+            all_cols.append(np.full(len(castle_rows), PLAIN_MOVE_INDICES[
+                king_square, chess.square(king_to_file, chess.square_rank(king_square))]))
+
+    # every piece is on a different from-square, so there are no duplicate moves to remove
+    keys = np.concatenate(all_rows) * NUM_MOVES + np.concatenate(all_cols)
+    keys.sort()
+    return keys // NUM_MOVES, keys % NUM_MOVES
+
+
+def revise_move_on_stack(stack: np.ndarray, color: Color, move: chess.Move,
+                         castling_rights: Optional[np.ndarray] = None) \
+        -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray, np.ndarray]:
+    """
+    Plays `move` on every board of a stack like :meth:`LocalGame.move`: the move is given a queen promotion if needed,
+    revised with :func:`revise_move`, and then pushed, or a pass is pushed if the revised move is `None`. The results
+    only match :meth:`LocalGame.move` on boards where `move` is one of the :func:`move_actions`, which is every board
+    the game can be on.
+
+    :param stack: A stack of boards.
+    :param color: The color to move.
+    :param move: The requested move.
+    :param castling_rights: Optional castling rights of the stack. Castling is only possible with them.
+    :return: The new stack, the new castling rights (or `None`), the to-square of the taken move on each board (or -1
+        if it is `None`), and the square of the captured piece on each board (or -1 if nothing was captured). The
+        taken move is `chess.Move(move.from_square, to_square, promotion)`, where the promotion is that of the
+        requested move, or a queen for a pawn moving to the back rank without one.
+    """
+    num_boards = len(stack)
+    from_square, to_square = move.from_square, move.to_square
+    from_bit = _u64(chess.BB_SQUARES[from_square])
+    own = _occupied(stack, color)
+    opponent = _occupied(stack, not color)
+    occupied = own | opponent
+
+    def is_occupied(bb, square):
+        return (bb & _u64(chess.BB_SQUARES[square])) != 0
+
+    def has_piece(piece_type):
+        return (stack[:, piece_plane(color, piece_type)] & from_bit) != 0
+
+    file_delta = chess.square_file(to_square) - chess.square_file(from_square)
+    rank_delta = chess.square_rank(to_square) - chess.square_rank(from_square)
+    straight = file_delta == 0 or rank_delta == 0
+    diagonal = abs(file_delta) == abs(rank_delta)
+    back_rank = 7 if color == chess.WHITE else 0
+    forward = 1 if color == chess.WHITE else -1
+
+    to_squares = np.full(num_boards, -1, dtype=np.int64)
+    castles = np.zeros(num_boards, dtype=bool)
+
+    # sliding pieces stop at the first piece on the ray, and capture it if it is an opponent piece
+    sliders = np.zeros(num_boards, dtype=bool)
+    if straight:
+        sliders |= has_piece(chess.ROOK) | has_piece(chess.QUEEN)
+    if diagonal:
+        sliders |= has_piece(chess.BISHOP) | has_piece(chess.QUEEN)
+    if sliders.any():
+        ray, _ = SLIDE_RAYS[from_square][to_square]
+        length = np.full(num_boards, len(ray), dtype=np.int64)
+        blocked = np.zeros(num_boards, dtype=bool)
+        for i, square in enumerate(ray):
+            first_blocker = is_occupied(occupied, square) & ~blocked
+            length[first_blocker] = np.where(is_occupied(own, square)[first_blocker], i, i + 1)
+            blocked |= first_blocker
+        ray_squares = np.array(ray + (-1,), dtype=np.int64)
+        to_squares = np.where(sliders & (length > 0), ray_squares[length - 1], to_squares)
+
+    # knights and kings move to any square that isn't occupied by their own pieces
+    if {abs(file_delta), abs(rank_delta)} == {1, 2}:
+        to_squares = np.where(has_piece(chess.KNIGHT) & ~is_occupied(own, to_square), to_square, to_squares)
+    if max(abs(file_delta), abs(rank_delta)) == 1:
+        to_squares = np.where(has_piece(chess.KING) & ~is_occupied(own, to_square), to_square, to_squares)
+
+    # castling only needs the rights, and no pieces between the king and the rook
+    if castling_rights is not None and rank_delta == 0 and abs(file_delta) == 2 and \
+            from_square == chess.square(4, 7 - back_rank):
+        castles = has_piece(chess.KING) & _castling_moves(stack, color, occupied, castling_rights,
+                                                          chess.square_file(to_square))
+        to_squares = np.where(castles, to_square, to_squares)
+
+    # pawns push onto empty squares, up to two from their starting rank, and only capture diagonally
+    pawns = has_piece(chess.PAWN)
+    if pawns.any() and file_delta == 0 and rank_delta == forward:
+        to_squares = np.where(pawns & ~is_occupied(occupied, to_square), to_square, to_squares)
+    elif pawns.any() and file_delta == 0 and rank_delta == 2 * forward:
+        middle_square = from_square + 8 * forward
+        on_start_rank = chess.square_rank(from_square) == (1 if color == chess.WHITE else 6)
+        full_push = ~is_occupied(occupied, to_square) & on_start_rank
+        to_squares = np.where(pawns & ~is_occupied(occupied, middle_square),
+                              np.where(full_push, to_square, middle_square), to_squares)
+    elif pawns.any() and abs(file_delta) == 1 and rank_delta == forward:
+        to_squares = np.where(pawns & is_occupied(opponent, to_square), to_square, to_squares)
+
+    # push the taken moves
+    moved = to_squares >= 0
+    to_bits = np.where(moved, SQUARE_BITS[np.maximum(to_squares, 0)], _u64(0))
+    from_bits = np.where(moved, from_bit, _u64(0))
+    captures = moved & ((opponent & to_bits) != 0)
+    capture_squares = np.where(captures, to_squares, -1)
+
+    promotion = move.promotion if move.promotion is not None else chess.QUEEN
+    promotes = pawns & moved & (to_squares // 8 == back_rank)
+
+    new_stack = stack.copy()
+    for piece_type in chess.PIECE_TYPES:
+        new_stack[:, piece_plane(not color, piece_type)] &= ~to_bits
+        plane = piece_plane(color, piece_type)
+        lands = has_piece(piece_type) & ~promotes if piece_type != promotion else has_piece(piece_type) | promotes
+        new_stack[:, plane] = (new_stack[:, plane] & ~from_bits) | np.where(lands, to_bits, _u64(0))
+
+    if castles.any():
+        rook_from = chess.square(7 if chess.square_file(to_square) == 6 else 0, chess.square_rank(from_square))
+        rook_to = chess.square(5 if chess.square_file(to_square) == 6 else 3, chess.square_rank(from_square))
+        plane = piece_plane(color, chess.ROOK)
+        new_stack[:, plane] = np.where(castles, (new_stack[:, plane] & ~_u64(chess.BB_SQUARES[rook_from])) |
+                                       _u64(chess.BB_SQUARES[rook_to]), new_stack[:, plane])
+
+    new_castling_rights = None
+    if castling_rights is not None:
+        # see :meth:`chess.Board.push`
+        new_castling_rights = castling_rights & ~(from_bits | to_bits)
+        king_moved = moved & has_piece(chess.KING)
+        back_rank_bits = _u64(chess.BB_RANK_1 if color == chess.WHITE else chess.BB_RANK_8)
+        new_castling_rights = np.where(king_moved, new_castling_rights & ~back_rank_bits, new_castling_rights)
+
+    return new_stack, new_castling_rights, to_squares, capture_squares
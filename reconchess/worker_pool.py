@@ -0,0 +1,346 @@
+import multiprocessing
+import os
+import signal
+import threading
+import traceback
+from contextlib import contextmanager
+import chess
+from .types import *
+from .player import Player, load_player
+from .history import GameHistory
+
+
+class PlayerWorkerError(Exception):
+    """Raised by a :class:`WorkerPlayer` when the bot raised an exception or its worker process died."""
+    pass
+
+
+def _player_worker(connection, bot_source: str):
+    # the parent process decides when workers stop
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # the bot is only loaded once per worker, so anything it loads at import time stays warm between games
+    try:
+        _, bot_cls = load_player(bot_source)
+    except BaseException:
+        connection.send(('error', traceback.format_exc()))
+        connection.close()
+        return
+    connection.send(('ready', None))
+
+    player = None
+    planes = None
+    ponder_thread = None
+    ponder_stop = None
+    ponder_error = None
+
+    def ponder():
+        nonlocal ponder_error
+        try:
+            player.ponder(ponder_stop)
+        except Exception:
+            ponder_error = traceback.format_exc()
+
+    try:
+        while True:
+            message = connection.recv()
+            command = message[0]
+            if command == 'new':
+                try:
+                    player = bot_cls()
+                    planes = None
+                    connection.send(('ok', (player.wants_to_ponder, player.wants_observation_planes)))
+                except Exception:
+                    connection.send(('error', traceback.format_exc()))
+            elif command == 'planes':
+                # the game updates its planes in place, so the worker keeps its own copy that each call updates
+                planes = message[1]
+                try:
+                    connection.send(('ok', player.handle_observation_planes(planes)))
+                except Exception:
+                    connection.send(('error', traceback.format_exc()))
+            elif command == 'call':
+                _, method, args, new_planes = message
+                if new_planes is not None:
+                    planes[...] = new_planes
+                try:
+                    connection.send(('ok', getattr(player, method)(*args)))
+                except Exception:
+                    connection.send(('error', traceback.format_exc()))
+            elif command == 'ponder':
+                ponder_stop = threading.Event()
+                ponder_error = None
+                ponder_thread = threading.Thread(target=ponder, daemon=True)
+                ponder_thread.start()
+                connection.send(('ok', None))
+            elif command == 'stop_ponder':
+                ponder_stop.set()
+                ponder_thread.join()
+                connection.send(('ok', None) if ponder_error is None else ('error', ponder_error))
+            elif command == 'close':
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        connection.close()
+
+
+class _Worker(object):
+    def __init__(self, ctx, bot_source: str, timeout: Optional[float] = None):
+        self.connection, child_connection = ctx.Pipe()
+        self.process = ctx.Process(target=_player_worker, args=(child_connection, bot_source), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.timeout = timeout
+        self.ready = False
+        self.load_failed = False
+        self.crashed = False
+        self.games_played = 0
+
+    def _recv(self):
+        if not self.connection.poll(self.timeout):
+            # the worker can't be trusted to reply to anything after this, so it is replaced like a dead one
+            self.crashed = True
+            raise PlayerWorkerError('worker process {} did not reply within {} seconds'.format(self.process.pid,
+                                                                                              self.timeout))
+        return self.connection.recv()
+
+    def request(self, *message):
+        try:
+            if not self.ready:
+                status, value = self._recv()
+                if status == 'error':
+                    self.crashed = True
+                    self.load_failed = True
+                    raise PlayerWorkerError('bot failed to load in worker process {}:\n{}'.format(self.process.pid,
+                                                                                                   value))
+                self.ready = True
+            self.connection.send(message)
+            status, value = self._recv()
+        except (EOFError, OSError) as e:
+            self.crashed = True
+            self.load_failed = not self.ready
+            raise PlayerWorkerError('worker process {} died'.format(self.process.pid)) from e
+        if status == 'error':
+            raise PlayerWorkerError('bot raised an exception in worker process {}:\n{}'.format(self.process.pid,
+                                                                                                 value))
+        return value
+
+    def is_alive(self) -> bool:
+        return not self.crashed and self.process.is_alive()
+
+    def close(self, timeout: float = 5):
+        try:
+            self.connection.send(('close',))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            # workers ignore SIGTERM, see _player_worker
+            if hasattr(signal, 'SIGKILL'):
+                os.kill(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+class WorkerPlayer(Player):
+    """
+    A :class:`Player` whose callbacks run in a worker process of a :class:`PlayerWorkerPool`. The arguments and return
+    values of each callback are pickled and sent over a pipe.
+
+    :attr:`wants_to_ponder` and :attr:`wants_observation_planes` are those of the bot. Pondering runs in a thread of
+    the worker process, and the observation planes are copied to the worker with every callback.
+    """
+
+    def __init__(self, worker: _Worker, wants_to_ponder: bool = False, wants_observation_planes: bool = False):
+        self._worker = worker
+        self.wants_to_ponder = wants_to_ponder
+        self.wants_observation_planes = wants_observation_planes
+        self._planes = None
+
+    def _call(self, method: str, *args):
+        return self._worker.request('call', method, args, self._planes)
+
+    def handle_observation_planes(self, planes):
+        self._worker.request('planes', planes)
+        self._planes = planes
+
+    def ponder(self, stop: threading.Event):
+        self._worker.request('ponder')
+        stop.wait()
+        self._worker.request('stop_ponder')
+
+    def handle_game_start(self, color: Color, board: chess.Board, opponent_name: str):
+        self._call('handle_game_start', color, board, opponent_name)
+
+    def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
+        self._call('handle_opponent_move_result', captured_my_piece, capture_square)
+
+    def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> \
+            Optional[Square]:
+        return self._call('choose_sense', sense_actions, move_actions, seconds_left)
+
+    def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        self._call('handle_sense_result', sense_result)
+
+    def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        return self._call('choose_move', move_actions, seconds_left)
+
+    def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                           captured_opponent_piece: bool, capture_square: Optional[Square]):
+        self._call('handle_move_result', requested_move, taken_move, captured_opponent_piece, capture_square)
+
+    def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason],
+                        game_history: GameHistory):
+        self._call('handle_game_end', winner_color, win_reason, game_history)
+
+
+class PlayerWorkerPool(object):
+    """
+    A pool of pre-started worker processes that each load a bot once with :func:`load_player` and then play any
+    number of games with it, one at a time. Games avoid the cost of starting a process and importing the bot, and
+    anything the bot loads at import time (e.g. model weights) stays loaded between games. A new instance of the bot
+    class is still created for every game.
+
+    Workers that die or don't reply within `timeout` are replaced with new ones, and the game they were playing raises
+    :class:`PlayerWorkerError`. If the bot fails to load in `max_load_failures` workers in a row, workers are no longer
+    replaced and :meth:`acquire` raises :class:`PlayerWorkerError`.
+
+    Example usage: ::
+
+        with PlayerWorkerPool('my_bot.py', num_workers=4) as pool:
+            with pool.player() as player:
+                play_remote_game(server_url, game_id, auth, player)
+    """
+
+    def __init__(self, bot_source: str, num_workers: int, context: Optional[str] = None,
+                 timeout: Optional[float] = 3600, max_load_failures: int = 3):
+        """
+        :param bot_source: The path to the bot source file or the bot module name, see :func:`load_player`.
+        :param num_workers: The number of worker processes, which is the number of games that can be played at the
+            same time.
+        :param context: The :mod:`multiprocessing` start method to use, e.g. `'fork'` or `'spawn'`.
+        :param timeout: Seconds to wait for a worker to load the bot or to return from a callback before replacing
+            it, or None to wait forever. The default is longer than any callback of a game with a 15 minute clock.
+        :param max_load_failures: The number of workers in a row the bot can fail to load in before the pool stops
+            replacing them.
+        """
+        self.bot_source = bot_source
+        self.num_workers = num_workers
+        self.timeout = timeout
+        self.max_load_failures = max_load_failures
+        self.num_restarts = 0
+        self.num_load_failures = 0
+        self._ctx = multiprocessing.get_context(context)
+        self.start_method = self._ctx.get_start_method()
+        """The :mod:`multiprocessing` start method of the workers."""
+        self._condition = threading.Condition()
+        self._idle = [_Worker(self._ctx, bot_source, timeout) for _ in range(num_workers)]
+        self._busy = set()
+        self._closed = False
+
+    def _restart(self, worker: _Worker) -> Optional[_Worker]:
+        worker.close(timeout=0)
+        if worker.load_failed:
+            self.num_load_failures += 1
+        if self.is_broken():
+            # a bot that can't be loaded would only fail again in a new worker
+            return None
+        self.num_restarts += 1
+        return _Worker(self._ctx, self.bot_source, self.timeout)
+
+    def is_broken(self) -> bool:
+        """:return: Whether the bot failed to load in `max_load_failures` workers in a row."""
+        return self.num_load_failures >= self.max_load_failures
+
+    def supervise(self):
+        """Replaces any idle workers whose process died."""
+        with self._condition:
+            workers = [worker if worker.is_alive() else self._restart(worker) for worker in self._idle]
+            self._idle = [worker for worker in workers if worker is not None]
+            self._condition.notify_all()
+
+    def num_idle(self) -> int:
+        with self._condition:
+            return len(self._idle)
+
+    def acquire(self, timeout: Optional[float] = None) -> WorkerPlayer:
+        """
+        Reserves an idle worker for a game, waiting for one if they are all busy.
+
+        :param timeout: Seconds to wait for an idle worker, or None to wait forever.
+        :return: A :class:`WorkerPlayer` with a new instance of the bot, to be given back with :meth:`release`.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._idle or self._closed or self.is_broken(), timeout):
+                raise TimeoutError('No idle workers after {} seconds'.format(timeout))
+            if self._closed:
+                raise RuntimeError('PlayerWorkerPool is closed')
+            worker = self._idle.pop() if self._idle else None
+            if worker is not None and not worker.is_alive():
+                worker = self._restart(worker)
+            if worker is None:
+                raise PlayerWorkerError('{} failed to load in {} workers in a row'.format(self.bot_source,
+                                                                                         self.num_load_failures))
+            self._busy.add(worker)
+
+        try:
+            wants_to_ponder, wants_observation_planes = worker.request('new')
+        except PlayerWorkerError:
+            self._release_worker(worker)
+            raise
+
+        with self._condition:
+            self.num_load_failures = 0
+        return WorkerPlayer(worker, wants_to_ponder, wants_observation_planes)
+
+    def release(self, player: WorkerPlayer):
+        """
+        Makes the worker of `player` available to other games. Dead workers are replaced.
+
+        :param player: A :class:`WorkerPlayer` from :meth:`acquire`.
+        """
+        player._worker.games_played += 1
+        self._release_worker(player._worker)
+
+    def _release_worker(self, worker: _Worker):
+        with self._condition:
+            self._busy.discard(worker)
+            if self._closed:
+                worker.close()
+                return
+            if not worker.is_alive():
+                worker = self._restart(worker)
+            if worker is not None:
+                self._idle.append(worker)
+            # waiters also have to find out when the pool is broken
+            self._condition.notify_all()
+
+    @contextmanager
+    def player(self, timeout: Optional[float] = None):
+        """
+        Context manager version of :meth:`acquire` and :meth:`release`.
+        """
+        player = self.acquire(timeout)
+        try:
+            yield player
+        finally:
+            self.release(player)
+
+    def close(self):
+        """Stops the idle workers. Busy workers are stopped when they are released."""
+        with self._condition:
+            self._closed = True
+            for worker in self._idle:
+                worker.close()
+            self._idle = []
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
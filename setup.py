@@ -26,6 +26,8 @@ setuptools.setup(
             'rc-register=reconchess.scripts.rc_register:main',
             'rc-connect=reconchess.scripts.rc_connect:main',
             'rc-play-on-server=reconchess.scripts.rc_play_on_server:main',
+            'rc-local-server=reconchess.scripts.rc_local_server:main',
+            'rc-load-test=reconchess.scripts.rc_load_test:main',
         ],
     },
     python_requires='>=3.5',
@@ -0,0 +1,163 @@
+import unittest
+from chess import *
+from reconchess import *
+from reconchess.bots.random_bot import RandomBot
+from reconchess.utilities import move_actions
+import random
+
+try:
+    import numpy as np
+    from reconchess.env import *
+except ImportError:
+    np = None
+
+
+def random_action(mask):
+    return random.choice(list(np.flatnonzero(mask)))
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class MoveEncodingTestCase(unittest.TestCase):
+    def test_pass(self):
+        self.assertEqual(encode_move(None), PASS_ACTION)
+        self.assertIsNone(decode_move(PASS_ACTION))
+
+    def test_round_trip(self):
+        board = Board()
+        board.set_board_fen('r3k2r/1P6/8/8/8/8/6p1/R3K2R')
+        for move in move_actions(board):
+            action = encode_move(move)
+            self.assertTrue(0 <= action < PASS_ACTION)
+            if move.promotion == QUEEN:
+                self.assertEqual(decode_move(action), Move(move.from_square, move.to_square))
+            else:
+                self.assertEqual(decode_move(action), move)
+
+    def test_unique(self):
+        actions = set()
+        for from_square in SQUARES:
+            for to_square in SQUARES:
+                for promotion in [None, KNIGHT, BISHOP, ROOK]:
+                    actions.add(encode_move(Move(from_square, to_square, promotion)))
+        self.assertEqual(len(actions), PASS_ACTION)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class RBCEnvTestCase(unittest.TestCase):
+    def test_initial_observation(self):
+        env = RBCEnv(RandomBot, color=WHITE)
+        observation = env.reset()
+        self.assertEqual(observation.shape, (NUM_PLANES, 8, 8))
+        self.assertEqual(list(observation[PAWN - 1][1]), [1] * 8)
+        self.assertEqual(observation[KING - 1][0][4], 1)
+        self.assertEqual(observation[OWN_PIECE_PLANES].sum(), 16)
+        self.assertEqual(observation[SENSED_PIECE_PLANES].sum(), 0)
+        self.assertTrue((observation[COLOR_PLANE] == 1).all())
+        self.assertTrue((observation[MOVE_PHASE_PLANE] == 0).all())
+
+    def test_black_waits_for_opponent(self):
+        env = RBCEnv(RandomBot, color=BLACK)
+        observation = env.reset()
+        self.assertEqual(env.game.turn, BLACK)
+        self.assertEqual(list(observation[PAWN - 1][6]), [1] * 8)
+        self.assertTrue((observation[COLOR_PLANE] == 0).all())
+
+    def test_sense(self):
+        env = RBCEnv(RandomBot, color=WHITE)
+        env.reset()
+        observation, reward, done, info = env.step(B7)
+        self.assertEqual((reward, done, info['phase']), (0, False, 'move'))
+        self.assertEqual(observation[SENSED_SQUARES_PLANE].sum(), 9)
+        self.assertEqual(observation[SENSED_PIECE_PLANES].sum(), 6)
+        self.assertEqual(observation[ROOK - 1 + 6][7][0], 1)
+        self.assertTrue((observation[MOVE_PHASE_PLANE] == 1).all())
+
+    def test_action_mask(self):
+        env = RBCEnv(RandomBot, color=WHITE)
+        env.reset()
+        self.assertEqual(env.action_mask().sum(), 65)
+        env.step(PASS_ACTION)
+        self.assertEqual(set(np.flatnonzero(env.action_mask())),
+                         set(map(encode_move, env.game.move_actions())) | {PASS_ACTION})
+
+    def test_invalid_sense(self):
+        env = RBCEnv(RandomBot)
+        env.reset()
+        with self.assertRaises(ValueError):
+            env.step(100)
+
+    def test_invalid_move(self):
+        env = RBCEnv(RandomBot, color=WHITE)
+        env.reset()
+        env.step(PASS_ACTION)
+        for move in [Move(E2, E5), Move(E7, E5)]:
+            with self.assertRaises(ValueError):
+                env.step(encode_move(move))
+        for action in [-1, NUM_ACTIONS]:
+            with self.assertRaises(ValueError):
+                env.step(action)
+
+        # the invalid actions didn't change the phase
+        env.step(encode_move(Move(E2, E4)))
+        self.assertEqual(env.phase, SENSE_PHASE)
+
+    def test_step_after_done(self):
+        env = RBCEnv(RandomBot, full_turn_limit=50)
+        with self.assertRaises(RuntimeError):
+            env.step(PASS_ACTION)
+
+        env.reset()
+        done = False
+        while not done:
+            _, _, done, _ = env.step(random_action(env.action_mask()))
+        with self.assertRaises(RuntimeError):
+            env.step(PASS_ACTION)
+
+    def test_full_game(self):
+        env = RBCEnv(RandomBot, full_turn_limit=50)
+        env.reset()
+        done, reward, info = False, 0, None
+        while not done:
+            observation, reward, done, info = env.step(random_action(env.action_mask()))
+        self.assertIn(reward, [-1, 0, 1])
+        self.assertTrue(env.game.is_over())
+        if info['winner_color'] is None:
+            self.assertEqual(reward, 0)
+        else:
+            self.assertEqual(reward, 1 if info['winner_color'] == env.agent_color else -1)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class VectorRBCEnvTestCase(unittest.TestCase):
+    def run_env(self, env, steps=200):
+        observations = env.reset()
+        self.assertEqual(observations.shape, (env.num_envs, NUM_PLANES, 8, 8))
+        num_done = 0
+        for _ in range(steps):
+            actions = [random_action(mask) for mask in env.action_masks]
+            observations, rewards, dones, infos = env.step(actions)
+            self.assertEqual(len(infos), env.num_envs)
+            for done, info in zip(dones, infos):
+                if done:
+                    num_done += 1
+                    self.assertEqual(info['terminal_observation'].shape, (NUM_PLANES, 8, 8))
+        # every environment is in the sense phase or move phase of a running game
+        self.assertTrue(env.action_masks[:, PASS_ACTION].all())
+        return num_done
+
+    def test_sync(self):
+        env = VectorRBCEnv(3, RandomBot, seed=0, full_turn_limit=10)
+        self.assertGreater(self.run_env(env), 0)
+        self.assertIs(env.envs[1].observation.base, env.observations)
+
+    def test_subprocess(self):
+        with SubprocVectorRBCEnv(3, RandomBot, num_workers=2, seed=0, full_turn_limit=10) as env:
+            self.assertGreater(self.run_env(env), 0)
+
+    def test_subprocess_error(self):
+        with SubprocVectorRBCEnv(2, RandomBot, num_workers=2, seed=0) as env:
+            env.reset()
+            with self.assertRaises(VectorEnvWorkerError) as context:
+                env.step([PASS_ACTION, 100])
+            # the traceback of the worker is included
+            self.assertIn('not a valid sense action', str(context.exception))
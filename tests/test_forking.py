@@ -0,0 +1,103 @@
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from reconchess import load_player
+from reconchess.forking import *
+from reconchess.bots import random_bot
+
+HAS_SMAPS = os.path.exists('/proc/self/smaps_rollup')
+
+# records the process that imported it
+BOT_SOURCE = textwrap.dedent('''
+    import os
+    from reconchess.bots import random_bot
+
+    IMPORTED_BY = os.getpid()
+
+
+    class TempBot(random_bot.RandomBot):
+        pass
+''')
+
+
+def _importing_process(name):
+    # the process that imported the module, or None if it isn't loaded in this process
+    module = sys.modules.get(name)
+    return (module.IMPORTED_BY if module is not None else None), os.getpid()
+
+
+class ForkingTestCase(unittest.TestCase):
+    def test_bot_module_name(self):
+        self.assertEqual(bot_module_name('reconchess.bots.random_bot'), 'reconchess.bots.random_bot')
+        self.assertEqual(bot_module_name(random_bot.__file__), 'random_bot')
+
+    def load_temp_bot(self, name):
+        # a bot module that nothing in this process has imported yet
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        bot_path = os.path.join(directory, name + '.py')
+        with open(bot_path, 'w') as fp:
+            fp.write(BOT_SOURCE)
+        self.assertNotIn(name, sys.modules)
+        load_player(bot_path)
+        self.addCleanup(sys.modules.pop, name, None)
+        return bot_path
+
+    @unittest.skipIf('fork' not in START_METHODS, 'fork is not available')
+    def test_fork_shares_loaded_bots(self):
+        bot_path = self.load_temp_bot('forked_temp_bot')
+        ctx = game_process_context('fork', [bot_path])
+        with ctx.Pool(1) as pool:
+            imported_by, child = pool.apply(_importing_process, ('forked_temp_bot',))
+        # the child has the module this process loaded, instead of importing it again
+        self.assertEqual(imported_by, os.getpid())
+        self.assertNotEqual(child, os.getpid())
+
+    @unittest.skipIf('forkserver' not in START_METHODS, 'forkserver is not available')
+    def test_forkserver_preloads_bots(self):
+        bot_path = self.load_temp_bot('forkserver_temp_bot')
+        ctx = game_process_context('forkserver', [bot_path])
+        with ctx.Pool(1) as pool:
+            imported_by, child = pool.apply(_importing_process, ('forkserver_temp_bot',))
+        # the module was imported once in the fork server, not in this process or the child
+        self.assertIsNotNone(imported_by)
+        self.assertNotIn(imported_by, [os.getpid(), child])
+
+    @unittest.skipIf('spawn' not in START_METHODS, 'spawn is not available')
+    def test_spawn_loads_nothing(self):
+        bot_path = self.load_temp_bot('spawned_temp_bot')
+        ctx = game_process_context('spawn', [bot_path])
+        with ctx.Pool(1) as pool:
+            imported_by, _ = pool.apply(_importing_process, ('spawned_temp_bot',))
+        self.assertIsNone(imported_by)
+
+    @unittest.skipIf(not HAS_SMAPS, 'memory usage is not available')
+    def test_process_memory(self):
+        usage = process_memory(os.getpid())
+        self.assertGreater(usage['rss'], 0)
+        self.assertLessEqual(usage['pss'], usage['rss'])
+        self.assertEqual(usage['rss'], usage['shared'] + usage['private'])
+
+    @unittest.skipIf(not HAS_SMAPS or 'fork' not in START_METHODS, 'memory usage is not available')
+    def test_memory_report(self):
+        ctx = game_process_context('fork', [])
+        with ctx.Pool(1) as pool:
+            pid = pool.apply(os.getpid)
+            report = memory_report([os.getpid(), pid])
+        self.assertTrue(report.startswith('2 processes'))
+
+    @unittest.skipIf(not HAS_SMAPS, 'memory usage is not available')
+    def test_memory_usage(self):
+        usage = memory_usage([os.getpid(), -1])
+        self.assertEqual(usage['processes'], 1)
+        self.assertEqual(usage['rss'], process_memory(os.getpid())['rss'])
+        self.assertLessEqual(usage['pss'], usage['rss'])
+        self.assertTrue(format_memory_usage(usage).startswith('1 processes'))
+
+    def test_unavailable(self):
+        self.assertIsNone(process_memory(-1))
+        self.assertIsNone(memory_usage([-1]))
+        self.assertIsNone(memory_report([-1]))
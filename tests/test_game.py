@@ -1,5 +1,6 @@
 import unittest
-from reconchess import LocalGame, WinReason
+from reconchess import LocalGame, VirtualClock, WinReason, play_local_game
+from reconchess.bots.random_bot import RandomBot
 from chess import *
 import time
 import random
@@ -956,3 +957,52 @@ class GetGameHistoryTestCase(unittest.TestCase):
         g.move(Move(B5, E8))
         self.assertTrue(g.is_over())
         self.assertNotEqual(g.get_game_history(), None)
+
+
+class VirtualClockTestCase(unittest.TestCase):
+    def test_charges(self):
+        clock = VirtualClock(sense_cost=1.5, move_cost=2.0)
+        game = LocalGame(seconds_per_player=100, seconds_increment=5, clock=clock)
+        game.start()
+        time.sleep(0.05)
+        self.assertEqual(game.get_seconds_left(), 100)
+        game.sense(E2)
+        self.assertEqual(game.get_seconds_left(), 98.5)
+        game.move(Move(E2, E4))
+        self.assertEqual(game.get_seconds_left(), 96.5)
+        game.end_turn()
+        self.assertEqual(game.seconds_left_by_color[WHITE], 101.5)
+        self.assertEqual(game.get_seconds_left(), 100)
+        self.assertEqual(clock(), 3.5)
+
+    def test_default_costs(self):
+        clock = VirtualClock()
+        self.assertGreater(clock.sense_cost, 0)
+        self.assertGreater(clock.move_cost, 0)
+
+        # with the default increment, every turn takes more time than it gives back
+        game = LocalGame(clock=VirtualClock())
+        self.assertGreater(game.clock.sense_cost + game.clock.move_cost, game.seconds_increment)
+        game.start()
+        seconds_left = game.get_seconds_left()
+        for _ in range(2):
+            game.sense(None)
+            game.move(None)
+            game.end_turn()
+        self.assertLess(game.get_seconds_left(), seconds_left)
+
+        # a seeded game runs down the clocks without any real time passing
+        game = LocalGame(seconds_per_player=10, clock=clock)
+        play_local_game(RandomBot(), RandomBot(), game=game, seed=0)
+        self.assertEqual(game.get_win_reason(), WinReason.TIMEOUT)
+
+    def test_timeout(self):
+        game = LocalGame(seconds_per_player=3, clock=VirtualClock(sense_cost=1, move_cost=1))
+        game.start()
+        game.sense(None)
+        game.move(None)
+        self.assertFalse(game.is_over())
+        game.sense(None)
+        self.assertTrue(game.is_over())
+        game.end()
+        self.assertEqual(game.get_win_reason(), WinReason.TIMEOUT)
@@ -1,7 +1,11 @@
 import unittest
+from unittest import mock
 from chess import *
 from reconchess import *
+import reconchess.history
 import tempfile
+import pickle
+import math
 import os
 import random
 
@@ -63,6 +67,31 @@ class TurnNeighborsTestCase(unittest.TestCase):
         self.assertEqual(Turn(BLACK, 3).previous, Turn(WHITE, 3))
 
 
+class TurnValueTestCase(unittest.TestCase):
+    def test_interned(self):
+        self.assertIs(Turn(WHITE, 5), Turn(WHITE, 5))
+        self.assertIs(Turn(WHITE, 5).next, Turn(BLACK, 5))
+
+    def test_hash(self):
+        self.assertEqual(len({Turn(WHITE, 5), Turn(WHITE, 5), Turn(BLACK, 5)}), 2)
+        self.assertEqual({Turn(BLACK, 1): 'a'}[Turn(WHITE, 1).next], 'a')
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            Turn(WHITE, 5).turn_number = 6
+        self.assertEqual(Turn(WHITE, 5).turn_number, 5)
+
+    def test_pickle(self):
+        self.assertIs(pickle.loads(pickle.dumps(Turn(BLACK, 3))), Turn(BLACK, 3))
+
+    def test_ply(self):
+        self.assertEqual(Turn(WHITE, 0).ply, 0)
+        self.assertEqual(Turn(BLACK, 0).ply, 1)
+        self.assertEqual(Turn(WHITE, 3).ply, 6)
+        for ply in range(10):
+            self.assertEqual(Turn.from_ply(ply).ply, ply)
+
+
 class HistoryEmptyTurnsTestCase(unittest.TestCase):
     def setUp(self):
         self.history = GameHistory()
@@ -278,6 +307,15 @@ class HistoryTurnsTestCase(unittest.TestCase):
             Turn(WHITE, 2), Turn(BLACK, 2),
         ])
 
+    def test_turns_float_range(self):
+        # without any interned turns, so that nothing hides a turn with a float turn number
+        with mock.patch.dict(Turn._interned, clear=True):
+            turns = list(self.history.turns(start=1.0, stop=2.0))
+            self.assertEqual(turns, [Turn(WHITE, 1), Turn(BLACK, 1)])
+            self.assertEqual(list(self.history.turns(stop=10.0)), list(self.history.turns()))
+            self.assertEqual(list(self.history.turns(BLACK, stop=10.0)), list(self.history.turns(BLACK)))
+            self.assertTrue(all(type(turn.turn_number) is int for turn in Turn._interned.values()))
+
     def test_turns_range_white(self):
         self.assertEqual(list(self.history.turns(WHITE, start=1)), [
             Turn(WHITE, 1),
@@ -335,6 +373,21 @@ class HistoryTurnsTestCase(unittest.TestCase):
         self.assertEqual(self.history.num_turns(WHITE), 4)
         self.assertEqual(self.history.num_turns(BLACK), 3)
 
+    def test_turns_matches_stepping(self):
+        def stepped_turns(color, start, stop):
+            turn = Turn(color if color is not None else WHITE, start)
+            stop_turn = Turn(color if color is not None else WHITE, stop)
+            while turn <= self.history.last_turn() and turn < stop_turn:
+                if color is None or turn.color == color:
+                    yield turn
+                turn = turn.next
+
+        for color in [None, WHITE, BLACK]:
+            for start in range(-1, 6):
+                for stop in list(range(-1, 6)) + [math.inf]:
+                    self.assertEqual(list(self.history.turns(color, start, stop)),
+                                     list(stepped_turns(color, start, stop)))
+
 
 class HistoryEqualityTestCase(unittest.TestCase):
     def setUp(self):
@@ -672,6 +725,34 @@ class HistoryGettersTestCase(unittest.TestCase):
     def test_invalid_collect(self):
         with self.assertRaises(ValueError):
             list(self.history.collect(id, self.history.turns()))
+        with self.assertRaises(ValueError):
+            list(self.history.collect(GameHistory().sense, self.history.turns()))
+        with self.assertRaises(ValueError):
+            list(self.history.collect(self.history.num_turns, self.history.turns()))
+
+    def test_columns(self):
+        for color in COLORS:
+            turns = list(self.history.turns(color))
+            self.assertEqual(self.history.senses(color), list(self.history.collect(self.history.sense, turns)))
+            self.assertEqual(self.history.sense_results(color),
+                             list(self.history.collect(self.history.sense_result, turns)))
+            self.assertEqual(self.history.requested_moves(color),
+                             list(self.history.collect(self.history.requested_move, turns)))
+            self.assertEqual(self.history.taken_moves(color),
+                             list(self.history.collect(self.history.taken_move, turns)))
+            self.assertEqual(self.history.capture_squares(color),
+                             list(self.history.collect(self.history.capture_square, turns)))
+        self.assertEqual(self.history.capture_squares(WHITE), [None, B5, None, E8])
+
+    @unittest.skipIf(reconchess.history.np is None, 'numpy is not installed')
+    def test_sense_results_array(self):
+        self.history.store_sense(BLACK, B7, [(A8, Piece(ROOK, BLACK)), (B8, None), (A1, Piece(PAWN, WHITE))])
+        array = self.history.sense_results_array(BLACK)
+        self.assertEqual(array.shape, (4, 64))
+        self.assertEqual(array[0, E2], 0)
+        self.assertEqual(array[0, E3], -1)
+        self.assertEqual(list(array[3, [A8, B8, A1, C8]]), [10, 0, 1, -1])
+        self.assertEqual(GameHistory().sense_results_array(WHITE).shape, (0, 64))
 
 
 class HistorySaveTestCase(unittest.TestCase):
@@ -714,3 +795,17 @@ class HistorySaveTestCase(unittest.TestCase):
             history.save(os.path.join(d, 'history.tsv'))
             restored_history = GameHistory.from_file(os.path.join(d, 'history.tsv'))
         self.assertEqual(history, restored_history)
+
+    def test_compressed(self):
+        winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot())
+
+        with tempfile.TemporaryDirectory() as d:
+            for filename in ['history.json', 'history.json.gz', 'history.json.zst']:
+                if filename.endswith('.zst') and reconchess.history.zstandard is None:
+                    continue
+                history.save(os.path.join(d, filename))
+                restored_history = GameHistory.from_file(os.path.join(d, filename))
+                self.assertEqual(history, restored_history)
+
+            self.assertLess(os.path.getsize(os.path.join(d, 'history.json.gz')),
+                            os.path.getsize(os.path.join(d, 'history.json')))
@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+from reconchess import RemoteGame
+from reconchess.local_server import LocalServer
+from reconchess.load_test import LoadStats, percentile, endpoint_name, run_load, find_saturation
+
+
+def auth_for(index):
+    return 'load{}'.format(index), 'password'
+
+
+class LoadStatsTestCase(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([3.0], 90), 3.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_endpoint_name(self):
+        self.assertEqual(endpoint_name('/api/games/12/sense'), '/api/games/<id>/sense')
+        self.assertEqual(endpoint_name('/api/invitations/3'), '/api/invitations/<id>')
+        self.assertEqual(endpoint_name('/api/invitations/'), '/api/invitations/')
+
+    def test_counts(self):
+        stats = LoadStats()
+        stats.add_request('/a', 0.1, 200)
+        stats.add_request('/a', 0.2, 503)
+        stats.add_request('/b', 0.3, 400)
+        stats.add_request('/b', 0.4, 'ConnectionError')
+        self.assertEqual(stats.num_requests, 4)
+        self.assertEqual(stats.num_errors, 3)
+        self.assertEqual(stats.num_retries, 2)
+        self.assertEqual(stats.summary()['endpoints']['/a']['statuses'], {'200': 1, '503': 1})
+        self.assertIn('/b', stats.format())
+
+
+@mock.patch.object(RemoteGame, 'RETRY_INTERVAL', 0.001)
+class LoadTestTestCase(unittest.TestCase):
+    def test_run_load(self):
+        with LocalServer() as server:
+            stats = run_load(server.url, auth_for, num_games=3, concurrency=2, poll_interval=0.001,
+                             invitation_poll_interval=0.001, timeout=60)
+
+        self.assertEqual(stats.num_games, 3)
+        self.assertEqual(stats.num_failed_games, 0)
+        self.assertGreater(len(stats.turn_latencies), 0)
+        self.assertEqual(stats.num_errors, 0)
+        summary = stats.summary()
+        self.assertEqual(summary['endpoints']['/api/invitations/<id>']['count'], 3)
+        self.assertEqual(summary['endpoints']['/api/games/<id>/end_turn']['count'], len(stats.turn_latencies))
+
+    def test_retries(self):
+        with LocalServer(failure_rate=0.05, seed=1) as server:
+            stats = run_load(server.url, auth_for, num_games=1, concurrency=1, poll_interval=0.001,
+                             invitation_poll_interval=0.001, timeout=60)
+            self.assertEqual(stats.num_failed_games, 0)
+            self.assertEqual(stats.num_retries, server.num_failures)
+            self.assertGreater(stats.num_retries, 0)
+
+    def test_unreachable_server(self):
+        with LocalServer() as server:
+            url = server.url
+
+        # the invitation can't be sent, which counts as a failed game instead of stopping the slot
+        stats = run_load(url, auth_for, num_games=2, concurrency=1, timeout=10)
+        self.assertEqual(stats.num_games, 2)
+        self.assertEqual(stats.num_failed_games, 2)
+
+        results, saturation = find_saturation(url, auth_for, levels=[1, 2], games_per_level=1, timeout=10)
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(saturation)
+
+    def test_find_saturation(self):
+        with LocalServer() as server:
+            results, saturation = find_saturation(server.url, auth_for, levels=[1, 2], games_per_level=1,
+                                                  min_gain=-1.0, poll_interval=0.001,
+                                                  invitation_poll_interval=0.001, timeout=60)
+        self.assertEqual([stats.concurrency for stats in results], [1, 2])
+        self.assertEqual(saturation, 2)
@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+import unittest
+from unittest import mock
+import chess
+import requests
+from reconchess import RemoteGame, WinReason, play_remote_game
+from reconchess.bots.random_bot import RandomBot
+from reconchess.local_server import LocalServer
+from reconchess.scripts.rc_connect import RBCServer
+
+
+def play_remote_games(server, num_games, seed=0):
+    # each game is played by two RandomBots in their own threads
+    rng = random.Random(seed)
+    results = {}
+    threads = []
+    for i in range(num_games):
+        names = {chess.WHITE: 'white{}'.format(i), chess.BLACK: 'black{}'.format(i)}
+        game_id = server.create_game(names[chess.WHITE], names[chess.BLACK])
+        for color in chess.COLORS:
+            player = RandomBot()
+            player.rng = random.Random(rng.getrandbits(64))
+
+            def play(game_id=game_id, name=names[color], player=player, key=(game_id, color)):
+                results[key] = play_remote_game(server.url, game_id, (name, 'password'), player)
+
+            threads.append(threading.Thread(target=play, daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    return results
+
+
+@mock.patch.object(RemoteGame, 'POLL_INTERVAL', 0.001)
+@mock.patch.object(RemoteGame, 'RETRY_INTERVAL', 0.001)
+class LocalServerGameTestCase(unittest.TestCase):
+    def test_concurrent_games(self):
+        with LocalServer() as server:
+            results = play_remote_games(server, 3)
+
+            self.assertEqual(len(results), 6)
+            for (game_id, color), (winner_color, win_reason, history) in results.items():
+                game = server.get_game(game_id)
+                self.assertTrue(game.is_over())
+                self.assertEqual(winner_color, game.get_winner_color())
+                self.assertEqual(win_reason, game.get_win_reason())
+                self.assertEqual(history, game.get_game_history())
+
+    def test_injected_failures(self):
+        with LocalServer(failure_rate=0.2, seed=0) as server:
+            results = play_remote_games(server, 1)
+            self.assertEqual(len(results), 2)
+            self.assertGreater(server.num_failures, 0)
+            for winner_color, win_reason, history in results.values():
+                self.assertEqual(history, server.get_game(1).get_game_history())
+
+
+class LocalServerRequestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalServer(passwords={'alice': 'a', 'bob': 'b'}).start()
+        self.alice = requests.Session()
+        self.alice.auth = ('alice', 'a')
+        self.bob = requests.Session()
+        self.bob.auth = ('bob', 'b')
+
+    def tearDown(self):
+        self.alice.close()
+        self.bob.close()
+        self.server.stop()
+
+    def game_url(self, game_id, endpoint):
+        return '{}/api/games/{}/{}'.format(self.server.url, game_id, endpoint)
+
+    def test_authentication(self):
+        url = '{}/api/users/'.format(self.server.url)
+        self.assertEqual(requests.get(url).status_code, 401)
+        self.assertEqual(requests.get(url, auth=('alice', 'wrong')).status_code, 401)
+        self.assertEqual(self.alice.get(url).json(), {'usernames': ['alice']})
+
+        game_id = self.server.create_game('alice', 'bob')
+        self.assertEqual(requests.get(self.game_url(game_id, 'color'), auth=('carol', 'c')).status_code, 401)
+        self.assertEqual(self.alice.get(self.game_url(game_id + 1, 'color')).status_code, 404)
+
+    def test_invitations(self):
+        alice = RBCServer(self.server.url, ('alice', 'a'))
+        bob = RBCServer(self.server.url, ('bob', 'b'))
+
+        game_id = alice.send_invitation('bob', chess.BLACK)
+        self.assertEqual(alice.get_invitations(), [])
+        invitation_id, = bob.get_invitations()
+        self.assertEqual(bob.accept_invitation(invitation_id), game_id)
+        self.assertEqual(bob.get_invitations(), [])
+        bob.finish_invitation(invitation_id)
+
+        self.assertEqual(self.alice.get(self.game_url(game_id, 'color')).json(), {'color': chess.BLACK})
+        self.assertEqual(self.bob.get(self.game_url(game_id, 'opponent_name')).json(), {'opponent_name': 'alice'})
+
+    def test_user_endpoints(self):
+        alice = RBCServer(self.server.url, ('alice', 'a'))
+        self.assertEqual(alice.get_reconchess_version(), __import__('reconchess').__version__)
+        self.assertEqual(alice.get_bot_version(), 0)
+        alice.increment_version()
+        self.assertEqual(alice.get_bot_version(), 1)
+        alice.set_max_games(7)
+        alice.set_ranked(True)
+        self.assertEqual(self.alice.post('{}/api/users/me'.format(self.server.url)).json()['max_games'], 7)
+
+    def test_turn_order(self):
+        game_id = self.server.create_game('alice', 'bob')
+        self.alice.post(self.game_url(game_id, 'ready'))
+        self.assertEqual(self.alice.post(self.game_url(game_id, 'ready')).status_code, 400)
+        self.assertEqual(self.alice.get(self.game_url(game_id, 'game_status')).json(),
+                         {'is_my_turn': False, 'is_over': False})
+        self.bob.post(self.game_url(game_id, 'ready'))
+        self.assertEqual(self.alice.get(self.game_url(game_id, 'game_status')).json(),
+                         {'is_my_turn': True, 'is_over': False})
+
+        move = {'requested_move': {'type': 'Move', 'value': 'e2e4'}}
+        self.assertEqual(self.alice.post(self.game_url(game_id, 'move'), json=move).status_code, 400)
+        self.assertEqual(self.bob.post(self.game_url(game_id, 'sense'), json={'square': 0}).status_code, 400)
+        self.assertEqual(self.alice.post(self.game_url(game_id, 'sense'), json={'square': 0}).status_code, 200)
+        self.assertEqual(self.alice.post(self.game_url(game_id, 'move'), json=move).status_code, 200)
+        self.assertEqual(self.alice.post(self.game_url(game_id, 'end_turn')).status_code, 200)
+        self.assertEqual(self.bob.get(self.game_url(game_id, 'is_my_turn')).json(), {'is_my_turn': True})
+        self.assertEqual(self.bob.get(self.game_url(game_id, 'winner_color')).status_code, 400)
+
+        self.bob.post(self.game_url(game_id, 'resign'))
+        game = RemoteGame(self.server.url, game_id, ('alice', 'a'))
+        self.assertTrue(game.is_over())
+        self.assertEqual(game.get_winner_color(), chess.WHITE)
+        self.assertEqual(game.get_win_reason(), WinReason.RESIGN)
+        self.assertEqual(game.get_game_history().get_white_player_name(), 'alice')
+
+    def test_error_resign(self):
+        game_id = self.server.create_game('alice', 'bob')
+        self.alice.post(self.game_url(game_id, 'ready'))
+        self.bob.post(self.game_url(game_id, 'ready'))
+        self.alice.post(self.game_url(game_id, 'error_resign'))
+        self.assertEqual(self.bob.get(self.game_url(game_id, 'is_over')).json(), {'is_over': True})
+        self.assertEqual(self.bob.get(self.game_url(game_id, 'winner_color')).json(), {'winner_color': chess.BLACK})
+
+    def test_latency(self):
+        self.server.latency = 0.05
+        start = time.monotonic()
+        self.alice.get('{}/api/version'.format(self.server.url))
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
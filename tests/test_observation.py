@@ -0,0 +1,139 @@
+import unittest
+from chess import *
+from reconchess import *
+from reconchess.bots.random_bot import RandomBot
+
+try:
+    import numpy as np
+    from reconchess.observation import *
+except ImportError:
+    np = None
+
+
+def expected_planes(board, color, sensed_square, my_capture_square, opponent_capture_square, sensed,
+                    sense_board=None):
+    # builds the planes from scratch with python-chess, for comparing against the in place updates
+    planes = np.zeros((NUM_PLANES, 8, 8), dtype=np.float32)
+    for square, piece in board.piece_map().items():
+        if piece.color == color:
+            planes[piece.piece_type - 1].flat[square] = 1
+    sense_board = sense_board or board
+    if sensed_square is not None:
+        for square in SquareSet(SENSE_MASKS[sensed_square]):
+            planes[SENSED_SQUARES_PLANE].flat[square] = 1
+            piece = sense_board.piece_at(square)
+            if piece is not None and piece.color != color:
+                planes[SENSED_PIECE_PLANES.start + piece.piece_type - 1].flat[square] = 1
+    if my_capture_square is not None:
+        planes[CAPTURED_MY_PIECE_PLANE].flat[my_capture_square] = 1
+    if opponent_capture_square is not None:
+        planes[CAPTURED_OPPONENT_PIECE_PLANE].flat[opponent_capture_square] = 1
+    planes[MOVE_PHASE_PLANE] = 1 if sensed else 0
+    planes[COLOR_PLANE] = 1 if color == WHITE else 0
+    return planes
+
+
+class CheckingPlayer(RandomBot):
+    wants_observation_planes = True
+
+    def __init__(self, test_case):
+        self.test_case = test_case
+        self.planes = None
+        self.sense_board = None
+        self.sensed_square = None
+        self.my_capture_square = None
+        self.opponent_capture_square = None
+        self.num_checks = 0
+
+    def check(self, sensed):
+        expected = expected_planes(self.game.board, self.color, self.sensed_square, self.my_capture_square,
+                                   self.opponent_capture_square, sensed, self.sense_board)
+        self.test_case.assertTrue((self.planes == expected).all())
+        self.num_checks += 1
+
+    def handle_observation_planes(self, planes):
+        self.planes = planes
+
+    def handle_game_start(self, color, board, opponent_name):
+        super().handle_game_start(color, board, opponent_name)
+        self.color = color
+
+    def handle_opponent_move_result(self, captured_my_piece, capture_square):
+        self.my_capture_square = capture_square
+        self.sensed_square = None
+        self.check(sensed=False)
+
+    def handle_sense_result(self, sense_result):
+        self.sense_board = self.game.board.copy()
+        self.check(sensed=True)
+
+    def choose_sense(self, sense_actions, move_actions, seconds_left):
+        self.sensed_square = super().choose_sense(sense_actions, move_actions, seconds_left)
+        return self.sensed_square
+
+    def handle_move_result(self, requested_move, taken_move, captured_opponent_piece, capture_square):
+        self.opponent_capture_square = capture_square
+        self.check(sensed=True)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class ObservationEncoderTestCase(unittest.TestCase):
+    def test_start_turn(self):
+        board = Board()
+        encoder = ObservationEncoder(BLACK)
+        encoder.start_turn(board, E7)
+        self.assertTrue((encoder.planes == expected_planes(board, BLACK, None, E7, None, False)).all())
+
+    def test_sense(self):
+        board = Board()
+        encoder = ObservationEncoder(WHITE)
+        encoder.start_turn(board, None)
+        encoder.sense(board, B7)
+        self.assertTrue((encoder.planes == expected_planes(board, WHITE, B7, None, None, True)).all())
+        encoder.sense(board, A1)
+        self.assertEqual(encoder.planes[SENSED_SQUARES_PLANE].sum(), 4)
+        self.assertEqual(encoder.planes[SENSED_PIECE_PLANES].sum(), 0)
+        encoder.sense(board, None)
+        self.assertEqual(encoder.planes[SENSED_SQUARES_PLANE].sum(), 0)
+
+    def test_planes_reused(self):
+        planes = np.zeros((NUM_PLANES, 8, 8), dtype=np.float32)
+        encoder = ObservationEncoder(WHITE, planes)
+        encoder.start_turn(Board(), None)
+        self.assertIs(encoder.planes, planes)
+        self.assertEqual(planes[OWN_PIECE_PLANES].sum(), 16)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class LocalGameObservationTestCase(unittest.TestCase):
+    def test_disabled_by_default(self):
+        game = LocalGame()
+        self.assertIsNone(game.get_observation_planes(WHITE))
+
+    def test_enable_mid_turn(self):
+        game = LocalGame()
+        game.start()
+        game.move(Move(E2, E4))
+        game.end_turn()
+        planes = game.enable_observation_planes(BLACK)
+        self.assertIs(game.get_observation_planes(BLACK), planes)
+        self.assertEqual(planes[PAWN - 1][6].sum(), 8)
+        self.assertIsNone(game.get_observation_planes(WHITE))
+
+    def test_play_local_game(self):
+        for _ in range(5):
+            white, black = CheckingPlayer(self), CheckingPlayer(self)
+            game = LocalGame()
+            white.game = game
+            black.game = game
+            play_local_game(white, black, game=game)
+            self.assertIs(white.planes, game.get_observation_planes(WHITE))
+            self.assertIs(black.planes, game.get_observation_planes(BLACK))
+            self.assertGreater(white.num_checks, 0)
+            self.assertGreater(black.num_checks, 0)
+
+    def test_opt_in(self):
+        game = LocalGame()
+        play_local_game(RandomBot(), RandomBot(), game=game)
+        self.assertIsNone(game.get_observation_planes(WHITE))
+        self.assertIsNone(game.get_observation_planes(BLACK))
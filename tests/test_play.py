@@ -2,7 +2,13 @@ import unittest
 from chess import *
 from collections import defaultdict
 from reconchess import *
+from reconchess.bots.random_bot import RandomBot
+from reconchess.bots.attacker_bot import AttackerBot
+from reconchess.deadline import DeadlinePlayer
+from reconchess.utilities import chess_json_dumps
 import random
+import threading
+import time
 
 
 def clean_locals(d):
@@ -324,3 +330,177 @@ class PlayLocalGameTestCase(unittest.TestCase):
             'win_reason': self.win_reason,
             'history': self.history,
         }])
+
+
+class SeededPlayLocalGameTestCase(unittest.TestCase):
+    def play(self, seed, white_cls=RandomBot, black_cls=RandomBot):
+        return play_local_game(white_cls(), black_cls(), seed=seed)
+
+    def test_same_seed_same_history(self):
+        for seed in range(5):
+            _, _, history1 = self.play(seed)
+            random.random()
+            _, _, history2 = self.play(seed)
+            self.assertEqual(history1, history2)
+            self.assertEqual(chess_json_dumps(history1, cls=GameHistoryEncoder),
+                             chess_json_dumps(history2, cls=GameHistoryEncoder))
+
+    def test_different_seeds(self):
+        histories = [self.play(seed)[2] for seed in range(5)]
+        self.assertGreater(len({chess_json_dumps(h, cls=GameHistoryEncoder) for h in histories}), 1)
+
+    def test_attacker_bot(self):
+        _, _, history1 = self.play(7, AttackerBot, RandomBot)
+        _, _, history2 = self.play(7, AttackerBot, RandomBot)
+        self.assertEqual(history1, history2)
+
+    def test_seeds_player_rngs(self):
+        white, black = RandomBot(), RandomBot()
+        self.assertIs(white.rng, random)
+        play_local_game(white, black, seed=3)
+        self.assertIsInstance(white.rng, random.Random)
+        self.assertIsNot(white.rng, black.rng)
+
+
+class PonderingBot(RandomBot):
+    wants_to_ponder = True
+
+    def __init__(self):
+        self.pondering = False
+        self.num_ponders = 0
+        self.overlapping_calls = 0
+
+    def ponder(self, stop):
+        self.pondering = True
+        self.num_ponders += 1
+        stop.wait()
+        self.pondering = False
+
+    def handle_opponent_move_result(self, captured_my_piece, capture_square):
+        self.overlapping_calls += self.pondering
+
+    def choose_move(self, move_actions, seconds_left):
+        self.overlapping_calls += self.pondering
+        return super().choose_move(move_actions, seconds_left)
+
+
+class PonderingTestCase(unittest.TestCase):
+    def test_pondering(self):
+        player = PonderingBot()
+        with pondering(player):
+            time.sleep(0.05)
+            self.assertTrue(player.pondering)
+        self.assertFalse(player.pondering)
+        self.assertEqual(player.num_ponders, 1)
+
+    def test_disabled(self):
+        player = PonderingBot()
+        with pondering(player, enabled=False):
+            pass
+        player.wants_to_ponder = False
+        with pondering(player):
+            pass
+        self.assertEqual(player.num_ponders, 0)
+
+    def test_play_local_game(self):
+        white, black = PonderingBot(), PonderingBot()
+        _, _, history = play_local_game(white, black, seed=0, ponder=True)
+
+        # each player ponders during every turn of its opponent
+        self.assertEqual(white.num_ponders, len(list(history.turns(BLACK))))
+        self.assertEqual(black.num_ponders, len(list(history.turns(WHITE))))
+        self.assertEqual(white.overlapping_calls + black.overlapping_calls, 0)
+
+    def test_no_pondering_by_default(self):
+        white, black = PonderingBot(), PonderingBot()
+        play_local_game(white, black, seed=0)
+        self.assertEqual(white.num_ponders + black.num_ponders, 0)
+
+
+class SlowBot(RandomBot):
+    """Publishes a random move and then keeps thinking until its deadline."""
+
+    def choose_move(self, move_actions, seconds_left):
+        self.publish_action(self.rng.choice(move_actions + [None]))
+        while time.monotonic() < self.deadline:
+            time.sleep(0.001)
+        return self.published_action
+
+
+class BlockedBot(RandomBot):
+    """Publishes a random move and then ignores its deadline until the test releases it."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.events = []
+
+    def choose_move(self, move_actions, seconds_left):
+        self.events.append('choose_move')
+        self.publish_action(self.rng.choice(move_actions + [None]))
+        self.release.wait()
+        return None
+
+    def handle_move_result(self, requested_move, taken_move, captured_opponent_piece, capture_square):
+        self.events.append('move_result')
+
+    def handle_game_end(self, winner_color, win_reason, game_history):
+        self.events.append('game_end')
+
+
+class DeadlinePlayerTestCase(unittest.TestCase):
+    def test_returns_in_time(self):
+        player = DeadlinePlayer(RandomBot(), margin=0.1)
+        self.assertIn(player.choose_sense(list(SQUARES), [], 10), SQUARES)
+        self.assertEqual(player.num_timeouts, 0)
+
+    def test_published_action(self):
+        bot = BlockedBot()
+        player = DeadlinePlayer(bot, margin=0.1)
+        move_actions = [Move(E2, E4), Move(D2, D4)]
+
+        move = player.choose_move(move_actions, 0.6)
+        self.assertEqual(player.num_timeouts, 1)
+        self.assertIn(move, move_actions + [None])
+        self.assertEqual(move, bot.published_action)
+
+        # the late call holds up the next choice, but not the callbacks in between
+        player.handle_move_result(move, move, False, None)
+        self.assertEqual(player.choose_move(move_actions, 0.15), None)
+        self.assertEqual(player.num_timeouts, 2)
+
+        bot.release.set()
+        self.assertTrue(player.wait_idle(10))
+        self.assertEqual(bot.events, ['choose_move', 'move_result', 'choose_move'])
+
+    def test_errors_are_raised(self):
+        class BrokenBot(RandomBot):
+            def handle_sense_result(self, sense_result):
+                raise ValueError('broken')
+
+        player = DeadlinePlayer(BrokenBot())
+        player.handle_sense_result([])
+        self.assertTrue(player.wait_idle(10))
+        with self.assertRaises(ValueError):
+            player.choose_move([], 10)
+
+    def test_game_end_timeout(self):
+        bot = BlockedBot()
+        player = DeadlinePlayer(bot, margin=0.1, game_end_timeout=0.05)
+        player.choose_move([Move(E2, E4)], 0.15)
+        self.assertEqual(player.num_timeouts, 1)
+
+        # the choice never returns, so the game end callback can't run, but the game still ends
+        player.handle_game_end(WHITE, WinReason.KING_CAPTURE, GameHistory())
+        self.assertEqual(bot.events, ['choose_move'])
+        bot.release.set()
+
+    def test_play_local_game(self):
+        white, black = SlowBot(), RandomBot()
+        game = LocalGame(seconds_per_player=1, seconds_increment=0, full_turn_limit=3)
+        winner_color, win_reason, history = play_local_game(white, black, game=game, deadline_margin=0.5)
+        self.assertEqual(win_reason, WinReason.TURN_LIMIT)
+        self.assertEqual(history.get_white_player_name(), 'SlowBot')
+
+    def test_load_player_ignores_deadline_player(self):
+        # bots import everything from reconchess, which must not include player wrappers
+        self.assertEqual(load_player('reconchess.bots.random_bot'), ('RandomBot', RandomBot))
@@ -0,0 +1,135 @@
+import unittest
+import json
+from chess import *
+from reconchess import *
+from reconchess.profiling import PHASES, BUCKET_BOUNDS_NS, Histogram
+from reconchess.bots.random_bot import RandomBot
+
+
+class RecordingHooks(PhaseHooks):
+    def __init__(self):
+        self.events = []
+
+    def phase(self, player, phase):
+        hooks = self
+
+        class Recorder(object):
+            def __enter__(self):
+                hooks.events.append(('enter', player, phase))
+
+            def __exit__(self, exc_type, exc_val, exc_tb):
+                hooks.events.append(('exit', player, phase))
+
+        return Recorder()
+
+
+class HistogramTestCase(unittest.TestCase):
+    def test_add(self):
+        histogram = Histogram()
+        for ns in [500, 1000, 1001, 3000, 10 ** 12]:
+            histogram.add(ns)
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum_ns, 500 + 1000 + 1001 + 3000 + 10 ** 12)
+        self.assertEqual(histogram.min_ns, 500)
+        self.assertEqual(histogram.max_ns, 10 ** 12)
+        self.assertEqual(histogram.to_dict()['buckets'], {'1000': 2, '2000': 1, '4000': 1, 'inf': 1})
+
+    def test_empty(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.mean_ns())
+        self.assertEqual(histogram.to_dict()['buckets'], {})
+
+
+class PlayTurnHooksTestCase(unittest.TestCase):
+    def test_phase_order(self):
+        game = LocalGame()
+        player = RandomBot()
+        player.handle_game_start(WHITE, game.board.copy(), 'opponent')
+        game.start()
+
+        hooks = RecordingHooks()
+        play_turn(game, player, end_turn_last=True, hooks=hooks)
+
+        self.assertTrue(all(p is player for _, p, _ in hooks.events))
+        self.assertEqual([phase for event, _, phase in hooks.events if event == 'enter'], PHASES)
+        self.assertEqual(hooks.events[0], ('enter', player, 'turn'))
+        self.assertEqual(hooks.events[-1], ('exit', player, 'turn'))
+
+        # every phase except the turn itself is exited before the next one is entered
+        inner = hooks.events[1:-1]
+        for enter, exit in zip(inner[::2], inner[1::2]):
+            self.assertEqual(enter[0], 'enter')
+            self.assertEqual(exit, ('exit', player, enter[2]))
+
+    def test_end_turn_first(self):
+        game = LocalGame()
+        player = RandomBot()
+        player.handle_game_start(WHITE, game.board.copy(), 'opponent')
+        game.start()
+
+        hooks = RecordingHooks()
+        play_turn(game, player, end_turn_last=False, hooks=hooks)
+        phases = [phase for event, _, phase in hooks.events if event == 'enter']
+        self.assertLess(phases.index('end_turn'), phases.index('handle_move_result'))
+
+    def test_exit_on_exception(self):
+        class FailingBot(RandomBot):
+            def choose_move(self, move_actions, seconds_left):
+                raise RuntimeError()
+
+        game = LocalGame()
+        player = FailingBot()
+        player.handle_game_start(WHITE, game.board.copy(), 'opponent')
+        game.start()
+
+        hooks = RecordingHooks()
+        with self.assertRaises(RuntimeError):
+            play_turn(game, player, hooks=hooks)
+        self.assertIn(('exit', player, 'choose_move'), hooks.events)
+        self.assertEqual(hooks.events[-1], ('exit', player, 'turn'))
+
+
+class PhaseTimerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.white = RandomBot()
+        self.black = RandomBot()
+        self.timer = PhaseTimer()
+        self.timer.set_label(self.white, 'white')
+        self.timer.set_label(self.black, 'black')
+        self.winner_color, self.win_reason, self.history = play_local_game(self.white, self.black, hooks=self.timer)
+
+    def test_counts(self):
+        self.assertEqual(list(self.timer.histograms.keys()), ['white', 'black'])
+        for color, label in [(WHITE, 'white'), (BLACK, 'black')]:
+            histograms = self.timer.histograms[label]
+            self.assertEqual(set(histograms.keys()), set(PHASES))
+            self.assertEqual(histograms['turn'].count, self.history.num_turns(color))
+            self.assertEqual(histograms['choose_move'].count, self.history.num_turns(color))
+            self.assertGreaterEqual(histograms['turn'].sum_ns, histograms['choose_move'].sum_ns)
+
+    def test_default_label(self):
+        timer = PhaseTimer()
+        self.assertEqual(timer.label(RandomBot()), 'RandomBot')
+        self.assertEqual(self.timer.label(self.white), 'white')
+
+    def test_json(self):
+        data = json.loads(self.timer.to_json())
+        self.assertEqual(data['white']['turn']['count'], self.history.num_turns(WHITE))
+        self.assertEqual(sum(data['black']['sense']['buckets'].values()), self.history.num_turns(BLACK))
+
+    def test_prometheus(self):
+        text = self.timer.to_prometheus()
+        lines = text.splitlines()
+        self.assertEqual(lines[1], '# TYPE reconchess_phase_duration_seconds histogram')
+        count_line = 'reconchess_phase_duration_seconds_count{{player="white",phase="turn"}} {}'.format(
+            self.history.num_turns(WHITE))
+        self.assertIn(count_line, lines)
+        inf_line = 'reconchess_phase_duration_seconds_bucket{{player="white",phase="turn",le="+Inf"}} {}'.format(
+            self.history.num_turns(WHITE))
+        self.assertIn(inf_line, lines)
+        num_series = 2 * len(PHASES)
+        self.assertEqual(len(lines), 2 + num_series * (len(BUCKET_BOUNDS_NS) + 3))
+
+    def test_reset(self):
+        self.timer.reset()
+        self.assertEqual(self.timer.to_dict(), {})
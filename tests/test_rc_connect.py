@@ -0,0 +1,242 @@
+import contextlib
+import io
+import multiprocessing
+import threading
+import time
+import unittest
+from reconchess.scripts.rc_connect import InvitationManager, AuthenticationError, PooledGameThread, \
+    wait_for_pooled_games
+
+
+class FakeServer(object):
+    server_url = 'http://localhost'
+
+    def __init__(self, invitations, barrier=None):
+        self.invitations = list(invitations)
+        self.barrier = barrier
+        self.accepted = []
+        self.max_games = []
+        self.lock = threading.Lock()
+
+    def copy(self):
+        return self
+
+    def get_invitations(self):
+        return list(self.invitations)
+
+    def set_max_games(self, max_games):
+        self.max_games.append(max_games)
+
+    def accept_invitation(self, invitation):
+        if self.barrier is not None:
+            self.barrier.wait()
+        with self.lock:
+            self.invitations.remove(invitation)
+            self.accepted.append(invitation)
+        return invitation + 100
+
+
+class FakeGame(object):
+    def __init__(self):
+        self.alive = True
+        self.terminated = False
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.terminated = True
+
+
+class FakeFinished(object):
+    value = False
+
+
+class FakeInvitationManager(InvitationManager):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = {}
+
+    def _start_game(self, invitation, game_id):
+        self.started[invitation] = game_id
+        return FakeGame(), FakeFinished()
+
+
+class InvitationManagerTestCase(unittest.TestCase):
+    def run_until(self, manager, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            manager.wait(0.1)
+            manager.process()
+
+    def test_accepts_up_to_capacity(self):
+        server = FakeServer([1, 2, 3])
+        manager = FakeInvitationManager(server, None, 2)
+        manager.poll()
+        self.assertEqual(server.max_games, [2])
+
+        manager.process()
+        self.run_until(manager, lambda: len(manager.started) == 2)
+        manager.close()
+
+        self.assertEqual(manager.started, {1: 101, 2: 102})
+        self.assertEqual(manager.pending(), [3])
+        self.assertEqual(manager.free_slots(), 0)
+
+    def test_concurrent_accepts(self):
+        # every accept call blocks until all of them are in progress
+        server = FakeServer([1, 2, 3, 4], barrier=threading.Barrier(4, timeout=5))
+        manager = FakeInvitationManager(server, None, 4, num_accept_threads=4)
+        manager.poll()
+        manager.process()
+        self.run_until(manager, lambda: len(manager.started) == 4)
+        manager.close()
+
+        self.assertEqual(sorted(server.accepted), [1, 2, 3, 4])
+
+    def test_pending_queue_is_bounded_and_ordered(self):
+        server = FakeServer([9, 5, 3, 7])
+        manager = FakeInvitationManager(server, None, 0, max_pending=2)
+        manager.poll()
+        self.assertEqual(manager.pending(), [3, 5])
+
+        manager.poll()
+        self.assertEqual(manager.pending(), [3, 5])
+
+        # withdrawn invitations are dropped
+        server.invitations.remove(3)
+        manager.poll()
+        self.assertEqual(manager.pending(), [5, 7])
+
+        manager = FakeInvitationManager(server, None, 0, priority=lambda invitation: -invitation)
+        manager.poll()
+        self.assertEqual(manager.pending(), [9, 7, 5])
+
+    def test_dropped_invitations_are_reported_once(self):
+        server = FakeServer([9, 5, 3, 7])
+        manager = FakeInvitationManager(server, None, 0, max_pending=2)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for _ in range(3):
+                manager.poll()
+        self.assertEqual(manager.pending(), [3, 5])
+        self.assertEqual(output.getvalue().count('Received invitation'), 4)
+        self.assertEqual(output.getvalue().count('Not enough game slots'), 2)
+
+        # a dropped invitation is queued without being reported again once there is room for it
+        server.invitations.remove(3)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            manager.poll()
+        self.assertEqual(manager.pending(), [5, 7])
+        self.assertEqual(output.getvalue(), '')
+
+    @unittest.skipIf('fork' not in multiprocessing.get_all_start_methods(), 'fork is not available')
+    def test_no_fork_while_accepting(self):
+        release = threading.Event()
+
+        class BlockingServer(FakeServer):
+            def accept_invitation(self, invitation):
+                if invitation == 2:
+                    release.wait(5)
+                return super().accept_invitation(invitation)
+
+        server = BlockingServer([1, 2])
+        manager = FakeInvitationManager(server, None, 2, ctx=multiprocessing.get_context('fork'))
+        manager.poll()
+        manager.process()
+        self.run_until(manager, lambda: 1 in server.accepted)
+
+        # invitation 1 was accepted, but its game process isn't forked while 2 is still being accepted
+        manager.process()
+        self.assertEqual(manager.started, {})
+
+        release.set()
+        self.run_until(manager, lambda: len(manager.started) == 2)
+        manager.close()
+
+    def test_authentication_error(self):
+        class RejectingServer(FakeServer):
+            def accept_invitation(self, invitation):
+                raise AuthenticationError('bad password')
+
+        manager = FakeInvitationManager(RejectingServer([1]), None, 1)
+        manager.poll()
+        manager.process()
+        manager.close()
+
+        # the slot of the invitation is freed, and the error is raised in the thread running the manager
+        manager.process()
+        self.assertEqual(manager.free_slots(), 1)
+        self.assertEqual(manager.started, {})
+        with self.assertRaises(AuthenticationError):
+            manager.step()
+
+    def test_poll_interval(self):
+        server = FakeServer([1])
+        manager = FakeInvitationManager(server, None, 1, min_poll_interval=0.5, max_poll_interval=5)
+        self.assertEqual(manager.poll_interval(), 0.5)
+
+        manager.poll()
+        manager.process()
+        self.assertEqual(manager.poll_interval(), 5)
+        self.run_until(manager, lambda: manager.num_games() == 1)
+        self.assertEqual(manager.poll_interval(), 5)
+
+        # a finished game frees its slot
+        game, _ = manager._games[1]
+        game.alive = False
+        manager.process()
+        manager.close()
+        self.assertTrue(game.terminated)
+        self.assertEqual(manager.num_games(), 0)
+        self.assertEqual(manager.poll_interval(), 0.5)
+
+    def test_wake(self):
+        manager = FakeInvitationManager(FakeServer([]), None, 1)
+        threading.Timer(0.1, manager.wake).start()
+        start = time.monotonic()
+        manager.wait(5)
+        self.assertLess(time.monotonic() - start, 4)
+        manager.close()
+
+    def test_capacity_follows_load(self):
+        load = [2.0]
+        server = FakeServer([])
+        manager = FakeInvitationManager(server, None, 3, max_load=1.0, capacity_interval=0, load=lambda: load[0])
+        manager.poll()
+
+        manager.process()
+        manager.process()
+        manager.process()
+        self.assertEqual(manager.capacity, 1)
+
+        load[0] = 0.9
+        manager.process()
+        self.assertEqual(manager.capacity, 1)
+
+        load[0] = 0.1
+        manager.process()
+        manager.process()
+        manager.process()
+        self.assertEqual(manager.capacity, 3)
+        self.assertEqual(server.max_games, [3, 2, 1, 2, 3])
+        manager.close()
+
+
+class PooledGameThreadTestCase(unittest.TestCase):
+    def test_exit_waits_for_games(self):
+        finished = []
+
+        class SlowGameThread(PooledGameThread):
+            def run(self):
+                time.sleep(0.2)
+                finished.append(True)
+
+        thread = SlowGameThread(args=())
+        # daemon threads would be killed at exit in the middle of their game
+        self.assertFalse(thread.daemon)
+        thread.start()
+        wait_for_pooled_games()
+        self.assertEqual(finished, [True])
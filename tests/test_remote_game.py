@@ -0,0 +1,214 @@
+import random
+import unittest
+from collections import Counter
+import chess
+from reconchess import LocalGame, RemoteGame, play_turn
+from reconchess.bots.random_bot import RandomBot
+
+
+class LocalGameRemoteGame(RemoteGame):
+    """A RemoteGame whose requests are answered by a LocalGame instead of a server."""
+
+    def __init__(self, local_game, color, **kwargs):
+        super().__init__('http://localhost', 0, None, **kwargs)
+        self.local_game = local_game
+        self.color = color
+        self.requests = Counter()
+
+    def _get(self, endpoint, decoder_cls=None):
+        self.requests[endpoint] += 1
+        game = self.local_game
+        if endpoint == 'color':
+            return {'color': self.color}
+        elif endpoint == 'starting_board':
+            return {'board': chess.Board()}
+        elif endpoint == 'sense_actions':
+            return {'sense_actions': game.sense_actions()}
+        elif endpoint == 'move_actions':
+            return {'move_actions': game.move_actions()}
+        elif endpoint == 'seconds_left':
+            # the server reports the requesting player's clock, which only runs during their turn
+            if game.turn == self.color:
+                return {'seconds_left': game.get_seconds_left()}
+            return {'seconds_left': game.seconds_left_by_color[self.color]}
+        elif endpoint == 'opponent_move_results':
+            return {'opponent_move_results': game.opponent_move_results()}
+        elif endpoint == 'game_status':
+            return {'is_over': game.is_over(), 'is_my_turn': game.turn == self.color}
+        raise ValueError(endpoint)
+
+    def _post(self, endpoint, obj):
+        self.requests[endpoint] += 1
+        game = self.local_game
+        if endpoint == 'ready':
+            return {}
+        elif endpoint == 'sense':
+            return {'sense_result': game.sense(obj['square'])}
+        elif endpoint == 'move':
+            return {'move_result': game.move(obj['requested_move'])}
+        elif endpoint == 'end_turn':
+            game.end_turn()
+            return {}
+        raise ValueError(endpoint)
+
+
+def play_mirrored_game(seed, **kwargs):
+    rng = random.Random(seed)
+    local_game = LocalGame()
+    games = {color: LocalGameRemoteGame(local_game, color, **kwargs) for color in chess.COLORS}
+    players = {color: RandomBot() for color in chess.COLORS}
+    for color in chess.COLORS:
+        players[color].rng = random.Random(rng.getrandbits(64))
+        players[color].handle_game_start(color, games[color].get_starting_board(), 'opponent')
+        games[color].start()
+    local_game.start()
+
+    while not local_game.is_over():
+        play_turn(games[local_game.turn], players[local_game.turn])
+
+    return games
+
+
+class RemoteGameMirrorTestCase(unittest.TestCase):
+    def test_actions_match_server(self):
+        for seed in range(20):
+            games = play_mirrored_game(seed, verify_actions=1.0)
+            for game in games.values():
+                self.assertIsNotNone(game._mirror, 'seed {}'.format(seed))
+                self.assertGreater(game.requests['move_actions'], 0)
+
+    def test_no_action_requests(self):
+        games = play_mirrored_game(0)
+        for game in games.values():
+            self.assertEqual(game.requests['sense_actions'], 0)
+            self.assertEqual(game.requests['move_actions'], 0)
+            self.assertEqual(game.requests['opponent_move_results'], game.requests['end_turn'])
+
+    def test_mirror_disabled(self):
+        games = play_mirrored_game(0, mirror_actions=False)
+        for game in games.values():
+            self.assertIsNone(game._mirror)
+            self.assertEqual(game.requests['move_actions'], game.requests['end_turn'])
+
+    def test_mismatch_falls_back_to_server(self):
+        local_game = LocalGame()
+        game = LocalGameRemoteGame(local_game, chess.WHITE, verify_actions=1.0)
+        game.start()
+        local_game.start()
+
+        game._mirror.remove_piece_at(chess.G1)
+        with self.assertLogs('reconchess.game', 'WARNING') as logs:
+            self.assertEqual(set(game.move_actions()), set(local_game.move_actions()))
+        self.assertIn('differ from the server', logs.output[0])
+        self.assertIsNone(game._mirror)
+
+        self.assertEqual(set(game.move_actions()), set(local_game.move_actions()))
+        self.assertEqual(game.requests['move_actions'], 2)
+
+    def test_opponent_capture(self):
+        local_game = LocalGame()
+        local_game.board.set_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+        white = LocalGameRemoteGame(local_game, chess.WHITE)
+        black = LocalGameRemoteGame(local_game, chess.BLACK)
+        white._starting_board = local_game.board.copy()
+        black._starting_board = local_game.board.copy()
+        white.start()
+        black.start()
+        local_game.start()
+
+        white.move(None)
+        white.end_turn()
+
+        black.move_actions()
+        black.move(chess.Move(chess.H8, chess.H1))
+        black.end_turn()
+
+        # white can't castle king side anymore, or move the rook that was captured
+        self.assertEqual(white.opponent_move_results(), chess.H1)
+        self.assertEqual(set(white.move_actions()), set(local_game.move_actions()))
+        self.assertNotIn(chess.Move(chess.E1, chess.G1), white.move_actions())
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self):
+        return self.seconds
+
+
+class SlowLocalGameRemoteGame(LocalGameRemoteGame):
+    """Takes `round_trip` seconds of the fake clock for every request."""
+
+    def __init__(self, local_game, color, clock, round_trip, **kwargs):
+        super().__init__(local_game, color, **kwargs)
+        self.clock = clock
+        self.round_trip = round_trip
+
+    def _get(self, endpoint, decoder_cls=None):
+        self.clock.seconds += self.round_trip / 2
+        result = super()._get(endpoint, decoder_cls)
+        self.clock.seconds += self.round_trip / 2
+        return result
+
+
+class RemoteGameClockTestCase(unittest.TestCase):
+    def test_one_request_per_turn(self):
+        games = play_mirrored_game(0)
+        for game in games.values():
+            self.assertEqual(game.requests['seconds_left'], game.requests['end_turn'])
+
+    def test_server_clock_every_call(self):
+        games = play_mirrored_game(0, local_clock=False)
+        for game in games.values():
+            self.assertEqual(game.requests['seconds_left'], 2 * game.requests['end_turn'])
+
+    def test_extrapolation(self):
+        clock = FakeClock()
+        local_game = LocalGame(seconds_per_player=100, clock=clock)
+        game = SlowLocalGameRemoteGame(local_game, chess.WHITE, clock, round_trip=0.5)
+        game.start()
+        local_game.start()
+
+        clock.seconds += 3
+        self.assertAlmostEqual(game.get_seconds_left(), local_game.get_seconds_left())
+        self.assertAlmostEqual(game.latency, 0.5)
+        self.assertAlmostEqual(game.get_usable_seconds_left(), local_game.get_seconds_left() - 0.25)
+
+        clock.seconds += 10
+        self.assertAlmostEqual(game.get_seconds_left(), local_game.get_seconds_left())
+        self.assertEqual(game.requests['seconds_left'], 1)
+
+        # the clock is synced again next turn
+        game.move(None)
+        game.end_turn()
+        local_game.move(None)
+        local_game.end_turn()
+        game.round_trip = 1.5
+        self.assertAlmostEqual(game.get_seconds_left(), local_game.get_seconds_left())
+        self.assertEqual(game.requests['seconds_left'], 2)
+        self.assertAlmostEqual(game.latency, 0.7)
+
+    def test_sync_during_opponent_turn(self):
+        clock = FakeClock()
+        local_game = LocalGame(seconds_per_player=100, seconds_increment=5, clock=clock)
+        game = SlowLocalGameRemoteGame(local_game, chess.WHITE, clock, round_trip=0.5)
+        game.start()
+        local_game.start()
+
+        clock.seconds += 3
+        game.move(None)
+        game.end_turn()
+
+        # synced while the opponent thinks, when our clock isn't running
+        seconds_left = game.get_seconds_left()
+        self.assertAlmostEqual(seconds_left, local_game.seconds_left_by_color[chess.WHITE], delta=0.5)
+        clock.seconds += 10
+        local_game.move(None)
+        local_game.end_turn()
+
+        # our clock only starts running again now, and the extrapolation starts from a new sync
+        self.assertFalse(game.is_over())
+        self.assertAlmostEqual(game.get_seconds_left(), local_game.get_seconds_left())
+        self.assertGreater(game.get_seconds_left(), seconds_left - 1)
+        self.assertEqual(game.requests['seconds_left'], 2)
@@ -0,0 +1,99 @@
+import unittest
+from chess import *
+from reconchess import *
+import tempfile
+import os
+import time
+
+
+def make_history(white_name, black_name, num_white_turns, num_black_turns, winner_color, win_reason):
+    history = GameHistory()
+    history.store_players(white_name, black_name)
+    for color, num_turns in [(WHITE, num_white_turns), (BLACK, num_black_turns)]:
+        for _ in range(num_turns):
+            history.store_sense(color, None, [])
+    history.store_results(winner_color, win_reason)
+    return history
+
+
+class ReplayIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.d = self.directory.name
+        os.makedirs(os.path.join(self.d, 'sub'))
+        make_history('A', 'B', 10, 9, WHITE, WinReason.TIMEOUT).save(os.path.join(self.d, 'a.json'))
+        make_history('B', 'A', 30, 30, WHITE, WinReason.KING_CAPTURE).save(os.path.join(self.d, 'b.json.gz'))
+        make_history('C', 'A', 5, 5, None, None).save(os.path.join(self.d, 'sub', 'c.json'))
+        with open(os.path.join(self.d, 'notes.txt'), 'w') as fp:
+            fp.write('not a replay')
+        self.index = ReplayIndex()
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def paths(self, games):
+        return [os.path.relpath(game.path, self.d) for game in games]
+
+    def test_update(self):
+        self.assertEqual(self.index.update(self.d), 3)
+        self.assertEqual(len(self.index), 3)
+
+    def test_unreadable_files_are_skipped(self):
+        with open(os.path.join(self.d, 'corrupt.json'), 'w') as fp:
+            fp.write('{"type": "GameHistory", ')
+        missing = os.path.join(self.d, 'missing.json')
+        with self.assertWarns(UserWarning):
+            self.assertEqual(self.index.add_files([os.path.join(self.d, 'a.json'), missing,
+                                                   os.path.join(self.d, 'corrupt.json')]), 1)
+        with self.assertWarns(UserWarning):
+            self.assertEqual(self.index.update(self.d), 2)
+        self.assertEqual(len(self.index), 3)
+
+    def test_incremental_update(self):
+        self.index.update(self.d)
+        self.assertEqual(self.index.update(self.d), 0)
+
+        time.sleep(0.01)
+        make_history('A', 'B', 1, 0, None, None).save(os.path.join(self.d, 'a.json'))
+        make_history('A', 'B', 1, 1, None, None).save(os.path.join(self.d, 'd.json'))
+        os.remove(os.path.join(self.d, 'sub', 'c.json'))
+        self.assertEqual(self.index.update(self.d), 2)
+        self.assertEqual(self.paths(self.index.query()), ['a.json', 'b.json.gz', 'd.json'])
+        self.assertEqual(self.index.query(white_name='A', max_turns=1)[0].num_turns, 1)
+
+    def test_query(self):
+        self.index.update(self.d)
+        self.assertEqual(self.paths(self.index.query(black_name='B')), ['a.json'])
+        self.assertEqual(self.paths(self.index.query(player_name='A')), ['a.json', 'b.json.gz', os.path.join('sub', 'c.json')])
+        self.assertEqual(self.paths(self.index.query(loser_name='A')), ['b.json.gz'])
+        self.assertEqual(self.paths(self.index.query(win_reason=WinReason.TIMEOUT)), ['a.json'])
+        self.assertEqual(self.paths(self.index.query(max_turns=19)), ['a.json', os.path.join('sub', 'c.json')])
+        self.assertEqual(self.paths(self.index.query(min_turns=20)), ['b.json.gz'])
+        self.assertEqual(self.paths(self.index.query(draws=True)), [os.path.join('sub', 'c.json')])
+        self.assertEqual(self.paths(self.index.query(black_name='A', winner_color=WHITE,
+                                                     win_reason=WinReason.KING_CAPTURE, max_turns=60)),
+                         ['b.json.gz'])
+
+    def test_metadata(self):
+        self.index.update(self.d)
+        game, = self.index.query(white_name='A')
+        self.assertEqual(game.black_name, 'B')
+        self.assertEqual(game.winner_color, WHITE)
+        self.assertEqual(game.win_reason, WinReason.TIMEOUT)
+        self.assertEqual((game.num_white_turns, game.num_black_turns, game.num_turns), (10, 9, 19))
+
+    def test_lazy_history(self):
+        self.index.update(self.d)
+        game, = self.index.query(white_name='B')
+        self.assertIsNone(game._history)
+        self.assertEqual(game.history, make_history('B', 'A', 30, 30, WHITE, WinReason.KING_CAPTURE))
+        self.assertIs(game.history, game.history)
+
+    def test_persistent(self):
+        db_path = os.path.join(self.d, 'index.sqlite')
+        with ReplayIndex(db_path) as index:
+            index.update(self.d)
+        with ReplayIndex(db_path) as index:
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.update(self.d), 0)
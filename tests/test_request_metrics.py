@@ -0,0 +1,163 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import chess
+import requests
+from reconchess import RemoteGame, GameHistory, play_remote_game
+from reconchess.bots.random_bot import RandomBot
+from reconchess.local_server import LocalServer
+from reconchess.request_metrics import RequestMetrics, endpoint_name, send_request
+from reconchess.scripts.rc_connect import RBCServer
+
+
+class RequestMetricsTestCase(unittest.TestCase):
+    def test_endpoint_name(self):
+        self.assertEqual(endpoint_name('/api/games/12/sense'), '/api/games/<id>/sense')
+        self.assertEqual(endpoint_name('/api/invitations/3?x=1'), '/api/invitations/<id>')
+
+    def test_aggregation(self):
+        metrics = RequestMetrics()
+        metrics.record_request('GET', '/a', 503, 2000000, 0, 10, 0)
+        metrics.record_request('GET', '/a', 200, 1000000, 0, 20, 1)
+        metrics.record_request('POST', '/a', None, 3000000, 5, 0, 0, 'ConnectionError')
+
+        result = metrics.to_dict()
+        self.assertEqual(list(result), ['GET /a', 'POST /a'])
+        self.assertEqual(result['GET /a']['statuses'], {'200': 1, '503': 1})
+        self.assertEqual(result['GET /a']['retries'], 1)
+        self.assertEqual(result['GET /a']['bytes_received'], 30)
+        self.assertEqual(result['GET /a']['latency']['count'], 2)
+        self.assertEqual(result['POST /a']['statuses'], {'ConnectionError': 1})
+        self.assertEqual(result['POST /a']['bytes_sent'], 5)
+        self.assertEqual(json.loads(metrics.to_json()), json.loads(json.dumps(result)))
+
+        text = metrics.to_prometheus()
+        self.assertIn('reconchess_request_duration_seconds_count{method="GET",endpoint="/a"} 2', text)
+        self.assertIn('reconchess_request_duration_seconds_bucket{method="GET",endpoint="/a",le="+Inf"} 2', text)
+        self.assertIn('reconchess_requests_total{method="GET",endpoint="/a",status="503"} 1', text)
+        self.assertIn('reconchess_requests_total{method="POST",endpoint="/a",status="ConnectionError"} 1', text)
+        self.assertIn('reconchess_request_retries_total{method="GET",endpoint="/a"} 1', text)
+        self.assertIn('reconchess_request_received_bytes_total{method="GET",endpoint="/a"} 30', text)
+
+        metrics.reset()
+        self.assertEqual(metrics.to_dict(), {})
+
+    def test_send_request_error(self):
+        with LocalServer() as server:
+            url = server.url
+        metrics = RequestMetrics()
+        with self.assertRaises(requests.ConnectionError):
+            send_request(requests.Session(), 'POST', url + '/api/games/3/sense', metrics, 2, data='{}')
+        result = metrics.to_dict()['POST /api/games/<id>/sense']
+        self.assertEqual(result['statuses'], {'ConnectionError': 1})
+        self.assertEqual(result['retries'], 1)
+        self.assertEqual(result['bytes_sent'], 2)
+
+
+@mock.patch.object(RemoteGame, 'POLL_INTERVAL', 0.001)
+@mock.patch.object(RemoteGame, 'RETRY_INTERVAL', 0.001)
+class RemoteRequestMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_game_metrics_saved_at_game_end(self):
+        with LocalServer(failure_rate=0.05, seed=2) as server:
+            game_id = server.create_game('white', 'black')
+            threads = []
+            for name in ['white', 'black']:
+                metrics = RequestMetrics(output_dir=os.path.join(self.output_dir, name))
+                game = RemoteGame(server.url, game_id, (name, 'password'), metrics=metrics)
+                player = RandomBot()
+                player.rng = random.Random(len(threads))
+                threads.append(threading.Thread(target=play_remote_game, daemon=True,
+                                                args=(server.url, game_id, (name, 'password'), player),
+                                                kwargs={'game': game}))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(60)
+            num_failures = server.num_failures
+
+        num_retries = 0
+        for name in ['white', 'black']:
+            with open(os.path.join(self.output_dir, name, '{}-requests.json'.format(game_id))) as fp:
+                result = json.load(fp)
+            self.assertIn('POST /api/games/<id>/end_turn', result)
+            self.assertGreater(result['GET /api/games/<id>/game_history']['bytes_received'], 0)
+            for endpoint in result.values():
+                self.assertEqual(sum(endpoint['statuses'].values()), endpoint['latency']['count'])
+                num_retries += endpoint['retries']
+            history = GameHistory.from_file(os.path.join(self.output_dir, name, '{}.json'.format(game_id)))
+            self.assertFalse(history.is_empty())
+
+        self.assertGreater(num_failures, 0)
+        self.assertEqual(num_retries, num_failures)
+
+    def test_game_end_callback_runs_first(self):
+        class BrokenSink(RequestMetrics):
+            def game_ended(self, game_id, game_history):
+                raise OSError('disk full')
+
+        class EndingBot(RandomBot):
+            ended = False
+
+            def handle_game_end(self, winner_color, win_reason, game_history):
+                self.ended = True
+
+        with LocalServer() as server:
+            game_id = server.create_game('white', 'black')
+            opponent = threading.Thread(target=play_remote_game, daemon=True,
+                                        args=(server.url, game_id, ('black', 'password'), RandomBot()))
+            opponent.start()
+            player = EndingBot()
+            game = RemoteGame(server.url, game_id, ('white', 'password'), metrics=BrokenSink())
+            with self.assertRaises(OSError):
+                play_remote_game(server.url, game_id, ('white', 'password'), player, game=game)
+            opponent.join(60)
+        self.assertTrue(player.ended)
+
+    def test_errors_are_logged_and_recorded(self):
+        metrics = RequestMetrics()
+        with LocalServer() as server:
+            game_id = server.create_game('white', 'black')
+            game = RemoteGame(server.url, game_id, ('white', 'password'), metrics=metrics)
+            session_request = game.session.request
+            errors = [requests.ConnectionError('connection reset')]
+
+            def flaky_request(*args, **kwargs):
+                if errors:
+                    raise errors.pop()
+                return session_request(*args, **kwargs)
+
+            with mock.patch.object(game.session, 'request', flaky_request):
+                with self.assertLogs('reconchess.game', 'WARNING') as logs:
+                    self.assertEqual(game.get_player_color(), chess.WHITE)
+
+        self.assertIn('connection reset', logs.output[0])
+        result = metrics.to_dict()['GET /api/games/<id>/color']
+        self.assertEqual(result['statuses'], {'200': 1, 'ConnectionError': 1})
+        self.assertEqual(result['retries'], 1)
+
+    def test_server_metrics(self):
+        metrics = RequestMetrics()
+        with LocalServer() as server:
+            rbc_server = RBCServer(server.url, ('white', 'password'), metrics=metrics)
+            rbc_server.send_invitation('black', chess.WHITE)
+            rbc_server.copy().get_invitations()
+
+        result = metrics.to_dict()
+        self.assertEqual(result['POST /api/invitations/']['statuses'], {'200': 1})
+        self.assertGreater(result['POST /api/invitations/']['bytes_sent'], 0)
+        self.assertEqual(result['GET /api/invitations/']['statuses'], {'200': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
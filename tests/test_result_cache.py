@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+from chess import *
+from reconchess import *
+from reconchess.result_cache import CACHE_EXTENSION
+from reconchess.bots.random_bot import RandomBot
+from reconchess.bots.attacker_bot import AttackerBot
+
+
+class CountingBot(RandomBot):
+    num_games = 0
+
+    def handle_game_start(self, color, board, opponent_name):
+        CountingBot.num_games += 1
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ResultCache(self.directory)
+        CountingBot.num_games = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hit(self):
+        winner_color, win_reason, history = self.cache.play(CountingBot, RandomBot, 3)
+        self.assertEqual(CountingBot.num_games, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        cached_winner_color, cached_win_reason, cached_history = self.cache.play(CountingBot, RandomBot, 3)
+        self.assertEqual(CountingBot.num_games, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(cached_winner_color, winner_color)
+        self.assertEqual(cached_win_reason, win_reason)
+        self.assertEqual(cached_history, history)
+
+    def test_matches_uncached(self):
+        _, _, history = self.cache.play(RandomBot, RandomBot, 5, seconds_per_player=None)
+        _, _, expected = play_local_game(RandomBot(), RandomBot(), game=LocalGame(seconds_per_player=None), seed=5)
+        self.assertEqual(history, expected)
+
+    def test_persistent(self):
+        self.cache.play(CountingBot, RandomBot, 3)
+        cache = ResultCache(self.directory)
+        self.assertEqual(len(cache), 1)
+        cache.play(CountingBot, RandomBot, 3)
+        self.assertEqual(CountingBot.num_games, 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_inputs_change_key(self):
+        key = self.cache.key(RandomBot, RandomBot, 1, seconds_per_player=900)
+        self.assertEqual(key, self.cache.key(RandomBot, RandomBot, 1, seconds_per_player=900))
+        self.assertNotEqual(key, self.cache.key(RandomBot, RandomBot, 2, seconds_per_player=900))
+        self.assertNotEqual(key, self.cache.key(RandomBot, RandomBot, 1, seconds_per_player=60))
+        self.assertNotEqual(key, self.cache.key(RandomBot, AttackerBot, 1, seconds_per_player=900))
+        self.assertNotEqual(key, self.cache.key(AttackerBot, RandomBot, 1, seconds_per_player=900))
+
+    def test_source_hash(self):
+        self.assertEqual(len(player_source_hash(RandomBot)), 64)
+        self.assertNotEqual(player_source_hash(RandomBot), player_source_hash(AttackerBot))
+
+    def test_eviction(self):
+        self.cache.play(RandomBot, RandomBot, 0)
+        max_bytes = self.cache.size() * 2 + 1
+        cache = ResultCache(self.directory, max_bytes=max_bytes)
+        for seed in range(1, 10):
+            cache.play(RandomBot, RandomBot, seed)
+            self.assertLessEqual(cache.size(), max_bytes)
+
+        files = [f for _, _, filenames in os.walk(self.directory) for f in filenames if f.endswith(CACHE_EXTENSION)]
+        self.assertEqual(len(files), len(cache))
+        self.assertLess(len(cache), 10)
+
+        # the most recently played game is kept
+        cache.play(RandomBot, RandomBot, 9)
+        self.assertEqual(cache.hits, 1)
@@ -0,0 +1,83 @@
+import random
+import unittest
+import chess
+from reconchess import SenseIndex
+from reconchess.sense_index import encode_window, encode_sense_result
+from reconchess.utilities import move_actions, revise_move, add_pawn_queen_promotion, sense_on
+
+
+def random_boards(seed, num_boards):
+    rng = random.Random(seed)
+    boards = []
+    board = chess.Board()
+    while len(boards) < num_boards:
+        move = rng.choice(move_actions(board) + [None])
+        if move is not None:
+            move = revise_move(board, add_pawn_queen_promotion(board, move))
+        board.push(move if move is not None else chess.Move.null())
+        boards.append(board.copy(stack=False))
+        if board.king(chess.WHITE) is None or board.king(chess.BLACK) is None:
+            board = chess.Board()
+    return boards
+
+
+class SenseIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.boards = random_boards(0, 200)
+
+    def assertMatchesBruteForce(self, index):
+        boards = {board_id: index[board_id] for board_id in index}
+        expected_num_remaining = index.expected_num_remaining()
+        for square in chess.SQUARES:
+            results = {board_id: sense_on(board, square) for board_id, board in boards.items()}
+            expected = 0
+            for board_id, result in results.items():
+                consistent = {other_id for other_id, other_result in results.items() if other_result == result}
+                self.assertEqual(index.consistent(square, result), consistent)
+                expected += len(consistent)
+            self.assertAlmostEqual(expected_num_remaining[square], expected / len(boards) if boards else 0.0)
+
+    def test_encoding(self):
+        for board in self.boards[:20]:
+            for square in chess.SQUARES:
+                self.assertEqual(encode_window(board, square), encode_sense_result(sense_on(board, square)))
+
+    def test_consistent(self):
+        self.assertMatchesBruteForce(SenseIndex(self.boards[:50]))
+
+    def test_incremental(self):
+        rng = random.Random(1)
+        index = SenseIndex()
+        for board in self.boards[:40]:
+            index.add(board)
+        for board_id in rng.sample(list(index), 15):
+            index.remove(board_id)
+        for board in self.boards[40:60]:
+            index.add(board)
+        self.assertEqual(len(index), 45)
+        self.assertMatchesBruteForce(index)
+
+        for board_id in list(index):
+            index.remove(board_id)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.expected_num_remaining(), [0.0] * 64)
+        self.assertEqual(index.num_groups(chess.E4), 0)
+
+    def test_prune(self):
+        index = SenseIndex(self.boards)
+        true_board = self.boards[123]
+        for square in [chess.B7, chess.E4, chess.G2, chess.D5]:
+            sense_result = sense_on(true_board, square)
+            num_boards = len(index)
+            removed = index.prune(square, sense_result)
+            self.assertEqual(len(index), num_boards - len(removed))
+            self.assertIn(123, index)
+            for board_id in index:
+                self.assertEqual(sense_on(index[board_id], square), sense_result)
+            self.assertMatchesBruteForce(index)
+
+    def test_no_sense(self):
+        index = SenseIndex(self.boards[:10])
+        self.assertEqual(index.consistent(None, []), set(range(10)))
+        self.assertEqual(index.prune(None, []), [])
+        self.assertEqual(len(index), 10)
@@ -0,0 +1,83 @@
+import random
+import unittest
+import chess
+from reconchess import LocalGame, SimulationState
+
+
+class SimulationStateTestCase(unittest.TestCase):
+    def test_matches_local_game(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            game = LocalGame(seconds_per_player=None)
+            game.start()
+            state = SimulationState()
+
+            while not game.is_over():
+                self.assertFalse(state.is_over())
+                self.assertEqual(state.turn, game.turn)
+                self.assertEqual(state.opponent_move_results(), game.opponent_move_results())
+                self.assertEqual(state.sense_actions(), game.sense_actions())
+                self.assertEqual(state.move_actions(), game.move_actions())
+
+                square = rng.choice(state.sense_actions() + [None])
+                self.assertEqual(state.sense(square), game.sense(square))
+
+                move = rng.choice(state.move_actions() + [None])
+                self.assertEqual(state.push(move), game.move(move))
+                game.end_turn()
+                self.assertEqual(state.board.fen(), game.board.fen())
+
+            self.assertTrue(state.is_over())
+            self.assertEqual(state.get_winner_color(), game.get_winner_color())
+
+    def test_push_pop(self):
+        rng = random.Random(1)
+        state = SimulationState()
+        fens = []
+        results = []
+        for _ in range(50):
+            fens.append(state.board.fen())
+            results.append(state.move_results)
+            state.push(rng.choice(state.move_actions() + [None]))
+            if state.is_over():
+                break
+
+        while fens:
+            state.pop()
+            self.assertEqual(state.board.fen(), fens.pop())
+            self.assertEqual(state.move_results, results.pop())
+
+    def test_copy(self):
+        state = SimulationState()
+        state.push(chess.Move(chess.E2, chess.E4))
+        copy = state.copy()
+        copy.push(chess.Move(chess.D7, chess.D5))
+        copy.push(chess.Move(chess.E4, chess.D5))
+
+        self.assertEqual(copy.move_results, chess.D5)
+        self.assertIsNone(state.move_results)
+        self.assertEqual(state.turn, chess.BLACK)
+        self.assertEqual(len(copy.board.move_stack), 2)
+
+        state.pop()
+        self.assertEqual(state.board, chess.Board())
+
+    def test_from_game(self):
+        game = LocalGame(full_turn_limit=1)
+        game.start()
+        game.move(chess.Move(chess.E2, chess.E4))
+        game.end_turn()
+
+        state = SimulationState.from_game(game)
+        self.assertEqual(state.board, game.board)
+        self.assertEqual(state.turn, chess.BLACK)
+        self.assertEqual(len(state.board.move_stack), 0)
+
+        state.push(None)
+        self.assertTrue(state.is_over())
+        self.assertIsNone(state.get_winner_color())
+        self.assertEqual(game.board.fullmove_number, 1)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            SimulationState().history = None
@@ -619,6 +619,63 @@ class SlidingMoveTestCase(unittest.TestCase):
         self.test_sliding_diagonal_captures(piece_type=QUEEN)
 
 
+def reference_slide_move(board, move):
+    """The original implementation of :func:`slide_move`, which checks every square along the ray."""
+    squares = SquareSet(between(move.from_square, move.to_square))
+    if move.to_square > move.from_square:
+        squares = reversed(squares)
+    for slide_square in [move.to_square] + list(squares):
+        revised = Move(move.from_square, slide_square, move.promotion)
+        if board.is_pseudo_legal(revised):
+            return revised
+    return None
+
+
+def reference_revise_move(board, move):
+    """The original implementation of :func:`revise_move`."""
+    if board.is_pseudo_legal(move) or is_psuedo_legal_castle(board, move):
+        return move
+
+    if is_illegal_castle(board, move):
+        return None
+
+    piece = board.piece_at(move.from_square)
+    if piece.piece_type in [PAWN, ROOK, BISHOP, QUEEN]:
+        move = reference_slide_move(board, move)
+
+    return move if board.is_pseudo_legal(move) else None
+
+
+class ReviseMoveFuzzTestCase(unittest.TestCase):
+    def random_moves(self, board, n=20):
+        moves = move_actions(board)
+        own_squares = list(SquareSet(board.occupied_co[board.turn]))
+        for _ in range(n):
+            promotion = random.choice([None, None, None] + PIECE_TYPES)
+            moves.append(Move(random.choice(own_squares), random.choice(SQUARES), promotion))
+        return moves
+
+    def test_slide_move_fuzz(self, max_turns=500):
+        board = Board()
+        turn = 1
+        while not board.is_game_over() and turn < max_turns:
+            for move in self.random_moves(board):
+                self.assertEqual(reference_slide_move(board, move), slide_move(board, move), move)
+            board.push(random.choice(list(board.generate_pseudo_legal_moves())))
+            turn += 1
+
+    def test_revise_move_fuzz(self, max_turns=500):
+        board = Board()
+        turn = 1
+        while board.king(WHITE) is not None and board.king(BLACK) is not None and turn < max_turns:
+            moves = self.random_moves(board)
+            for move in moves:
+                self.assertEqual(reference_revise_move(board, move), revise_move(board, move), move)
+            taken_move = revise_move(board, random.choice(moves))
+            board.push(taken_move if taken_move is not None else Move.null())
+            turn += 1
+
+
 class CaptureSquareTestCase(unittest.TestCase):
     def test_pass(self):
         board = Board()
@@ -842,3 +899,81 @@ class AddPawnQueenPromotionTestCase(unittest.TestCase):
         for piece_type in chess.PIECE_TYPES[1:-1]:
             self.assertEqual(add_pawn_queen_promotion(board, Move(A7, A8, promotion=piece_type)),
                              Move(A7, A8, promotion=piece_type))
+
+
+class TakeMoveTestCase(unittest.TestCase):
+    def test_pass(self):
+        self.assertEqual(take_move(Board(), None, []), (None, None))
+
+    def test_promotion_slide_and_capture(self):
+        board = Board('1r2k3/P7/8/8/8/8/8/R3K3 w - - 0 1')
+        self.assertEqual(take_move(board, Move(A7, B8)), (Move(A7, B8, promotion=QUEEN), B8))
+        # the rook slides up to the pawn in its way
+        self.assertEqual(take_move(board, Move(A1, A8)), (Move(A1, A6), None))
+
+    def test_allowed_moves(self):
+        board = Board()
+        allowed_moves = move_actions(board)
+        self.assertEqual(take_move(board, Move(E2, E4), allowed_moves), (Move(E2, E4), None))
+        with self.assertRaises(ValueError):
+            take_move(board, Move(E2, E5), allowed_moves)
+
+
+class ChessJSONTestCase(unittest.TestCase):
+    def setUp(self):
+        self.obj = {
+            'piece': Piece(KING, BLACK),
+            'move': Move(E7, E8, promotion=QUEEN),
+            'board': Board('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1'),
+            'win_reason': WinReason.TIMEOUT,
+            'sense_result': [(A8, Piece(ROOK, BLACK)), (B8, None)],
+            'moves': [Move(A2, A3), None],
+        }
+
+    def assertRoundTrip(self, encoder_cls):
+        decoded = json.loads(json.dumps(self.obj, cls=encoder_cls), cls=ChessJSONDecoder)
+        decoded['sense_result'] = list(map(tuple, decoded['sense_result']))
+        self.assertEqual(decoded.pop('board').fen(), self.obj['board'].fen())
+        self.assertEqual(decoded, {k: v for k, v in self.obj.items() if k != 'board'})
+
+    def test_v1_round_trip(self):
+        self.assertRoundTrip(ChessJSONEncoder)
+
+    def test_v2_round_trip(self):
+        self.assertRoundTrip(CompactChessJSONEncoder)
+
+    def test_v1_format(self):
+        self.assertEqual(json.dumps(Move(E2, E4), cls=ChessJSONEncoder), '{"type": "Move", "value": "e2e4"}')
+        self.assertEqual(json.dumps(WinReason.RESIGN, cls=ChessJSONEncoder), '{"type": "WinReason", "value": "RESIGN"}')
+
+    def test_v2_format(self):
+        self.assertEqual(json.dumps(Move(E2, E4), cls=CompactChessJSONEncoder), '{"$m": "e2e4"}')
+        self.assertEqual(json.dumps(Piece(PAWN, WHITE), cls=CompactChessJSONEncoder), '{"$p": "P"}')
+
+    def test_decoded_values_are_not_shared(self):
+        first, second = json.loads('[{"$m": "e2e4"}, {"$m": "e2e4"}]', cls=ChessJSONDecoder)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        first, second = json.loads('[{"$p": "K"}, {"$p": "K"}]', cls=ChessJSONDecoder)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+    def test_unknown_tags_untouched(self):
+        self.assertEqual(json.loads('{"$x": 1}', cls=ChessJSONDecoder), {'$x': 1})
+        self.assertEqual(json.loads('{"type": "Other", "value": 1}', cls=ChessJSONDecoder),
+                         {'type': 'Other', 'value': 1})
+
+    def test_dumps(self):
+        for encoder_cls in [ChessJSONEncoder, CompactChessJSONEncoder]:
+            # enums are encoded before dumping, see chess_json_dumps
+            obj = dict(self.obj, win_reason=encoder_cls().default(self.obj['win_reason']))
+            self.assertEqual(json.loads(chess_json_dumps(obj, cls=encoder_cls)),
+                             json.loads(json.dumps(self.obj, cls=encoder_cls)))
+
+    def test_dumps_game_history(self):
+        history = GameHistory()
+        history.store_players('white', 'black')
+        history.store_results(WHITE, WinReason.KING_CAPTURE)
+        decoded = json.loads(chess_json_dumps(history, cls=GameHistoryEncoder), cls=GameHistoryDecoder)
+        self.assertEqual(decoded.get_win_reason(), WinReason.KING_CAPTURE)
+        self.assertEqual(decoded.get_winner_color(), WHITE)
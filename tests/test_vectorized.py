@@ -0,0 +1,108 @@
+import random
+import unittest
+import chess
+from reconchess.utilities import move_actions, revise_move, add_pawn_queen_promotion, capture_square_of_move
+
+try:
+    import numpy as np
+    from reconchess.vectorized import *
+except ImportError:
+    np = None
+
+
+def random_boards(seed, num_games=20):
+    # boards from games of random moves, without en passant since stacks don't represent it
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(num_games):
+        board = chess.Board()
+        for _ in range(rng.randrange(120)):
+            move = rng.choice(move_actions(board) + [None])
+            if move is not None:
+                move = revise_move(board, add_pawn_queen_promotion(board, move))
+            board.push(move if move is not None else chess.Move.null())
+            if board.king(chess.WHITE) is None or board.king(chess.BLACK) is None:
+                break
+            board = board.copy(stack=False)
+            board.ep_square = None
+            boards.append(board)
+    return boards
+
+
+def boards_with_turn(boards, color):
+    boards = [board.copy() for board in boards]
+    for board in boards:
+        board.turn = color
+    return boards
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class VectorizedTestCase(unittest.TestCase):
+    def test_move_vocabulary(self):
+        self.assertEqual(len(MOVES), len(set(MOVES)))
+        for move in move_actions(chess.Board()):
+            self.assertIn(move, MOVE_INDICES)
+        self.assertIn(chess.Move(chess.B7, chess.A8, chess.KNIGHT), MOVE_INDICES)
+
+    def test_stack_roundtrip(self):
+        boards = random_boards(0, num_games=5)
+        stack, castling_rights = stack_boards(boards)
+        self.assertEqual(stack.shape, (len(boards), NUM_PLANES))
+        for i, board in enumerate(boards):
+            unstacked = unstack_board(stack, i, board.turn, castling_rights)
+            self.assertEqual(unstacked.board_fen(), board.board_fen())
+            self.assertEqual(unstacked.castling_rights, board.castling_rights)
+
+    def test_move_actions_match(self):
+        boards = random_boards(1)
+        for color in chess.COLORS:
+            colored_boards = boards_with_turn(boards, color)
+            stack, castling_rights = stack_boards(colored_boards)
+            rows, cols = move_actions_on_stack(stack, color, castling_rights)
+            self.assertTrue(np.all(np.diff(rows * NUM_MOVES + cols) > 0))
+            for i, board in enumerate(colored_boards):
+                self.assertEqual({MOVES[col] for col in cols[rows == i]}, set(move_actions(board)), board.fen())
+
+    def test_no_castling_rights(self):
+        board = chess.Board('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+        stack, _ = stack_boards([board])
+        rows, cols = move_actions_on_stack(stack, chess.WHITE)
+        moves = {MOVES[col] for col in cols}
+        self.assertNotIn(chess.Move(chess.E1, chess.G1), moves)
+        self.assertEqual(moves, set(move_actions(board)) - {chess.Move(chess.E1, chess.G1),
+                                                            chess.Move(chess.E1, chess.C1)})
+
+    def test_revise_move_matches(self):
+        rng = random.Random(2)
+        boards = random_boards(2)
+        for color in chess.COLORS:
+            colored_boards = boards_with_turn(boards, color)
+            stack, castling_rights = stack_boards(colored_boards)
+            for _ in range(20):
+                actions = move_actions(rng.choice(colored_boards))
+                if not actions:
+                    continue
+                move = rng.choice(actions)
+                new_stack, new_castling_rights, to_squares, capture_squares = \
+                    revise_move_on_stack(stack, color, move, castling_rights)
+                for i, board in enumerate(colored_boards):
+                    if move not in move_actions(board):
+                        continue
+                    taken_move = revise_move(board, add_pawn_queen_promotion(board, move))
+                    capture_square = capture_square_of_move(board, taken_move)
+                    after = board.copy()
+                    after.push(taken_move if taken_move is not None else chess.Move.null())
+
+                    message = '{} {}'.format(board.fen(), move)
+                    self.assertEqual(to_squares[i], taken_move.to_square if taken_move is not None else -1, message)
+                    self.assertEqual(capture_squares[i], capture_square if capture_square is not None else -1,
+                                     message)
+                    unstacked = unstack_board(new_stack, i, not color, new_castling_rights)
+                    self.assertEqual(unstacked.board_fen(), after.board_fen(), message)
+                    self.assertEqual(unstacked.castling_rights, after.castling_rights, message)
+
+    def test_empty_stack(self):
+        stack, castling_rights = stack_boards([])
+        rows, cols = move_actions_on_stack(stack, chess.WHITE, castling_rights)
+        self.assertEqual(len(rows), 0)
+        self.assertEqual(len(cols), 0)
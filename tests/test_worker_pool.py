@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+from chess import *
+from reconchess import *
+from reconchess.worker_pool import PlayerWorkerPool, PlayerWorkerError, WorkerPlayer
+from reconchess.bots.random_bot import RandomBot
+
+BOT_SOURCE = textwrap.dedent('''
+    import os
+    import time
+    from reconchess import *
+    from reconchess.bots.random_bot import RandomBot
+
+
+    class FaultyBot(RandomBot):
+        def handle_game_start(self, color, board, opponent_name):
+            self.pid = os.getpid()
+
+        def choose_sense(self, sense_actions, move_actions, seconds_left):
+            if seconds_left == 13:
+                raise ValueError('unlucky')
+            if seconds_left == 666:
+                os._exit(1)
+            if seconds_left == 77:
+                time.sleep(30)
+            return super().choose_sense(sense_actions, move_actions, seconds_left)
+
+        def handle_game_end(self, winner_color, win_reason, game_history):
+            pass
+
+    def get_player():
+        return FaultyBot
+''')
+
+PONDERING_BOT_SOURCE = textwrap.dedent('''
+    from reconchess.bots.random_bot import RandomBot
+
+
+    class PonderingBot(RandomBot):
+        wants_to_ponder = True
+        wants_observation_planes = True
+
+        def __init__(self):
+            self.num_ponders = 0
+            self.planes = None
+            self.plane_sums = []
+
+        def handle_observation_planes(self, planes):
+            self.planes = planes
+
+        def ponder(self, stop):
+            self.num_ponders += 1
+            stop.wait()
+
+        def choose_move(self, move_actions, seconds_left):
+            self.plane_sums.append(float(self.planes.sum()))
+            return super().choose_move(move_actions, seconds_left)
+
+        def handle_game_end(self, winner_color, win_reason, game_history):
+            pass
+
+        def stats(self):
+            return self.num_ponders, self.plane_sums
+
+    def get_player():
+        return PonderingBot
+''')
+
+
+class PlayerWorkerPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.bot_path = os.path.join(self.directory, 'faulty_bot.py')
+        with open(self.bot_path, 'w') as fp:
+            fp.write(BOT_SOURCE)
+        self.pool = PlayerWorkerPool(self.bot_path, num_workers=2)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.directory)
+
+    def test_play_games(self):
+        for _ in range(3):
+            with self.pool.player() as player:
+                self.assertIsInstance(player, WorkerPlayer)
+                winner_color, win_reason, history = play_local_game(player, RandomBot(), seconds_per_player=None)
+                self.assertIsNotNone(history)
+                self.assertGreater(history.num_turns(WHITE), 0)
+        self.assertEqual(self.pool.num_idle(), 2)
+        self.assertEqual(self.pool.num_restarts, 0)
+
+    def test_concurrent_acquire(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertEqual(self.pool.num_idle(), 0)
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(timeout=0.01)
+        self.pool.release(first)
+        self.pool.release(second)
+        self.assertEqual(self.pool.num_idle(), 2)
+
+    def test_bot_exception(self):
+        with self.pool.player() as player:
+            player.handle_game_start(WHITE, Board(), 'opponent')
+            with self.assertRaises(PlayerWorkerError) as context:
+                player.choose_sense(list(SQUARES), [], 13)
+            self.assertIn('unlucky', str(context.exception))
+
+            # the worker survives exceptions in the bot
+            self.assertIn(player.choose_sense(list(SQUARES), [], 10), SQUARES)
+        self.assertEqual(self.pool.num_restarts, 0)
+
+    def test_worker_crash(self):
+        with self.pool.player() as player:
+            player.handle_game_start(WHITE, Board(), 'opponent')
+            with self.assertRaises(PlayerWorkerError):
+                player.choose_sense(list(SQUARES), [], 666)
+        self.assertEqual(self.pool.num_restarts, 1)
+        self.assertEqual(self.pool.num_idle(), 2)
+
+        # the replacement worker plays normally
+        for _ in range(2):
+            with self.pool.player() as player:
+                player.handle_game_start(WHITE, Board(), 'opponent')
+                self.assertIn(player.choose_sense(list(SQUARES), [], 10), SQUARES)
+
+    def test_closed(self):
+        self.pool.close()
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire()
+
+    def test_ponder_and_observation_planes(self):
+        bot_path = os.path.join(self.directory, 'pondering_bot.py')
+        with open(bot_path, 'w') as fp:
+            fp.write(PONDERING_BOT_SOURCE)
+
+        with PlayerWorkerPool(bot_path, num_workers=1) as pool:
+            with pool.player() as player:
+                self.assertTrue(player.wants_to_ponder)
+                self.assertTrue(player.wants_observation_planes)
+                game = LocalGame(seconds_per_player=None, full_turn_limit=5)
+                _, _, history = play_local_game(player, RandomBot(), game=game, ponder=True)
+                num_ponders, plane_sums = player._call('stats')
+
+        self.assertGreater(num_ponders, 0)
+        # the planes the bot kept were updated for every move
+        self.assertEqual(len(plane_sums), history.num_turns(WHITE))
+        self.assertTrue(all(plane_sum > 0 for plane_sum in plane_sums))
+        self.assertGreater(len(set(plane_sums)), 1)
+
+    def test_bot_defaults(self):
+        with self.pool.player() as player:
+            self.assertFalse(player.wants_to_ponder)
+            self.assertFalse(player.wants_observation_planes)
+
+    def test_timeout(self):
+        with PlayerWorkerPool(self.bot_path, num_workers=1, timeout=1) as pool:
+            with pool.player() as player:
+                player.handle_game_start(WHITE, Board(), 'opponent')
+                with self.assertRaises(PlayerWorkerError) as context:
+                    player.choose_sense(list(SQUARES), [], 77)
+                self.assertIn('did not reply', str(context.exception))
+            self.assertEqual(pool.num_restarts, 1)
+
+            # the worker that didn't reply was replaced
+            with pool.player() as player:
+                player.handle_game_start(WHITE, Board(), 'opponent')
+                self.assertIn(player.choose_sense(list(SQUARES), [], 10), SQUARES)
+
+    def test_load_failures(self):
+        bot_path = os.path.join(self.directory, 'broken_bot.py')
+        with open(bot_path, 'w') as fp:
+            fp.write('raise ImportError("missing weights")\n')
+
+        with PlayerWorkerPool(bot_path, num_workers=2, max_load_failures=3) as pool:
+            for _ in range(3):
+                with self.assertRaises(PlayerWorkerError) as context:
+                    pool.acquire()
+                self.assertIn('missing weights', str(context.exception))
+            self.assertTrue(pool.is_broken())
+
+            # no more workers are started for a bot that can't be loaded
+            num_restarts = pool.num_restarts
+            with self.assertRaises(PlayerWorkerError) as context:
+                pool.acquire(timeout=1)
+            self.assertIn('failed to load in 3 workers', str(context.exception))
+            self.assertEqual(pool.num_restarts, num_restarts)